@@ -0,0 +1,358 @@
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import Depends
+
+from app.core.use_cases.generate_dashboard_report_use_case import (
+    GenerateDashboardReportUseCase,
+)
+from app.core.use_cases.search_workplaces_use_case import SearchWorkplacesUseCase
+from app.infrastructure.adapters.in_memory_api_key_store import InMemoryApiKeyStore
+from app.infrastructure.adapters.caching_workplace_adapter import (
+    CachingWorkplaceAdapter,
+)
+from app.infrastructure.adapters.mock_workplace_adapter import (
+    MockWorkplaceAdapter,
+)  # Temporary direct use
+from app.infrastructure.adapters.mock_report_adapter import (
+    MockReportAdapter,
+)  # Temporary direct use
+from app.infrastructure.adapters.report_rollup_store import ReportRollupStore
+from app.infrastructure.adapters.rollup_report_adapter import RollupReportAdapter
+from app.infrastructure.adapters.segment_cache_report_adapter import (
+    SegmentCachingReportAdapter,
+)
+from app.infrastructure.services.api_key_authenticator import (
+    ApiKeyAuthenticator,
+    hash_api_key,
+)
+from app.infrastructure.services.encoded_block_cache import EncodedBlockCache
+from app.infrastructure.services.export_admission_service import ExportAdmissionService
+from app.infrastructure.services.export_cache_service import ExportCacheService
+from app.infrastructure.services.export_coalescing_service import (
+    ExportCoalescingService,
+)
+from app.infrastructure.services.export_job_service import ExportJobService
+from app.infrastructure.services.in_memory_cache_service import InMemoryCacheService
+from app.infrastructure.services.in_memory_distributed_lock_service import (
+    InMemoryDistributedLockService,
+)
+from app.infrastructure.services.report_archive_service import ReportArchiveService
+from app.infrastructure.services.report_downsampling_service import (
+    ReportDownsamplingService,
+)
+from app.infrastructure.services.report_ndjson_service import ReportNdjsonService
+from app.infrastructure.services.workplace_loader import WorkplaceLoader
+
+# Binds ports to their implementations for the API layer.
+# Request-scoped objects are built per call; shared state (caches, pools) lives in
+# module-level singletons so every request of this worker process sees the same instance.
+
+# Report fan-out settings for the exporter (see GenerateDashboardReportUseCase)
+REPORT_MAX_CONCURRENCY = int(os.getenv("REPORT_MAX_CONCURRENCY", "4"))
+REPORT_TIMEOUT_SECONDS = float(os.getenv("REPORT_TIMEOUT_SECONDS", "30"))
+# Date ranges longer than REPORT_PARTITION_DAYS (0 disables) are generated as partitions,
+# in parallel on REPORT_EXECUTOR: "none" (event loop), "thread" or "process" pool.
+REPORT_PARTITION_DAYS = int(os.getenv("REPORT_PARTITION_DAYS", "0"))
+REPORT_EXECUTOR = os.getenv("REPORT_EXECUTOR", "none").lower()
+REPORT_EXECUTOR_WORKERS = int(
+    os.getenv("REPORT_EXECUTOR_WORKERS", str(os.cpu_count() or 1))
+)
+# Serve week/month/year reports from pre-aggregated rollups (see RollupReportAdapter)
+REPORT_ROLLUPS_ENABLED = os.getenv("REPORT_ROLLUPS_ENABLED", "true").lower() == "true"
+# The last N days (today included) still receive data: they are always read from the report adapter
+REPORT_ROLLUP_OPEN_DAYS = int(os.getenv("REPORT_ROLLUP_OPEN_DAYS", "2"))
+# Loaded days are dropped after the TTL (0 keeps them until invalidated) or when over the entry cap
+REPORT_ROLLUP_TTL_SECONDS = int(os.getenv("REPORT_ROLLUP_TTL_SECONDS", str(24 * 3600)))
+REPORT_ROLLUP_MAX_ENTRIES = int(os.getenv("REPORT_ROLLUP_MAX_ENTRIES", "10000"))
+# Report results cached per calendar segment (see SegmentCachingReportAdapter). A TTL of 0 disables it.
+REPORT_SEGMENT_CACHE_TTL_SECONDS = int(
+    os.getenv("REPORT_SEGMENT_CACHE_TTL_SECONDS", str(24 * 3600))
+)
+REPORT_SEGMENT_CACHE_MAX_ENTRIES = int(
+    os.getenv("REPORT_SEGMENT_CACHE_MAX_ENTRIES", "100000")
+)
+# Compressed CSV of those segments, spliced into archives as is (see EncodedBlockCache)
+EXPORT_BLOCK_CACHE_MAX_ENTRIES = int(
+    os.getenv("EXPORT_BLOCK_CACHE_MAX_ENTRIES", "10000")
+)
+
+# Where CSV encoding and compression run: "thread" or "process" pool (see ReportArchiveService).
+# EXPORT_COMPRESSION_LEVEL: 1 (fast) to 9 (small), -1 zlib default, 0 stores entries uncompressed.
+ARCHIVE_EXECUTOR = os.getenv("ARCHIVE_EXECUTOR", "thread").lower()
+ARCHIVE_EXECUTOR_WORKERS = int(
+    os.getenv("ARCHIVE_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+EXPORT_COMPRESSION_LEVEL = int(os.getenv("EXPORT_COMPRESSION_LEVEL", "-1"))
+
+# Finished export archives (see ExportCacheService). A TTL of 0 disables the cache.
+EXPORT_CACHE_TTL_SECONDS = int(os.getenv("EXPORT_CACHE_TTL_SECONDS", "300"))
+EXPORT_CACHE_MAX_ENTRY_BYTES = int(
+    os.getenv("EXPORT_CACHE_MAX_ENTRY_BYTES", str(32 * 1024 * 1024))
+)
+EXPORT_CACHE_MAX_ENTRIES = int(os.getenv("EXPORT_CACHE_MAX_ENTRIES", "256"))
+
+# Single-flight for identical concurrent exports (see ExportCoalescingService)
+EXPORT_COALESCING_ENABLED = (
+    os.getenv("EXPORT_COALESCING_ENABLED", "true").lower() == "true"
+)
+EXPORT_COALESCING_MAX_BUFFER_BYTES = int(
+    os.getenv("EXPORT_COALESCING_MAX_BUFFER_BYTES", str(32 * 1024 * 1024))
+)
+# Late identical requests join a flight only while it has produced less than this
+EXPORT_COALESCING_JOIN_WINDOW_BYTES = int(
+    os.getenv("EXPORT_COALESCING_JOIN_WINDOW_BYTES", str(1024 * 1024))
+)
+
+# Background export jobs (see ExportJobService)
+EXPORT_JOB_WORKERS = int(os.getenv("EXPORT_JOB_WORKERS", "2"))
+EXPORT_JOB_TTL_SECONDS = int(os.getenv("EXPORT_JOB_TTL_SECONDS", "3600"))
+# How long a finished job is handed out again to identical new submissions
+EXPORT_JOB_REUSE_SECONDS = int(os.getenv("EXPORT_JOB_REUSE_SECONDS", "60"))
+EXPORT_SPOOL_DIR = os.getenv("EXPORT_SPOOL_DIR")  # Defaults to <tmp>/dashboard_exports
+
+# Accessible workplace IDs per user (see CachingWorkplaceAdapter). A TTL of 0 disables the cache.
+WORKPLACE_ACCESS_CACHE_TTL_SECONDS = int(
+    os.getenv("WORKPLACE_ACCESS_CACHE_TTL_SECONDS", "300")
+)
+WORKPLACE_ACCESS_LOCAL_TTL_SECONDS = int(
+    os.getenv("WORKPLACE_ACCESS_LOCAL_TTL_SECONDS", "30")
+)
+WORKPLACE_ACCESS_CACHE_MAX_ENTRIES = int(
+    os.getenv("WORKPLACE_ACCESS_CACHE_MAX_ENTRIES", "10000")
+)
+
+# Admission control from the estimated export size (see ExportAdmissionService); 0 disables a limit.
+# Above EXPORT_MAX_*: refused. Above EXPORT_SYNC_MAX_*: EXPORT_OVERSIZE_ACTION, "job" or "reject".
+EXPORT_MAX_ROWS = int(os.getenv("EXPORT_MAX_ROWS", "50000000"))
+EXPORT_MAX_BYTES = int(os.getenv("EXPORT_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+EXPORT_SYNC_MAX_ROWS = int(os.getenv("EXPORT_SYNC_MAX_ROWS", "1000000"))
+EXPORT_SYNC_MAX_BYTES = int(os.getenv("EXPORT_SYNC_MAX_BYTES", str(64 * 1024 * 1024)))
+EXPORT_OVERSIZE_ACTION = os.getenv("EXPORT_OVERSIZE_ACTION", "job").lower()
+
+# API key authentication (see ApiKeyAuthenticator). SERVER_API_KEY is registered for
+# SERVER_API_KEY_PRINCIPAL at startup; API_KEY_PEPPER must be the one the stored hashes were made with.
+SERVER_API_KEY = os.getenv("SERVER_API_KEY", "your_secret_api_key_here")
+SERVER_API_KEY_PRINCIPAL = os.getenv(
+    "SERVER_API_KEY_PRINCIPAL", "user_from_api_key_abc123"
+)
+API_KEY_PEPPER = os.getenv("API_KEY_PEPPER", "").encode("utf-8")
+API_KEY_CACHE_TTL_SECONDS = float(os.getenv("API_KEY_CACHE_TTL_SECONDS", "60"))
+API_KEY_NEGATIVE_CACHE_TTL_SECONDS = float(
+    os.getenv("API_KEY_NEGATIVE_CACHE_TTL_SECONDS", "10")
+)
+API_KEY_CACHE_MAX_ENTRIES = int(os.getenv("API_KEY_CACHE_MAX_ENTRIES", "100000"))
+
+
+def _create_report_executor() -> Optional[Executor]:
+    if REPORT_EXECUTOR == "process":
+        return ProcessPoolExecutor(max_workers=REPORT_EXECUTOR_WORKERS)
+    if REPORT_EXECUTOR == "thread":
+        # Only helps adapters whose generation releases the GIL
+        return ThreadPoolExecutor(
+            max_workers=REPORT_EXECUTOR_WORKERS, thread_name_prefix="report"
+        )
+    if REPORT_EXECUTOR == "none":
+        return None
+    raise ValueError(
+        f"Unknown REPORT_EXECUTOR '{REPORT_EXECUTOR}', expected 'none', 'thread' or 'process'."
+    )
+
+
+_report_executor = _create_report_executor()
+_report_rollup_store = ReportRollupStore(
+    ttl_seconds=REPORT_ROLLUP_TTL_SECONDS, max_entries=REPORT_ROLLUP_MAX_ENTRIES
+)
+# Swap for RedisCacheService to share report segments between worker processes
+_report_segment_cache = InMemoryCacheService(
+    max_entries=REPORT_SEGMENT_CACHE_MAX_ENTRIES
+)
+
+# Swap for CacheApiKeyStore(RedisCacheService(...)) or DatabaseApiKeyStore(...) to serve
+# keys issued elsewhere; call invalidate() on get_api_key_authenticator() when revoking one.
+_api_key_store = InMemoryApiKeyStore(
+    {hash_api_key(SERVER_API_KEY, API_KEY_PEPPER): SERVER_API_KEY_PRINCIPAL}
+    if SERVER_API_KEY
+    else {}
+)
+_api_key_authenticator = ApiKeyAuthenticator(
+    store=_api_key_store,
+    pepper=API_KEY_PEPPER,
+    ttl_seconds=API_KEY_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=API_KEY_NEGATIVE_CACHE_TTL_SECONDS,
+    max_entries=API_KEY_CACHE_MAX_ENTRIES,
+    max_negative_entries=max(1, API_KEY_CACHE_MAX_ENTRIES // 10),
+)
+
+
+def get_api_key_authenticator():
+    return _api_key_authenticator
+
+
+# Swap the shared level for RedisCacheService to share it between worker processes;
+# call invalidate()/invalidate_all() on get_workplace_port() when access rights change.
+_workplace_port = (
+    CachingWorkplaceAdapter(
+        source=MockWorkplaceAdapter(),
+        cache=InMemoryCacheService(max_entries=WORKPLACE_ACCESS_CACHE_MAX_ENTRIES),
+        ttl_seconds=WORKPLACE_ACCESS_CACHE_TTL_SECONDS,
+        local_ttl_seconds=min(
+            WORKPLACE_ACCESS_LOCAL_TTL_SECONDS, WORKPLACE_ACCESS_CACHE_TTL_SECONDS
+        ),
+        max_entries=WORKPLACE_ACCESS_CACHE_MAX_ENTRIES,
+    )
+    if WORKPLACE_ACCESS_CACHE_TTL_SECONDS > 0
+    else MockWorkplaceAdapter()
+)
+
+
+def get_workplace_port():
+    return _workplace_port
+
+
+def get_search_workplaces_use_case():
+    return SearchWorkplacesUseCase(workplace_port=get_workplace_port())
+
+
+def get_workplace_loader(workplace_port=Depends(get_workplace_port)):
+    # FastAPI resolves a dependency once per request: every user of it within a request
+    # shares this loader, its batches and its memo
+    return WorkplaceLoader(workplace_port)
+
+
+# Temporary direct instantiation of use case with mock adapters
+# In a real app, this would use FastAPI's dependency injection system
+# to provide port implementations.
+def get_generate_dashboard_report_use_case():
+    # This is a simplified DI for now.
+    # Ideally, ports are bound to implementations elsewhere (e.g., in main.py or a container)
+    workplace_port = get_workplace_port()
+    report_port = MockReportAdapter(executor=_report_executor)
+    if REPORT_ROLLUPS_ENABLED:
+        report_port = RollupReportAdapter(
+            source=report_port,
+            store=_report_rollup_store,
+            open_days=REPORT_ROLLUP_OPEN_DAYS,
+        )
+    if REPORT_SEGMENT_CACHE_TTL_SECONDS > 0:
+        report_port = SegmentCachingReportAdapter(
+            source=report_port,
+            cache=_report_segment_cache,
+            ttl_seconds=REPORT_SEGMENT_CACHE_TTL_SECONDS,
+        )
+    return GenerateDashboardReportUseCase(
+        workplace_port=workplace_port,
+        report_port=report_port,
+        max_concurrent_reports=REPORT_MAX_CONCURRENCY,
+        report_timeout=REPORT_TIMEOUT_SECONDS
+        or None,  # 0 disables the per-report deadline
+        partition_days=REPORT_PARTITION_DAYS or None,
+    )
+
+
+def _create_archive_executor() -> Optional[Executor]:
+    if ARCHIVE_EXECUTOR == "process":
+        # Sidesteps the GIL for CSV encoding too, at the cost of pickling each batch
+        return ProcessPoolExecutor(max_workers=ARCHIVE_EXECUTOR_WORKERS)
+    if ARCHIVE_EXECUTOR == "thread":
+        # zlib releases the GIL while compressing
+        return ThreadPoolExecutor(
+            max_workers=ARCHIVE_EXECUTOR_WORKERS, thread_name_prefix="archive"
+        )
+    raise ValueError(
+        f"Unknown ARCHIVE_EXECUTOR '{ARCHIVE_EXECUTOR}', expected 'thread' or 'process'."
+    )
+
+
+_archive_executor = _create_archive_executor()
+
+# Swap for RedisCacheService to share encoded blocks between worker processes
+_encoded_block_cache = EncodedBlockCache(
+    cache=InMemoryCacheService(max_entries=EXPORT_BLOCK_CACHE_MAX_ENTRIES),
+    ttl_seconds=REPORT_SEGMENT_CACHE_TTL_SECONDS,
+)
+
+
+def get_report_archive_service():
+    return ReportArchiveService(
+        compresslevel=EXPORT_COMPRESSION_LEVEL,
+        executor=_archive_executor,
+        block_cache=_encoded_block_cache
+        if REPORT_SEGMENT_CACHE_TTL_SECONDS > 0
+        else None,
+    )
+
+
+def get_report_ndjson_service():
+    # JSON encoding shares the archive pool: both turn report batches into bytes
+    return ReportNdjsonService(executor=_archive_executor)
+
+
+def get_report_downsampling_service():
+    return ReportDownsamplingService(executor=_archive_executor)
+
+
+# Swap InMemoryCacheService for RedisCacheService/MemcachedCacheService to share
+# cached exports between worker processes.
+_export_cache_service = ExportCacheService(
+    cache=InMemoryCacheService(max_entries=EXPORT_CACHE_MAX_ENTRIES),
+    ttl_seconds=EXPORT_CACHE_TTL_SECONDS,
+    max_entry_bytes=EXPORT_CACHE_MAX_ENTRY_BYTES,
+)
+
+
+def get_export_cache_service():
+    return _export_cache_service if EXPORT_CACHE_TTL_SECONDS > 0 else None
+
+
+# In-process coalescing only. With a Redis-backed export cache, also pass
+# lock_service=RedisDistributedLockService(...) and export_cache=_export_cache_service so
+# that a single worker process generates each export.
+_export_coalescing_service = ExportCoalescingService(
+    max_buffer_bytes=EXPORT_COALESCING_MAX_BUFFER_BYTES,
+    join_window_bytes=EXPORT_COALESCING_JOIN_WINDOW_BYTES,
+)
+
+
+def get_export_coalescing_service():
+    return _export_coalescing_service if EXPORT_COALESCING_ENABLED else None
+
+
+# Swap in RedisCacheService/RedisDistributedLockService (and a shared EXPORT_SPOOL_DIR)
+# to share jobs between worker processes.
+_export_job_service = ExportJobService(
+    use_case_factory=get_generate_dashboard_report_use_case,
+    archive_service_factory=get_report_archive_service,
+    job_store=InMemoryCacheService(),
+    lock_service=InMemoryDistributedLockService(),
+    spool_dir=EXPORT_SPOOL_DIR,
+    max_workers=EXPORT_JOB_WORKERS,
+    job_ttl_seconds=EXPORT_JOB_TTL_SECONDS,
+    reuse_max_age_seconds=EXPORT_JOB_REUSE_SECONDS,
+)
+
+
+def get_export_job_service():
+    return _export_job_service
+
+
+def _create_export_admission_service() -> ExportAdmissionService:
+    if EXPORT_OVERSIZE_ACTION not in ("job", "reject"):
+        raise ValueError(
+            f"Unknown EXPORT_OVERSIZE_ACTION '{EXPORT_OVERSIZE_ACTION}', expected 'job' or 'reject'."
+        )
+    return ExportAdmissionService(
+        max_rows=EXPORT_MAX_ROWS,
+        max_bytes=EXPORT_MAX_BYTES,
+        sync_max_rows=EXPORT_SYNC_MAX_ROWS,
+        sync_max_bytes=EXPORT_SYNC_MAX_BYTES,
+        route_to_jobs=EXPORT_OVERSIZE_ACTION == "job",
+    )
+
+
+_export_admission_service = _create_export_admission_service()
+
+
+def get_export_admission_service():
+    return _export_admission_service
@@ -1,16 +1,37 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from typing import List, Optional
 from datetime import date, timedelta
-import io
-import csv
-import zipfile # Standard library for zip file creation
+import asyncio
+import base64
+import binascii
+import json
+import os
 
-from app.core.models.report import ReportRequestParams, GeneratedReport, ReportFile
+from app.core.models.export_job import EXPORT_JOB_FAILED, ExportJob
+from app.core.models.report import ReportRequestParams, GeneratedReport, ReportFile, ReportRowKey, ReportCostEstimate
+from app.core.ports.report_port import UnknownReportError
 from app.core.use_cases.generate_dashboard_report_use_case import GenerateDashboardReportUseCase
-# For dependency injection of use case (to be set up)
-from app.infrastructure.adapters.mock_workplace_adapter import MockWorkplaceAdapter # Temporary direct use
-from app.infrastructure.adapters.mock_report_adapter import MockReportAdapter   # Temporary direct use
+from app.api.dependencies import (
+    get_export_admission_service,
+    get_export_cache_service,
+    get_export_coalescing_service,
+    get_export_job_service,
+    get_generate_dashboard_report_use_case,
+    get_report_archive_service,
+    get_report_downsampling_service,
+    get_report_ndjson_service,
+    get_workplace_loader,
+)
+from app.infrastructure.services.export_admission_service import ADMIT_JOB, ADMIT_REJECT, ExportAdmissionService
+from app.infrastructure.services.export_cache_service import ExportCacheService
+from app.infrastructure.services.export_coalescing_service import ExportCoalescingService
+from app.infrastructure.services.export_job_service import ExportJobError, ExportJobService
+from app.infrastructure.services.report_archive_service import ArchiveStats, ReportArchiveService
+from app.infrastructure.services.report_downsampling_service import ReportDownsamplingService, ReportNotChartableError
+from app.infrastructure.services.report_ndjson_service import ReportNdjsonService, negotiate_encoding
+from app.infrastructure.services.workplace_loader import WorkplaceLoader
 from app.api.security import get_current_user_id_from_api_key # ADD THIS LINE
 
 router = APIRouter()
@@ -22,21 +43,63 @@ def default_start_date_param():
 def default_end_date_param():
     return date.today()
 
-# Temporary direct instantiation of use case with mock adapters
-# In a real app, this would use FastAPI's dependency injection system
-# to provide port implementations.
-def get_generate_dashboard_report_use_case():
-    # This is a simplified DI for now.
-    # Ideally, ports are bound to implementations elsewhere (e.g., in main.py or a container)
-    workplace_port = MockWorkplaceAdapter()
-    report_port = MockReportAdapter()
-    return GenerateDashboardReportUseCase(workplace_port=workplace_port, report_port=report_port)
+
+def _report_query_params(default_period: str):
+    """Dependency reading a report request's workplaces, dates and period from the query string."""
+    def report_query_params(
+        workplace_ids: Optional[str] = Query(None, description="Comma-separated workplace_ids. All accessible if not provided."),
+        start_date: date = Query(default_factory=default_start_date_param, description="Start date (YYYY-MM-DD). Default: 1 year ago."),
+        end_date: date = Query(default_factory=default_end_date_param, description="End date (YYYY-MM-DD). Default: today."),
+        period: str = Query(default_period, description=f"Group data by: day, week, month, year. Default: {default_period}."),
+    ) -> ReportRequestParams:
+        return ReportRequestParams(
+            workplace_ids=[wp_id.strip() for wp_id in workplace_ids.split(',')] if workplace_ids else [],
+            start_date=start_date,
+            end_date=end_date,
+            period=period,
+            reports=[],
+        )
+    return report_query_params
+
+def reports_query_params(
+    params: ReportRequestParams = Depends(_report_query_params("month")),
+    reports: str = Query(..., description="Comma-separated report keys (e.g., activity_summary,item_statistics)."),
+) -> ReportRequestParams:
+    """Query parameters of the multi-report endpoints (exporter, stream)."""
+    parsed_report_keys = [key.strip() for key in reports.split(',') if key.strip()]
+    if not parsed_report_keys:
+        raise HTTPException(status_code=400, detail="The 'reports' query parameter cannot be empty.")
+    return params.copy(update={"reports": parsed_report_keys})
+
+def _report_path_params(default_period: str):
+    """Dependency for the single-report endpoints, whose report key is in the path."""
+    def report_path_params(
+        report_key: str, params: ReportRequestParams = Depends(_report_query_params(default_period))
+    ) -> ReportRequestParams:
+        return params.copy(update={"reports": [report_key]})
+    return report_path_params
+
+async def _resolve_params(
+    use_case: GenerateDashboardReportUseCase, params: ReportRequestParams, user_id: str
+) -> ReportRequestParams:
+    """Effective parameters for the user (see resolve_params); 400 on unknown reports, 404 when nothing is left."""
+    try:
+        effective_params = await use_case.resolve_params(params=params, user_id=user_id)
+    except UnknownReportError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    if effective_params is None:
+        raise HTTPException(status_code=404, detail="No data found for the requested reports or parameters.")
+    return effective_params
 
 
 @router.get(
     "/dashboard/data/exporter",
     summary="Export dashboard data as a ZIP file",
-    description="Generates selected reports for specified workplaces and period, then returns them as a ZIP archive.",
+    description=(
+        "Generates selected reports for specified workplaces and period, then returns them as a ZIP archive. "
+        "Only archives served from the export cache (`X-Export-Cache: hit`) carry an `ETag` for `If-None-Match`: "
+        "the first, streamed response cannot, as the ETag is a digest of bytes not yet sent."
+    ),
     response_description="A ZIP file containing the requested reports in CSV format."
     # In OpenAPI, explicitly defining response for zip might be tricky.
     # FastAPI will handle StreamingResponse correctly.
@@ -44,78 +107,373 @@ def get_generate_dashboard_report_use_case():
 )
 async def export_dashboard_data(
     request: Request, # To get user if auth is implemented via request state
-    workplace_ids: Optional[str] = Query(None, description="Comma-separated workplace_ids. All accessible if not provided."),
-    start_date: date = Query(default_factory=default_start_date_param, description="Start date (YYYY-MM-DD). Default: 1 year ago."),
-    end_date: date = Query(default_factory=default_end_date_param, description="End date (YYYY-MM-DD). Default: today."),
-    period: str = Query("month", description="Group data by: day, week, month, year. Default: month."),
-    reports: str = Query(..., description="Comma-separated report keys to export (e.g., activity_summary,item_statistics)."),
+    request_params: ReportRequestParams = Depends(reports_query_params),
     use_case: GenerateDashboardReportUseCase = Depends(get_generate_dashboard_report_use_case),
+    archive_service: ReportArchiveService = Depends(get_report_archive_service),
+    export_cache: Optional[ExportCacheService] = Depends(get_export_cache_service),
+    coalescer: Optional[ExportCoalescingService] = Depends(get_export_coalescing_service),
+    admission: ExportAdmissionService = Depends(get_export_admission_service),
+    job_service: ExportJobService = Depends(get_export_job_service),
     current_user_id: str = Depends(get_current_user_id_from_api_key) # ADD THIS LINE
 ):
-    parsed_workplace_ids = [wp_id.strip() for wp_id in workplace_ids.split(',')] if workplace_ids else []
-    parsed_report_keys = [key.strip() for key in reports.split(',')]
-    
-    if not parsed_report_keys:
-        raise HTTPException(status_code=400, detail="The 'reports' query parameter cannot be empty.")
+    return await _export_archive(
+        request, request_params, use_case, archive_service, export_cache, coalescer, admission, job_service, current_user_id
+    )
 
-    request_params = ReportRequestParams(
-        workplace_ids=parsed_workplace_ids,
-        start_date=start_date,
-        end_date=end_date,
-        period=period,
-        reports=parsed_report_keys
+
+@router.post(
+    "/dashboard/data/exporter",
+    summary="Export dashboard data as a ZIP file (parameters in the body)",
+    description=(
+        "Same export as the GET exporter, with the parameters as a JSON body: `workplace_ids` "
+        "and `reports` are lists, so requests for thousands of workplaces are not limited by URL length."
+    ),
+    response_description="A ZIP file containing the requested reports in CSV format.",
+)
+async def export_dashboard_data_from_body(
+    request: Request,
+    params: ReportRequestParams,
+    use_case: GenerateDashboardReportUseCase = Depends(get_generate_dashboard_report_use_case),
+    archive_service: ReportArchiveService = Depends(get_report_archive_service),
+    export_cache: Optional[ExportCacheService] = Depends(get_export_cache_service),
+    coalescer: Optional[ExportCoalescingService] = Depends(get_export_coalescing_service),
+    admission: ExportAdmissionService = Depends(get_export_admission_service),
+    job_service: ExportJobService = Depends(get_export_job_service),
+    current_user_id: str = Depends(get_current_user_id_from_api_key),
+):
+    parsed_report_keys = [key.strip() for key in params.reports if key.strip()]
+    if not parsed_report_keys:
+        raise HTTPException(status_code=400, detail="The 'reports' list cannot be empty.")
+    request_params = params.copy(update={"reports": parsed_report_keys})
+    return await _export_archive(
+        request, request_params, use_case, archive_service, export_cache, coalescer, admission, job_service, current_user_id
     )
 
+
+async def _export_archive(
+    request: Request,
+    request_params: ReportRequestParams,
+    use_case: GenerateDashboardReportUseCase,
+    archive_service: ReportArchiveService,
+    export_cache: Optional[ExportCacheService],
+    coalescer: Optional[ExportCoalescingService],
+    admission: ExportAdmissionService,
+    job_service: ExportJobService,
+    current_user_id: str,
+):
     # Placeholder for user ID - replace with actual auth if available
     # For now, using a mock user or None
     # mock_user_id = "user123" # Or extract from request.state.user if auth middleware sets it # REMOVE THIS
-    
-    generated_report_data: GeneratedReport = await use_case.execute(params=request_params, user_id=current_user_id) # USE current_user_id
-
-    if not generated_report_data.files:
-        # This case should ideally be handled by the use case returning specific error files
-        # but as a fallback:
-        raise HTTPException(status_code=404, detail="No data found for the requested reports or parameters.")
 
-    zip_io = io.BytesIO()
-    with zipfile.ZipFile(zip_io, mode="w", compression=zipfile.ZIP_DEFLATED) as zip_file:
-        for report_file_model in generated_report_data.files:
-            file_content = report_file_model.content
-            file_name = report_file_model.filename
-
-            if report_file_model.content_type == "text/csv" and isinstance(file_content, list) and file_content:
-                # Convert list of dicts to CSV string
-                csv_io = io.StringIO()
-                if isinstance(file_content[0], dict): # Ensure it's list of dicts
-                    writer = csv.DictWriter(csv_io, fieldnames=file_content[0].keys())
-                    writer.writeheader()
-                    writer.writerows(file_content)
-                else: # Fallback for simple list of strings or other non-dict list
-                    writer = csv.writer(csv_io)
-                    writer.writerows(file_content) # Assumes list of lists/tuples
-                
-                zip_file.writestr(file_name, csv_io.getvalue())
-                csv_io.close()
-            elif report_file_model.content_type == "text/plain" and isinstance(file_content, str):
-                zip_file.writestr(file_name, file_content)
-            else:
-                # Fallback for other content types or if content is already bytes
-                if isinstance(file_content, bytes):
-                    zip_file.writestr(file_name, file_content)
-                elif isinstance(file_content, str): # Default to encode string content
-                    zip_file.writestr(file_name, file_content.encode('utf-8'))
-                else:
-                    # Skip or log unsupported content for zipping
-                    print(f"Skipping file {file_name} due to unsupported content type for zipping.")
-
-
-    zip_io.seek(0)
-    
     # Define the filename for the downloaded zip file
     zip_filename = f"dashboard_export_{date.today().strftime('%Y%m%d')}.zip"
-    
+    headers = {"Content-Disposition": f"attachment; filename={zip_filename}"}
+
+    effective_params = await _resolve_params(use_case, request_params, current_user_id)
+
+    # Admission control, sized from the report schemas before anything is generated
+    estimate = await use_case.estimate_cost(effective_params)
+    estimate_headers = admission.headers(estimate)
+    headers.update(estimate_headers)
+    admission_decision = admission.admit(estimate)
+    if admission_decision == ADMIT_REJECT:
+        raise _export_too_large(estimate, estimate_headers)
+
+    # Identical effective parameters (whoever asks) share one cached archive
+    fingerprint = effective_params.fingerprint()
+    if export_cache:
+        cached_etag = await export_cache.get_etag(fingerprint)
+        if cached_etag and export_cache.etag_matches(request.headers.get("if-none-match"), cached_etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": cached_etag})
+        cached_export = await export_cache.get(fingerprint)
+        if cached_export:
+            return Response(
+                content=cached_export.content,
+                media_type="application/zip",
+                headers={**headers, "ETag": cached_export.etag, "X-Export-Cache": "hit"},
+            )
+
+    if admission_decision == ADMIT_JOB:
+        # Too large to build while the client waits: same export as a background job
+        try:
+            job = await job_service.submit(effective_params, user_id=current_user_id)
+        except ExportJobError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"}) from e
+        job_view = _export_job_view(job, request)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=jsonable_encoder(job_view),
+            headers={**estimate_headers, "Location": job_view["status_url"]},
+        )
+
+    async def start_export():
+        generated_report_data: GeneratedReport = await use_case.generate(params=effective_params)
+
+        if not generated_report_data.files:
+            # This case should ideally be handled by the use case returning specific error files
+            # but as a fallback:
+            raise HTTPException(status_code=404, detail="No data found for the requested reports or parameters.")
+
+        # The archive is produced while it is being sent: local headers, deflated
+        # chunks and the central directory go out as soon as they are ready.
+        archive_stats = ArchiveStats()
+        archive_stream = archive_service.stream(generated_report_data, stats=archive_stats)
+        export_headers = {}
+        if export_cache:
+            # No ETag yet: it is derived from the archive bytes, known once they are all sent
+            export_headers = {"X-Export-Cache": "miss"}
+            # Only complete archives are cached: not if any report ended up as an error file
+            archive_stream = export_cache.tee(
+                fingerprint,
+                archive_stream,
+                is_cacheable=lambda: not generated_report_data.failed_reports and not archive_stats.failed_files,
+            )
+        return export_headers, archive_stream
+
+    if coalescer:
+        # Concurrent requests with the same fingerprint share one generation and one archive
+        export_headers, archive_stream, leader = await coalescer.join(fingerprint, start_export)
+        if not leader:
+            export_headers["X-Export-Coalesced"] = "true"
+    else:
+        export_headers, archive_stream = await start_export()
+    headers.update(export_headers)
+
     return StreamingResponse(
-        zip_io,
+        archive_stream,
         media_type="application/zip",
-        headers={"Content-Disposition": f"attachment; filename={zip_filename}"}
+        headers=headers,
+    )
+
+
+@router.get(
+    "/dashboard/data/stream",
+    summary="Stream dashboard report rows as NDJSON",
+    description=(
+        "Streams the rows of the selected reports as newline-delimited JSON, one object per row "
+        "with a `report` field, in the order the reports were requested. The body is gzip- or "
+        "zstd-encoded when the client's Accept-Encoding allows it."
+    ),
+    response_description="application/x-ndjson, one JSON object per line.",
+)
+async def stream_dashboard_data(
+    request: Request,
+    request_params: ReportRequestParams = Depends(reports_query_params),
+    use_case: GenerateDashboardReportUseCase = Depends(get_generate_dashboard_report_use_case),
+    ndjson_service: ReportNdjsonService = Depends(get_report_ndjson_service),
+    current_user_id: str = Depends(get_current_user_id_from_api_key),
+):
+    effective_params = await _resolve_params(use_case, request_params, current_user_id)
+
+    generated_report_data: GeneratedReport = await use_case.generate(params=effective_params)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    # Rows are encoded as the client reads them: a slow client slows generation down
+    # instead of rows piling up in memory
+    return StreamingResponse(
+        ndjson_service.stream(effective_params.reports, generated_report_data, encoding=encoding),
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
+
+
+def _export_too_large(estimate: ReportCostEstimate, estimate_headers: dict) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=(
+            f"The export is too large (about {estimate.rows} rows, {estimate.bytes} bytes of CSV). "
+            "Narrow the date range, use a coarser period or request fewer workplaces or reports."
+        ),
+        headers=estimate_headers,
     )
+
+
+def _encode_page_cursor(key: ReportRowKey, fingerprint: str) -> str:
+    # Opaque to clients; bound to the query so a cursor cannot be replayed against another one
+    payload = json.dumps([key[0].isoformat(), key[1], fingerprint[:16]]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+def _decode_page_cursor(cursor: str, fingerprint: str) -> ReportRowKey:
+    try:
+        day, workplace_id, query = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if query != fingerprint[:16]:
+            raise ValueError("cursor belongs to another query")
+        return date.fromisoformat(day), str(workplace_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid 'cursor' for these parameters.") from None
+
+
+@router.get(
+    "/dashboard/data/reports/{report_key}",
+    summary="Page through one dashboard report as JSON",
+    description=(
+        "Returns up to `limit` rows of one report, ordered by date then workplace_id. "
+        "Pass the returned `next_cursor` to get the following page; it is null on the last page."
+    ),
+)
+async def get_dashboard_report_page(
+    report_key: str,
+    request_params: ReportRequestParams = Depends(_report_path_params("month")),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of rows in the page."),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page."),
+    use_case: GenerateDashboardReportUseCase = Depends(get_generate_dashboard_report_use_case),
+    current_user_id: str = Depends(get_current_user_id_from_api_key),
+):
+    effective_params = await _resolve_params(use_case, request_params, current_user_id)
+
+    fingerprint = effective_params.fingerprint()
+    after = _decode_page_cursor(cursor, fingerprint) if cursor else None
+    try:
+        page = await use_case.get_report_page(effective_params, after=after, limit=limit)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Report '{report_key}' did not respond in time.") from None
+
+    return {
+        "report": report_key,
+        "columns": page.columns,
+        "rows": [list(row) for row in page.rows],
+        "next_cursor": _encode_page_cursor(page.next_key, fingerprint) if page.next_key else None,
+    }
+
+
+@router.get(
+    "/dashboard/data/charts/{report_key}",
+    summary="Get one dashboard report as downsampled chart series",
+    description=(
+        "Returns one series per workplace and numeric column of the report, each reduced to at "
+        "most `points` points with Largest-Triangle-Three-Buckets, which keeps the shape of the "
+        "series (peaks and troughs) at a fraction of the rows."
+    ),
+)
+async def get_dashboard_report_chart(
+    report_key: str,
+    request_params: ReportRequestParams = Depends(_report_path_params("day")),
+    points: int = Query(500, ge=3, le=10000, description="Maximum number of points per series."),
+    use_case: GenerateDashboardReportUseCase = Depends(get_generate_dashboard_report_use_case),
+    downsampling_service: ReportDownsamplingService = Depends(get_report_downsampling_service),
+    workplace_loader: WorkplaceLoader = Depends(get_workplace_loader),
+    current_user_id: str = Depends(get_current_user_id_from_api_key),
+):
+    effective_params = await _resolve_params(use_case, request_params, current_user_id)
+
+    generated_report_data: GeneratedReport = await use_case.generate(params=effective_params)
+    content = generated_report_data.files[0].content
+    if report_key in generated_report_data.failed_reports:
+        raise HTTPException(status_code=502, detail=content)
+    series = []
+    if not isinstance(content, str): # Otherwise there is no data to chart
+        try:
+            series = await downsampling_service.downsample(content, effective_params.workplace_ids, points)
+        except ReportNotChartableError as e:
+            raise HTTPException(status_code=400, detail=f"Report '{report_key}' cannot be charted: {e}") from e
+
+    # Series labels: every lookup below goes out as one batched workplace query
+    workplaces = await asyncio.gather(*[workplace_loader.load(s["workplace_id"]) for s in series])
+    for chart_series, workplace in zip(series, workplaces, strict=True):
+        chart_series["workplace_name"] = workplace.name if workplace else None
+
+    return {"report": report_key, "period": effective_params.period, "points": points, "series": series}
+
+
+def _export_job_view(job: ExportJob, request: Request) -> dict:
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "progress": round(job.progress, 4),
+        "files_done": job.files_done,
+        "files_total": job.files_total,
+        "size_bytes": job.size_bytes,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+        "status_url": str(request.url_for("get_export_job", job_id=job.job_id)),
+        "download_url": str(request.url_for("download_export_job", job_id=job.job_id)),
+    }
+
+async def _get_owned_job(job_id: str, user_id: str, job_service: ExportJobService) -> ExportJob:
+    job = await job_service.get_job(job_id)
+    # Jobs are only visible to the users who requested them; unknown and foreign ids look alike
+    if job is None or user_id not in job.owner_ids:
+        raise HTTPException(status_code=404, detail="Export job not found or expired.")
+    return job
+
+
+@router.post(
+    "/dashboard/data/exports",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Start a background dashboard export",
+    description="Queues the export described in the body and returns a job to poll. Identical in-flight exports are shared.",
+)
+async def create_export_job(
+    request: Request,
+    params: ReportRequestParams,
+    response: Response,
+    use_case: GenerateDashboardReportUseCase = Depends(get_generate_dashboard_report_use_case),
+    job_service: ExportJobService = Depends(get_export_job_service),
+    admission: ExportAdmissionService = Depends(get_export_admission_service),
+    current_user_id: str = Depends(get_current_user_id_from_api_key),
+):
+    if not [key for key in params.reports if key.strip()]:
+        raise HTTPException(status_code=400, detail="The 'reports' list cannot be empty.")
+
+    effective_params = await _resolve_params(use_case, params, current_user_id)
+
+    estimate = await use_case.estimate_cost(effective_params)
+    estimate_headers = admission.headers(estimate)
+    if admission.admit(estimate, background=True) == ADMIT_REJECT:
+        raise _export_too_large(estimate, estimate_headers)
+
+    try:
+        job = await job_service.submit(effective_params, user_id=current_user_id)
+    except ExportJobError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"}) from e
+
+    job_view = _export_job_view(job, request)
+    response.headers["Location"] = job_view["status_url"]
+    response.headers.update(estimate_headers)
+    return job_view
+
+@router.get(
+    "/dashboard/data/exports/{job_id}",
+    name="get_export_job",
+    summary="Get the status of a background export",
+)
+async def get_export_job(
+    job_id: str,
+    request: Request,
+    job_service: ExportJobService = Depends(get_export_job_service),
+    current_user_id: str = Depends(get_current_user_id_from_api_key),
+):
+    job = await _get_owned_job(job_id, current_user_id, job_service)
+    return _export_job_view(job, request)
+
+@router.get(
+    "/dashboard/data/exports/{job_id}/download",
+    name="download_export_job",
+    summary="Download the archive of a finished background export",
+    response_description="A ZIP file containing the requested reports in CSV format.",
+)
+async def download_export_job(
+    job_id: str,
+    job_service: ExportJobService = Depends(get_export_job_service),
+    current_user_id: str = Depends(get_current_user_id_from_api_key),
+):
+    job = await _get_owned_job(job_id, current_user_id, job_service)
+    if job.status == EXPORT_JOB_FAILED:
+        raise HTTPException(status_code=409, detail=f"Export job failed: {job.error}")
+    if not job.is_finished:
+        raise HTTPException(status_code=409, detail=f"Export job is still {job.status}.", headers={"Retry-After": "2"})
+
+    spool_path = job_service.spool_path(job.job_id)
+    try:
+        return FileResponse(
+            spool_path,
+            media_type="application/zip",
+            filename=f"dashboard_export_{job.created_at.strftime('%Y%m%d')}_{job.job_id[:8]}.zip",
+            stat_result=os.stat(spool_path),
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Export archive has expired.") from None
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Query
+
+from app.api.dependencies import get_search_workplaces_use_case
+from app.api.security import get_current_user_id_from_api_key
+from app.core.use_cases.search_workplaces_use_case import SearchWorkplacesUseCase
+
+router = APIRouter()
+
+
+@router.get(
+    "/workplaces/search",
+    summary="Search accessible workplaces by name",
+    description=(
+        "Returns up to `limit` workplaces the caller can access whose name contains every word of `q` "
+        "(case- and accent-insensitive), best matches first: exact name, name prefix, word prefix, then others."
+    ),
+)
+async def search_workplaces(
+    q: str = Query(
+        ..., min_length=1, max_length=100, description="Text typed by the user."
+    ),
+    limit: int = Query(
+        10, ge=1, le=100, description="Maximum number of workplaces returned."
+    ),
+    use_case: SearchWorkplacesUseCase = Depends(get_search_workplaces_use_case),
+    current_user_id: str = Depends(get_current_user_id_from_api_key),
+):
+    workplaces = await use_case.execute(q, user_id=current_user_id, limit=limit)
+    return {
+        "query": q,
+        "workplaces": [
+            {"id": workplace.id, "name": workplace.name} for workplace in workplaces
+        ],
+    }
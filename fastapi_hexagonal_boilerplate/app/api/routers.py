@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 from .endpoints import home # Assuming home is still there
 from .endpoints import dashboard # New import
+from .endpoints import workplaces
 
 api_router = APIRouter()
 
@@ -9,3 +10,4 @@ api_router.include_router(home.router, tags=["Home"])
 
 # Include the new dashboard router
 api_router.include_router(dashboard.router, prefix="/api/v1", tags=["Dashboard"]) # Example prefix
+api_router.include_router(workplaces.router, prefix="/api/v1", tags=["Workplaces"])
@@ -1,57 +1,60 @@
-from fastapi import Security, HTTPException, status, Depends
+from fastapi import Security, HTTPException, status, Depends, Request
 from fastapi.security.api_key import APIKeyHeader, APIKeyQuery, APIKeyCookie # Example sources
-import os
+import logging
+
+from app.api.dependencies import SERVER_API_KEY, get_api_key_authenticator
+from app.infrastructure.services.api_key_authenticator import ApiKeyAuthenticator
+
+logger = logging.getLogger(__name__)
 
 # Define where the API key can be passed (e.g., header)
 API_KEY_NAME = "X-API-KEY" # Common header name
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False) # auto_error=False to handle manually
 
-# This is a mock/example valid API key. In a real app, store securely and have multiple.
-# You could load this from environment variables or a secure store.
-VALID_API_KEY = os.getenv("SERVER_API_KEY", "your_secret_api_key_here") 
-# It's good practice to have a different key for a "system user" or internal tasks if needed
-# For now, one key for simplicity.
+# The key registered from the SERVER_API_KEY environment variable. Other keys are
+# resolved to their user through the API key store (see get_api_key_authenticator).
+VALID_API_KEY = SERVER_API_KEY
+
+async def _authenticate(api_key: str, authenticator: ApiKeyAuthenticator) -> str:
+    try:
+        principal = await authenticator.authenticate(api_key)
+    except Exception as e:
+        logger.error(f"API key store unavailable: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication is temporarily unavailable",
+        ) from e
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing API Key",
+        )
+    return principal
 
 async def get_api_key(
+    request: Request,
     api_key_header_value: str = Security(api_key_header),
+    authenticator: ApiKeyAuthenticator = Depends(get_api_key_authenticator),
     # You could also check query params or cookies:
     # api_key_query: str = Security(APIKeyQuery(name="api_key", auto_error=False)),
     # api_key_cookie: str = Security(APIKeyCookie(name="api_key", auto_error=False)),
 ) -> str:
     """
     Dependency to validate the API key.
-    Checks header, then query, then cookie. (Order can be adjusted)
-    Raises HTTPException if no valid key is found.
+    Checks the header against the API key store (see ApiKeyAuthenticator).
+    Raises HTTPException (401) if no valid key is found, 503 if the store cannot be reached.
+    The resolved user is kept on request.state.user_id for the rest of the request.
     """
     # Prioritize header
-    if api_key_header_value and api_key_header_value == VALID_API_KEY:
-        return api_key_header_value
-    
-    # Example for checking query or cookie (if you enabled them above)
-    # if api_key_query and api_key_query == VALID_API_KEY:
-    #     return api_key_query
-    # if api_key_cookie and api_key_cookie == VALID_API_KEY:
-    #     return api_key_cookie
-
-    raise HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Invalid or missing API Key",
-    )
+    request.state.user_id = await _authenticate(api_key_header_value, authenticator)
+    return api_key_header_value
 
 async def get_current_user_id_from_api_key(
-    api_key: str = Depends(get_api_key) # Ensures API key is valid first
+    request: Request,
+    api_key: str = Depends(get_api_key), # Ensures API key is valid first
 ) -> str:
     """
-    Placeholder dependency to get a 'user_id' associated with an API key.
-    In a real system, you would look up the user/entity associated with this key.
-    For this mock, we'll return a static user_id if the key is valid.
+    Dependency to get the 'user_id' associated with an API key.
+    Reads the user get_api_key resolved: the key is authenticated once per request.
     """
-    if api_key == VALID_API_KEY:
-        # This would be a lookup in a real system, e.g., key -> user mapping
-        return "user_from_api_key_abc123" 
-    
-    # This part should ideally not be reached if get_api_key works correctly
-    raise HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not identify user from API Key",
-    )
+    return request.state.user_id
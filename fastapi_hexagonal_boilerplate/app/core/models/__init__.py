@@ -1,9 +1,27 @@
 from .workplace import Workplace
-from .report import ReportRequestParams, GeneratedReport, ReportFile
+from .report import (
+    ReportRequestParams,
+    GeneratedReport,
+    ReportFile,
+    ReportRowStream,
+    ColumnarBatch,
+    ReportColumn,
+    ReportSchema,
+    ReportPage,
+    ReportCostEstimate,
+)
+from .export_job import ExportJob
 
 __all__ = [
     "Workplace",
     "ReportRequestParams",
     "GeneratedReport",
     "ReportFile",
+    "ReportRowStream",
+    "ColumnarBatch",
+    "ReportColumn",
+    "ReportSchema",
+    "ReportPage",
+    "ReportCostEstimate",
+    "ExportJob",
 ]
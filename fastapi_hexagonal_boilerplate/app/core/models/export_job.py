@@ -0,0 +1,51 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+from .report import ReportRequestParams
+
+# Lifecycle of an export job
+EXPORT_JOB_QUEUED = "queued"
+EXPORT_JOB_RUNNING = "running"
+EXPORT_JOB_SUCCEEDED = "succeeded"
+EXPORT_JOB_FAILED = "failed"
+
+
+class ExportJob(BaseModel):
+    job_id: str = Field(..., description="Opaque identifier of the job")
+    fingerprint: str = Field(
+        ..., description="Fingerprint of the effective report parameters"
+    )
+    params: ReportRequestParams = Field(
+        ..., description="Effective parameters the export is generated with"
+    )
+    status: str = Field(
+        default=EXPORT_JOB_QUEUED, description="queued, running, succeeded or failed"
+    )
+    files_total: int = Field(
+        default=0, description="Number of report files the archive will contain"
+    )
+    files_done: int = Field(
+        default=0, description="Number of report files already written"
+    )
+    size_bytes: Optional[int] = Field(
+        default=None, description="Archive size once the job has succeeded"
+    )
+    error: Optional[str] = Field(
+        default=None, description="Failure reason when status is 'failed'"
+    )
+    owner_ids: List[str] = Field(
+        default_factory=list, description="Users who requested this export"
+    )
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+    @property
+    def progress(self) -> float:
+        if self.status == EXPORT_JOB_SUCCEEDED:
+            return 1.0
+        return self.files_done / self.files_total if self.files_total else 0.0
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (EXPORT_JOB_SUCCEEDED, EXPORT_JOB_FAILED)
@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Any
+from typing import Optional, List, Any, AsyncIterator, Dict, Iterator, Sequence, Tuple, Union
 from datetime import date, timedelta
+import hashlib
+import json
 
 # Helper function for default dates
 def default_start_date():
@@ -22,12 +24,185 @@ class ReportRequestParams(BaseModel):
         # }
         # For now, we'll handle comma-separated string to list conversion in the endpoint.
 
+    def fingerprint(self) -> str:
+        """
+        Stable SHA-256 hex digest of the parameters, usable as a cache key.
+        Callers are expected to normalize first (see GenerateDashboardReportUseCase.resolve_params):
+        list order is significant here because it determines the layout of the export.
+        """
+        canonical = json.dumps(
+            {
+                "workplace_ids": list(self.workplace_ids or []),
+                "start_date": self.start_date.isoformat(),
+                "end_date": self.end_date.isoformat(),
+                "period": self.period,
+                "reports": list(self.reports),
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+# Column types a report schema may declare
+REPORT_COLUMN_DTYPES = ("date", "string", "int", "float")
+
+class ReportColumn(BaseModel):
+    name: str = Field(..., description="Column name, used as the CSV header")
+    dtype: str = Field(default="string", description="One of: date, string, int, float")
+
+class ReportSchema(BaseModel):
+    key: str = Field(..., description="Report key, as requested in ReportRequestParams.reports")
+    columns: List[ReportColumn] = Field(default_factory=list, description="Columns in output order; empty when not known up front")
+
+    @property
+    def column_names(self) -> List[str]:
+        return [column.name for column in self.columns]
+
+class ColumnarBatch:
+    """
+    Report rows stored column by column: the column names once, and one sequence per
+    column (a list, an array.array or a NumPy array) instead of one dict per row.
+    Slicing keeps the column sequences' own semantics (NumPy slices are views), so
+    splitting a report into batches copies nothing.
+
+    `cache_key`, when set by the producer, identifies exactly these rows: consumers may
+    cache what they derive from them (e.g. the encoded CSV) under it. Slices and column
+    selections do not inherit it.
+    """
+    __slots__ = ("columns", "values", "num_rows", "cache_key")
+
+    def __init__(self, columns: List[str], values: Sequence[Sequence[Any]], cache_key: Optional[str] = None):
+        if len(columns) != len(values):
+            raise ValueError(f"Got {len(values)} value sequences for {len(columns)} columns.")
+        lengths = {len(column_values) for column_values in values}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same number of values.")
+        self.columns = list(columns)
+        self.values = list(values)
+        self.num_rows = lengths.pop() if lengths else 0
+        self.cache_key = cache_key
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> "ColumnarBatch":
+        columns = columns if columns is not None else (list(rows[0].keys()) if rows else [])
+        return cls(columns, [[row.get(name) for row in rows] for name in columns])
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def column(self, name: str) -> Sequence[Any]:
+        return self.values[self.columns.index(name)]
+
+    def slice(self, start: int, stop: int) -> "ColumnarBatch":
+        return ColumnarBatch(self.columns, [column_values[start:stop] for column_values in self.values])
+
+    def select(self, columns: List[str]) -> "ColumnarBatch":
+        """Same rows with the given columns, in that order."""
+        if columns == self.columns:
+            return self
+        return ColumnarBatch(columns, [self.column(name) for name in columns])
+
+    def iter_rows(self) -> Iterator[Tuple[Any, ...]]:
+        # tolist() turns NumPy scalars into plain Python values (dates for datetime64[D])
+        plain = [column_values.tolist() if hasattr(column_values, "tolist") else column_values for column_values in self.values]
+        return zip(*plain, strict=True)
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        return [dict(zip(self.columns, row, strict=True)) for row in self.iter_rows()]
+
+# One batch of report rows: row dicts, or the same rows column by column
+ReportBatch = Union[List[Dict[str, Any]], ColumnarBatch]
+
+# Keyset position of a report row: its (date, workplace_id). Report rows are ordered by it.
+ReportRowKey = Tuple[date, str]
+
+
+class ReportPage:
+    """
+    One page of a report (see ReportPort.fetch_report_page): the column names, up to
+    `limit` rows as tuples, and the key of the last row when more rows follow.
+    """
+    __slots__ = ("columns", "rows", "next_key")
+
+    def __init__(self, columns: List[str], rows: List[Tuple[Any, ...]], next_key: Optional[ReportRowKey] = None):
+        self.columns = columns
+        self.rows = rows
+        self.next_key = next_key
+
+class ReportCostEstimate:
+    """
+    Expected size of an export before it runs (see GenerateDashboardReportUseCase.estimate_cost):
+    calendar buckets in the range, CSV rows over all reports and uncompressed CSV bytes.
+    """
+    __slots__ = ("buckets", "rows", "bytes")
+
+    def __init__(self, buckets: int, rows: int, bytes: int):
+        self.buckets = buckets
+        self.rows = rows
+        self.bytes = bytes
+
+class ReportRowStream:
+    """
+    Report rows produced lazily: the column names are declared up front and the rows
+    arrive as an async iterator of batches (ColumnarBatch, or lists of dicts keyed by
+    those columns). Consumers can start encoding the first batch while later ones are
+    still being produced.
+    """
+    __slots__ = ("columns", "batches")
+
+    def __init__(self, columns: List[str], batches: AsyncIterator[ReportBatch]):
+        self.columns = columns
+        self.batches = batches
+
+    def __aiter__(self) -> AsyncIterator[ReportBatch]:
+        return self.batches.__aiter__()
+
+    async def aclose(self) -> None:
+        """Stops the producer; a no-op once the rows are exhausted or for plain iterators."""
+        aclose = getattr(self.batches, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
 class ReportFile(BaseModel):
     filename: str = Field(..., description="Filename for this part of the report (e.g., 'activity_summary.csv')")
-    content: Any = Field(..., description="Data content for this file (e.g., list of dicts for CSV, or string for plain text)")
+    content: Any = Field(..., description="Data content for this file (e.g., ReportRowStream, ColumnarBatch or list of dicts for CSV, or string for plain text)")
     content_type: str = Field(default="text/csv", description="MIME type for the content")
 
 
 class GeneratedReport(BaseModel):
     files: List[ReportFile] = Field(..., description="List of files included in the zipped report")
+    failed_reports: List[str] = Field(default_factory=list, description="Report keys that were replaced by an error file")
+    deferred_files: List[Any] = Field(
+        default_factory=list,
+        exclude=True,
+        description="Futures of the files following `files`, for reports still waiting for a generation slot",
+    )
+
+    async def iter_files(self) -> AsyncIterator[ReportFile]:
+        """
+        Every file in order: `files`, then each deferred one once its report has started.
+        A deferred report starts when an earlier report's rows are exhausted or closed, so
+        each file's stream is closed here when the consumer moves on to the next file.
+        """
+        for report_file in self.files:
+            yield report_file
+            await _close_content(report_file)
+        for deferred in self.deferred_files:
+            report_file = await deferred
+            yield report_file
+            await _close_content(report_file)
+
+    async def aclose(self) -> None:
+        """Gives up the reports not consumed yet; consumers stopping early must call it."""
+        for deferred in self.deferred_files:
+            deferred.cancel()
+        for report_file in self.files:
+            await _close_content(report_file)
+        for deferred in self.deferred_files:
+            if deferred.done() and not deferred.cancelled() and deferred.exception() is None:
+                await _close_content(deferred.result())
+
+async def _close_content(report_file: ReportFile) -> None:
+    if isinstance(report_file.content, ReportRowStream):
+        await report_file.content.aclose()
     # metadata: Optional[dict] = None # Could include overall report metadata
@@ -7,6 +7,7 @@ from .report_port import ReportPort
 from .cache_port import CachePort
 from .database_port import DatabasePort
 from .distributed_lock_port import DistributedLockPort
+from .api_key_store_port import ApiKeyStorePort
 
 __all__ = [
     "ExampleServicePort", # Uncomment or remove based on previous state
@@ -15,4 +16,5 @@ __all__ = [
     "CachePort",
     "DatabasePort",
     "DistributedLockPort",
+    "ApiKeyStorePort",
 ]
@@ -0,0 +1,24 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class ApiKeyStorePort(ABC):
+    """
+    Registry of API keys and the principal (user id) each one authenticates.
+
+    Keys are never handled in clear here: stores are addressed by the key's hash (see
+    hash_api_key), so a leaked store does not leak usable keys.
+    """
+
+    @abstractmethod
+    async def get_principal(self, key_hash: str) -> Optional[str]:
+        """The principal of this key, or None if it is unknown or revoked."""
+        pass
+
+    @abstractmethod
+    async def add_key(self, key_hash: str, principal: str) -> None:
+        pass
+
+    @abstractmethod
+    async def revoke_key(self, key_hash: str) -> None:
+        pass
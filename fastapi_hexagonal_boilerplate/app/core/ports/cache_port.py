@@ -1,3 +1,4 @@
+import json
 from abc import ABC, abstractmethod
 from typing import Any, Optional
 
@@ -17,3 +18,19 @@ class CachePort(ABC):
     @abstractmethod
     async def exists(self, key: str) -> bool:
         pass
+
+
+def load_cached_json(raw: Any) -> Any:
+    """
+    A JSON value stored with CachePort.set, as read back from any backend: Redis returns
+    the stored string, Memcached may already have decoded the JSON. None if missing or
+    not valid JSON.
+    """
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8")
+    if isinstance(raw, str):
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+    return raw
@@ -1,26 +1,147 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict
-from app.core.models.report import ReportRequestParams
+from typing import Any, AsyncIterator, Dict, List, Optional
+from app.core.models.report import (
+    ColumnarBatch,
+    ReportBatch,
+    ReportPage,
+    ReportRequestParams,
+    ReportRowKey,
+    ReportRowStream,
+    ReportSchema,
+)
+
+class UnknownReportError(ValueError):
+    """Raised when report keys are not known to the report port."""
+
+    def __init__(self, report_keys: List[str]):
+        self.report_keys = report_keys
+        super().__init__(f"Unknown report key(s): {', '.join(report_keys)}")
+
+    def __reduce__(self):
+        # Survives pickling, e.g. when raised by an adapter running in a process pool
+        return type(self), (self.report_keys,)
 
 class ReportPort(ABC):
     """
     Port for generating specific report data.
     """
 
+    # True when stream_reports() produces several reports from one shared scan of the
+    # data, so callers should prefer it over one stream_report_data() call per report.
+    supports_multi_report_scan: bool = False
+
+    async def get_report_schemas(self, report_keys: List[str]) -> List[ReportSchema]:
+        """
+        Resolves the requested report keys to their schemas, in request order, before any
+        data is produced. Raises UnknownReportError listing every key that does not exist.
+
+        The default implementation accepts every key with an unknown (empty) column list;
+        adapters backed by a report catalog should override it.
+        """
+        return [ReportSchema(key=report_key) for report_key in report_keys]
+
     @abstractmethod
     async def generate_report_data(
-        self, 
+        self,
         report_key: str,
         params: ReportRequestParams,
         # accessible_workplace_ids: List[str] # Might be passed by use case after filtering
-    ) -> Any: # Could be List[Dict], pd.DataFrame, etc.
+    ) -> Any: # Could be List[Dict], ColumnarBatch, etc.
         """
         Generates data for a specific report_key based on the request parameters.
-        The structure of the returned data will depend on the report type.
+        The structure of the returned data will depend on the report type; tabular
+        reports are best returned as a ColumnarBatch (no per-row dicts).
         It's expected that the implementation of this port handles data fetching
         and processing for the given report_key.
-        
+
         'accessible_workplace_ids' could be provided by the use case to ensure
         the adapter only fetches data for authorized workplaces.
         """
         pass
+
+    async def stream_report_data(
+        self,
+        report_key: str,
+        params: ReportRequestParams,
+        batch_size: int = 1000,
+    ) -> ReportRowStream:
+        """
+        Streaming variant of generate_report_data.
+        Returns the report's column names up front and an async iterator of row batches,
+        so callers can encode and send rows while the rest are still being produced.
+
+        The default implementation wraps generate_report_data, which still materializes
+        the whole report; adapters that can produce rows incrementally should override it.
+        """
+        data = await self.generate_report_data(report_key=report_key, params=params)
+        if isinstance(data, ColumnarBatch):
+            columns = data.columns
+        else:
+            data = data or []
+            columns = list(data[0].keys()) if data and isinstance(data[0], dict) else []
+
+        async def batches() -> AsyncIterator[ReportBatch]:
+            for start in range(0, len(data), batch_size):
+                yield data.slice(start, start + batch_size) if isinstance(data, ColumnarBatch) else data[start:start + batch_size]
+
+        return ReportRowStream(columns=columns, batches=batches())
+
+    async def stream_reports(
+        self,
+        report_keys: List[str],
+        params: ReportRequestParams,
+        batch_size: int = 1000,
+    ) -> Dict[str, ReportRowStream]:
+        """
+        Multi-report variant of stream_report_data: one stream per requested key.
+        Adapters that can read the data once and fan it out to every report (one query,
+        one pass over the rows) override this and set supports_multi_report_scan.
+
+        The default implementation calls stream_report_data for each key in turn.
+        """
+        return {
+            report_key: await self.stream_report_data(report_key=report_key, params=params, batch_size=batch_size)
+            for report_key in report_keys
+        }
+
+    async def fetch_report_page(
+        self,
+        report_key: str,
+        params: ReportRequestParams,
+        after: Optional[ReportRowKey] = None,
+        limit: int = 100,
+    ) -> ReportPage:
+        """
+        Keyset pagination: at most `limit` rows of the report whose (date, workplace_id)
+        comes after `after` (from the start when None), in report order. The page's
+        next_key is set when more rows follow.
+
+        Relies on report rows being ordered by date then workplace_id, with `date` holding
+        the start of the row's period bucket (params.workplace_ids are sorted by the use
+        case). The default implementation streams the report from the cursor's bucket
+        onwards and stops after limit + 1 rows; adapters that can push the keyset condition
+        and the limit into their query should override it.
+        """
+        if after is not None and after[0] > params.start_date:
+            # A later bucket start: the buckets from there on are the same whole buckets
+            params = params.copy(update={"start_date": after[0]})
+        row_stream = await self.stream_report_data(report_key=report_key, params=params, batch_size=limit + 1)
+        date_index = row_stream.columns.index("date")
+        workplace_index = row_stream.columns.index("workplace_id")
+
+        rows = []
+        try:
+            async for batch in row_stream:
+                batch_rows = batch.iter_rows() if isinstance(batch, ColumnarBatch) else (
+                    tuple(row.get(name) for name in row_stream.columns) for row in batch
+                )
+                for row in batch_rows:
+                    if after is not None and (row[date_index], row[workplace_index]) <= after:
+                        continue
+                    rows.append(row)
+                    if len(rows) > limit:
+                        last = rows[limit - 1]
+                        return ReportPage(row_stream.columns, rows[:limit], (last[date_index], last[workplace_index]))
+        finally:
+            await row_stream.aclose() # Returning mid-stream: the producer must not wait for GC
+        return ReportPage(row_stream.columns, rows)
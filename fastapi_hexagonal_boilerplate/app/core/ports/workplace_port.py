@@ -1,5 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Dict, FrozenSet, Iterable, List, Optional
 from app.core.models.workplace import Workplace
 
 class WorkplacePort(ABC):
@@ -16,9 +17,52 @@ class WorkplacePort(ABC):
         """
         pass
 
+    async def get_accessible_workplace_ids(self, user_id: Optional[str]) -> FrozenSet[str]:
+        """
+        IDs of the workplaces accessible to the given user, for access checks.
+        The default derives them from get_accessible_workplaces; adapters that can answer
+        without loading whole workplaces should override it.
+        """
+        return frozenset(workplace.id for workplace in await self.get_accessible_workplaces(user_id))
+
+    async def filter_accessible_workplace_ids(
+        self, user_id: Optional[str], workplace_ids: Iterable[str]
+    ) -> FrozenSet[str]:
+        """
+        The subset of `workplace_ids` the given user may access. Adapters with an access
+        index can answer without materializing everything the user can access.
+        """
+        return frozenset(workplace_ids) & await self.get_accessible_workplace_ids(user_id)
+
     @abstractmethod
     async def get_workplace_by_id(self, workplace_id: str) -> Optional[Workplace]:
         """
         Retrieves a specific workplace by its ID.
         """
         pass
+
+    async def get_workplaces_by_ids(self, workplace_ids: List[str]) -> Dict[str, Workplace]:
+        """
+        Retrieves several workplaces in one call, keyed by ID; unknown IDs are left out.
+        The default issues one get_workplace_by_id per ID concurrently; adapters backed by
+        a database should override it with a single query.
+        """
+        workplaces = await asyncio.gather(*[self.get_workplace_by_id(workplace_id) for workplace_id in workplace_ids])
+        return {workplace.id: workplace for workplace in workplaces if workplace is not None}
+
+    async def search_workplaces(self, user_id: Optional[str], query: str, limit: int = 10) -> List[Workplace]:
+        """
+        Up to `limit` workplaces accessible to the user whose name matches `query`
+        (case-insensitive, every word of the query must appear), best matches first.
+        The default scans get_accessible_workplaces; adapters should serve it from an index.
+        """
+        terms = query.casefold().split()
+        if not terms:
+            return []
+        matches = [
+            workplace for workplace in await self.get_accessible_workplaces(user_id)
+            if all(term in workplace.name.casefold() for term in terms)
+        ]
+        # Names starting with the query first, then alphabetically
+        matches.sort(key=lambda workplace: (not workplace.name.casefold().startswith(" ".join(terms)), workplace.name.casefold()))
+        return matches[:limit]
@@ -2,8 +2,10 @@
 from .example_use_case import GetDataUseCase 
 
 from .generate_dashboard_report_use_case import GenerateDashboardReportUseCase
+from .search_workplaces_use_case import SearchWorkplacesUseCase
 
 __all__ = [
     "GetDataUseCase", # Kept as example_use_case.py exists
     "GenerateDashboardReportUseCase",
+    "SearchWorkplacesUseCase",
 ]
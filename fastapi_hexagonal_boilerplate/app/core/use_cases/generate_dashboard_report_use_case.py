@@ -1,95 +1,398 @@
-from typing import List, Optional, Dict, Any
-from app.core.models.report import ReportRequestParams, GeneratedReport, ReportFile
-from app.core.models.workplace import Workplace
+from datetime import date, timedelta
+from typing import Callable, Dict, FrozenSet, List, Optional, AsyncIterator, Awaitable, Tuple, TypeVar
+from app.core.models.report import ReportRequestParams, GeneratedReport, ReportFile, ReportRowStream, ReportBatch, ReportPage, ReportRowKey, ReportCostEstimate
 from app.core.ports.workplace_port import WorkplacePort
 from app.core.ports.report_port import ReportPort
+import asyncio
 import logging # For logging
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+def _next_bucket_start(day: date, period: str) -> date:
+    """First day of the calendar bucket after the one containing `day` (unknown periods: month)."""
+    if period == "day":
+        return day + timedelta(days=1)
+    if period == "week":
+        return day + timedelta(days=7 - day.weekday())
+    if period == "year":
+        return date(day.year + 1, 1, 1)
+    return date(day.year + 1, 1, 1) if day.month == 12 else date(day.year, day.month + 1, 1)
+
+
+def partition_date_range(start_date: date, end_date: date, period: str, max_days: int) -> List[Tuple[date, date]]:
+    """
+    Splits [start_date, end_date] into consecutive inclusive ranges of about max_days days.
+    Partitions only end on calendar bucket boundaries of `period`, so no bucket is split
+    between two partitions and concatenating their rows gives the unpartitioned report.
+    A partition holds at least one whole bucket, even when the bucket is longer than max_days.
+    """
+    one_day = timedelta(days=1)
+    partitions: List[Tuple[date, date]] = []
+    partition_start = start_date
+    while partition_start <= end_date:
+        partition_end = _next_bucket_start(partition_start, period) - one_day
+        while partition_end < end_date:
+            bucket_end = _next_bucket_start(partition_end + one_day, period) - one_day
+            if (bucket_end - partition_start).days >= max_days:
+                break
+            partition_end = bucket_end
+        partition_end = min(partition_end, end_date)
+        partitions.append((partition_start, partition_end))
+        partition_start = partition_end + one_day
+    return partitions
+
+
+def count_buckets(start_date: date, end_date: date, period: str) -> int:
+    """Number of calendar buckets of `period` that [start_date, end_date] touches (unknown periods: month)."""
+    if end_date < start_date:
+        return 0
+    if period == "day":
+        return (end_date - start_date).days + 1
+    if period == "week":
+        first_monday = start_date - timedelta(days=start_date.weekday())
+        last_monday = end_date - timedelta(days=end_date.weekday())
+        return (last_monday - first_monday).days // 7 + 1
+    if period == "year":
+        return end_date.year - start_date.year + 1
+    return (end_date.year - start_date.year) * 12 + end_date.month - start_date.month + 1
+
+
+# Typical CSV width of a value of each column dtype, separator included
+_CSV_BYTES_PER_VALUE = {"date": 11, "string": 12, "int": 7, "float": 9}
+
+
+class _SlotHoldingBatches:
+    """
+    Async iterator over a started report's batches that releases the report's generation
+    slot exactly once: when the batches are exhausted, fail, or are closed, even unread.
+    """
+
+    def __init__(self, batches: AsyncIterator[ReportBatch], semaphore: asyncio.Semaphore):
+        self._batches = batches
+        self._semaphore: Optional[asyncio.Semaphore] = semaphore
+
+    def __aiter__(self) -> "_SlotHoldingBatches":
+        return self
+
+    async def __anext__(self) -> ReportBatch:
+        try:
+            return await self._batches.__anext__()
+        except BaseException: # StopAsyncIteration included
+            self._release()
+            raise
+
+    async def aclose(self) -> None:
+        try:
+            await self._batches.aclose()
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        if self._semaphore is not None:
+            self._semaphore.release()
+            self._semaphore = None
+
+
 class GenerateDashboardReportUseCase:
-    def __init__(self, workplace_port: WorkplacePort, report_port: ReportPort):
+    def __init__(
+        self,
+        workplace_port: WorkplacePort,
+        report_port: ReportPort,
+        max_concurrent_reports: int = 4,
+        report_timeout: Optional[float] = 30.0,
+        partition_days: Optional[int] = None,
+    ):
+        """
+        :param max_concurrent_reports: How many report keys may be generated at the same time.
+        :param report_timeout: Seconds a report may wait on the report port before it is
+                               replaced by an _error.txt file. None disables the deadline.
+        :param partition_days: Date ranges longer than this are generated as several
+                               partitions (see partition_date_range), all requested from the
+                               report port at once, and their rows concatenated in order.
+                               None generates every range in one piece.
+        """
         self.workplace_port = workplace_port
         self.report_port = report_port
+        self.max_concurrent_reports = max(1, max_concurrent_reports)
+        self.report_timeout = report_timeout
+        self.partition_days = partition_days
 
     async def execute(self, params: ReportRequestParams, user_id: Optional[str] = None) -> GeneratedReport:
         logger.info(f"Executing GenerateDashboardReportUseCase for user '{user_id}' with params: {params}")
 
-        accessible_workplaces: List[Workplace] = await self.workplace_port.get_accessible_workplaces(user_id)
-        accessible_workplace_ids: List[str] = [wp.id for wp in accessible_workplaces]
+        effective_params = await self.resolve_params(params, user_id)
+        if effective_params is None:
+            return GeneratedReport(files=[])
+        return await self.generate(effective_params)
+
+    async def resolve_params(
+        self, params: ReportRequestParams, user_id: Optional[str] = None
+    ) -> Optional[ReportRequestParams]:
+        """
+        Applies the access filter and normalizes the request.
+        Returns the parameters the report port will actually be called with, or None when
+        the user can access none of the requested workplaces. Two requests resolving to
+        equal parameters produce the same export, whoever issued them.
+        Raises UnknownReportError (from the report port) before anything else is done
+        when a requested report key does not exist.
+        """
+        report_keys = list(dict.fromkeys(params.reports))
+        await self.report_port.get_report_schemas(report_keys)
 
         # Filter requested workplace_ids against accessible ones
         # If no workplace_ids are requested in params, use all accessible ones.
         if params.workplace_ids:
-            # User requested specific workplaces, check if they have access
-            requested_and_accessible_ids = []
-            for req_id in params.workplace_ids:
-                if req_id not in accessible_workplace_ids:
-                    logger.warning(f"User '{user_id}' requested workplace_id '{req_id}' but does not have access. Skipping.")
-                else:
-                    requested_and_accessible_ids.append(req_id)
-            
+            # User requested specific workplaces, check if they have access. The port
+            # intersects them with the user's access (sets or bitmaps), in linear time even
+            # for requests with thousands of ids.
+            requested_ids = set(params.workplace_ids)
+            requested_and_accessible_ids = await self.workplace_port.filter_accessible_workplace_ids(user_id, requested_ids)
+            denied_ids = requested_ids - requested_and_accessible_ids
+            if denied_ids:
+                logger.warning(
+                    f"User '{user_id}' requested {len(denied_ids)} workplace_id(s) without access, skipping them: "
+                    f"{sorted(denied_ids)[:10]}"
+                )
+
             if not requested_and_accessible_ids:
-                logger.warning(f"User '{user_id}' has no access to any of the specifically requested workplace_ids: {params.workplace_ids}. Returning empty report.")
-                return GeneratedReport(files=[])
-            
+                logger.warning(f"User '{user_id}' has no access to any of the {len(requested_ids)} requested workplace_ids. Returning empty report.")
+                return None
+
             # Update params to only include workplaces they have access to AND requested
             final_workplace_ids_for_report = requested_and_accessible_ids
         else:
             # No specific workplaces requested, use all accessible ones
+            accessible_workplace_ids: FrozenSet[str] = await self.workplace_port.get_accessible_workplace_ids(user_id)
             if not accessible_workplace_ids:
                 logger.warning(f"User '{user_id}' has no accessible workplaces. Returning empty report.")
-                return GeneratedReport(files=[])
+                return None
             final_workplace_ids_for_report = accessible_workplace_ids
 
         # Update params with the filtered list of workplace_ids to be used in report generation
         # This ensures the report_port only receives IDs the user is authorized for and requested (if any)
         # or all accessible if none were specified.
-        params_for_adapter = params.copy(update={"workplace_ids": final_workplace_ids_for_report})
+        # Workplaces are deduplicated and sorted so the same set always yields the same export.
+        return params.copy(update={
+            "workplace_ids": sorted(final_workplace_ids_for_report),
+            "reports": report_keys,
+        })
+
+    async def generate(self, params: ReportRequestParams) -> GeneratedReport:
+        """
+        Generates the reports for parameters already returned by resolve_params.
+        """
+        # Reports are started concurrently so an export pays roughly the slowest backend
+        # latency instead of their sum, but at most max_concurrent_reports are generated at
+        # a time: a report holds its slot until its rows are exhausted, fail or are closed.
+        # The first reports are returned in `files`; the others start as earlier ones are
+        # consumed and are returned as `deferred_files` (see GeneratedReport.iter_files).
+        # Files keep the request order, so the ZIP layout stays deterministic.
+        semaphore = asyncio.Semaphore(self.max_concurrent_reports)
+        partitions = self._partitions(params)
+        scans: List["asyncio.Future[Dict[str, ReportRowStream]]"] = []
+        if len(partitions) > 1 or (self.report_port.supports_multi_report_scan and len(params.reports) > 1):
+            # The port produces every report of a partition from one scan of the data, and
+            # partitions are scanned concurrently (the port may spread them over a process
+            # pool); each report then only waits for its own streams out of them.
+            scans = [
+                asyncio.ensure_future(self.report_port.stream_reports(report_keys=params.reports, params=partition))
+                for partition in partitions
+            ]
+
+        def open_stream(report_key: str) -> Callable[[], Awaitable[ReportRowStream]]:
+            if scans:
+                return lambda: self._from_scans(scans, report_key)
+            return lambda: self.report_port.stream_report_data(report_key=report_key, params=params)
+
+        starts = [
+            asyncio.ensure_future(self._start_report(report_key, params, semaphore, open_stream(report_key)))
+            for report_key in params.reports
+        ]
+        if scans:
+            def cancel_scans(_) -> None:
+                for scan in scans:
+                    if not scan.done():
+                        scan.cancel() # Every report gave up on it (deadline)
+            asyncio.gather(*starts, return_exceptions=True).add_done_callback(cancel_scans)
+
+        head = min(len(starts), self.max_concurrent_reports)
+        try:
+            started = await asyncio.gather(*starts[:head])
+        except BaseException:
+            for start in starts:
+                start.cancel()
+            raise
+        report = GeneratedReport(
+            files=[report_file for report_file, _ in started],
+            failed_reports=[report_key for report_key, (_, ok) in zip(params.reports[:head], started, strict=True) if not ok],
+        )
+        report.deferred_files = [
+            asyncio.ensure_future(self._deferred_file(report, report_key, start))
+            for report_key, start in zip(params.reports[head:], starts[head:], strict=True)
+        ]
+
+        logger.info(f"Report generation started. {len(report.files)} file(s) prepared, {len(report.deferred_files)} deferred.")
+        return report
+
+    async def estimate_cost(self, params: ReportRequestParams) -> ReportCostEstimate:
+        """
+        Estimates the export for parameters already returned by resolve_params without
+        generating anything: one row per bucket, workplace and report, each as wide as the
+        report schema's columns typically are in CSV. Only schemas are read from the port.
+        """
+        buckets = count_buckets(params.start_date, params.end_date, params.period)
+        rows_per_report = buckets * len(params.workplace_ids)
+        schemas = await self.report_port.get_report_schemas(params.reports)
+        csv_bytes = 0
+        for schema in schemas:
+            row_bytes = sum(_CSV_BYTES_PER_VALUE.get(column.dtype, 12) for column in schema.columns)
+            header_bytes = sum(len(column.name) + 1 for column in schema.columns)
+            csv_bytes += header_bytes + rows_per_report * row_bytes
+        return ReportCostEstimate(buckets=buckets, rows=rows_per_report * len(params.reports), bytes=csv_bytes)
+
+    async def get_report_page(
+        self, params: ReportRequestParams, after: Optional[ReportRowKey] = None, limit: int = 100
+    ) -> ReportPage:
+        """
+        One page of the single report in parameters already returned by resolve_params:
+        at most `limit` rows after the `after` keyset position (see ReportPort.fetch_report_page).
+        Raises asyncio.TimeoutError if the report port misses the report deadline.
+        """
+        return await self._with_deadline(
+            self.report_port.fetch_report_page(report_key=params.reports[0], params=params, after=after, limit=limit)
+        )
+
+    async def _start_report(
+        self,
+        report_key: str,
+        params: ReportRequestParams,
+        semaphore: asyncio.Semaphore,
+        open_stream: Callable[[], Awaitable[ReportRowStream]],
+    ) -> Tuple[ReportFile, bool]:
+        """
+        Returns the report's file and whether the report could be generated.
+        Waits for a slot of `semaphore` first; a streamed report keeps it until its rows
+        end, any other outcome releases it on return.
+        """
+        await semaphore.acquire()
+        logger.info(f"Generating data for report key: '{report_key}' with effective workplace_ids: {params.workplace_ids}")
+        streaming = False
+        try:
+            # Data generation is now based on the filtered workplace_ids in params.
+            # Rows are streamed: only the first batch is awaited here, so that empty, slow
+            # or failing reports can still be turned into the .txt files below; the rest
+            # is produced while the exporter encodes and sends what it already has.
+            row_stream: ReportRowStream = await self._with_deadline(open_stream())
+            batch_iterator = row_stream.__aiter__()
+            first_batch = await self._with_deadline(self._first_batch(batch_iterator))
+
+            if first_batch:
+                # Determine filename, e.g., based on report_key and period
+                filename = f"{report_key}_{params.period}_{params.start_date}_to_{params.end_date}.csv"
+                logger.info(f"Started streaming data for report key: '{report_key}'")
+                streaming = True # The stream releases the slot from now on
+                return ReportFile(
+                    filename=filename,
+                    content=ReportRowStream(
+                        columns=row_stream.columns,
+                        batches=_SlotHoldingBatches(self._chain_batches(first_batch, batch_iterator), semaphore),
+                    ),
+                    content_type="text/csv" # Assuming CSV for now
+                ), True
 
-        report_files: List[ReportFile] = []
+            logger.warning(f"No data returned for report key: '{report_key}'")
+            # Optionally add a file indicating no data, or just skip
+            return ReportFile(
+                filename=f"{report_key}_no_data.txt",
+                content=f"No data found for report '{report_key}' with the given parameters.",
+                content_type="text/plain"
+            ), True
 
-        for report_key in params.reports:
-            logger.info(f"Generating data for report key: '{report_key}' with effective workplace_ids: {final_workplace_ids_for_report}")
+        except asyncio.TimeoutError:
+            logger.error(f"Report key '{report_key}' did not produce data within {self.report_timeout}s")
+            return ReportFile(
+                filename=f"{report_key}_error.txt",
+                content=f"Report '{report_key}' timed out after {self.report_timeout} seconds.",
+                content_type="text/plain"
+            ), False
+        except Exception as e:
+            logger.error(f"Error generating report for key '{report_key}': {e}", exc_info=True)
+            # Add a file indicating error for this specific report
+            return ReportFile(
+                filename=f"{report_key}_error.txt",
+                content=f"An error occurred while generating report '{report_key}': {str(e)}",
+                content_type="text/plain"
+            ), False
+        finally:
+            if not streaming:
+                semaphore.release()
+
+    @staticmethod
+    async def _deferred_file(
+        report: GeneratedReport, report_key: str, start: "asyncio.Future[Tuple[ReportFile, bool]]"
+    ) -> ReportFile:
+        report_file, ok = await start
+        if not ok:
+            report.failed_reports.append(report_key)
+        return report_file
+
+    def _partitions(self, params: ReportRequestParams) -> List[ReportRequestParams]:
+        if not self.partition_days or (params.end_date - params.start_date).days < self.partition_days:
+            return [params]
+        return [
+            params.copy(update={"start_date": start_date, "end_date": end_date})
+            for start_date, end_date in partition_date_range(
+                params.start_date, params.end_date, params.period, self.partition_days
+            )
+        ]
+
+    async def _from_scans(
+        self, scans: List["asyncio.Future[Dict[str, ReportRowStream]]"], report_key: str
+    ) -> ReportRowStream:
+        # Shielded: one report hitting its deadline must not cancel the scans the others share
+        partition_streams = [
+            row_streams[report_key] for row_streams in await asyncio.shield(asyncio.gather(*scans))
+        ]
+        if len(partition_streams) == 1:
+            return partition_streams[0]
+        return ReportRowStream(
+            columns=partition_streams[0].columns,
+            batches=self._concat_batches(partition_streams),
+        )
+
+    @staticmethod
+    async def _concat_batches(row_streams: List[ReportRowStream]) -> AsyncIterator[ReportBatch]:
+        for row_stream in row_streams: # Partitions are in date order
+            async for batch in row_stream:
+                yield batch
+
+    async def _with_deadline(self, awaitable: Awaitable[T]) -> T:
+        if self.report_timeout is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, timeout=self.report_timeout)
+
+    @staticmethod
+    async def _first_batch(batch_iterator: AsyncIterator[ReportBatch]) -> Optional[ReportBatch]:
+        async for batch in batch_iterator:
+            if batch:
+                return batch
+        return None
+
+    async def _chain_batches(
+        self, first_batch: ReportBatch, batch_iterator: AsyncIterator[ReportBatch]
+    ) -> AsyncIterator[ReportBatch]:
+        yield first_batch
+        while True:
+            # The deadline bounds each wait on the backend, not the time the consumer
+            # (ultimately the client download) takes between two batches.
             try:
-                # Data generation is now based on filtered workplace_ids in params_for_adapter
-                data_content: Any = await self.report_port.generate_report_data(
-                    report_key=report_key,
-                    params=params_for_adapter 
-                )
-                
-                if data_content:
-                    # Determine filename, e.g., based on report_key and period
-                    filename = f"{report_key}_{params.period}_{params.start_date}_to_{params.end_date}.csv"
-                    report_files.append(
-                        ReportFile(
-                            filename=filename,
-                            content=data_content, # This will be List[Dict] from mock adapter
-                            content_type="text/csv" # Assuming CSV for now
-                        )
-                    )
-                    logger.info(f"Successfully generated data for report key: '{report_key}'")
-                else:
-                    logger.warning(f"No data returned for report key: '{report_key}'")
-                    # Optionally add a file indicating no data, or just skip
-                    report_files.append(
-                        ReportFile(
-                            filename=f"{report_key}_no_data.txt",
-                            content=f"No data found for report '{report_key}' with the given parameters.",
-                            content_type="text/plain"
-                        )
-                    )
-
-            except Exception as e:
-                logger.error(f"Error generating report for key '{report_key}': {e}", exc_info=True)
-                # Add a file indicating error for this specific report
-                report_files.append(
-                    ReportFile(
-                        filename=f"{report_key}_error.txt",
-                        content=f"An error occurred while generating report '{report_key}': {str(e)}",
-                        content_type="text/plain"
-                    )
-                )
-        
-        logger.info(f"Report generation complete. {len(report_files)} file(s) prepared.")
-        return GeneratedReport(files=report_files)
+                batch = await self._with_deadline(batch_iterator.__anext__())
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                raise asyncio.TimeoutError(f"No data received for more than {self.report_timeout} seconds.") from None
+            if batch:
+                yield batch
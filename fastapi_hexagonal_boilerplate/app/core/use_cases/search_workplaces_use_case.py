@@ -0,0 +1,26 @@
+from typing import List, Optional
+from app.core.models.workplace import Workplace
+from app.core.ports.workplace_port import WorkplacePort
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SearchWorkplacesUseCase:
+    """Finds the workplaces a user may access by name, for type-ahead pickers."""
+
+    def __init__(self, workplace_port: WorkplacePort, max_query_length: int = 100):
+        self.workplace_port = workplace_port
+        self.max_query_length = max_query_length
+
+    async def execute(
+        self, query: str, user_id: Optional[str] = None, limit: int = 10
+    ) -> List[Workplace]:
+        """
+        Up to `limit` accessible workplaces matching `query`, best matches first.
+        Blank queries match nothing; overlong ones are cut to max_query_length characters.
+        """
+        query = query.strip()[: self.max_query_length]
+        if not query:
+            return []
+        return await self.workplace_port.search_workplaces(user_id, query, limit)
@@ -0,0 +1,32 @@
+from typing import Any, Optional
+
+from app.core.ports.api_key_store_port import ApiKeyStorePort
+from app.core.ports.cache_port import CachePort
+
+
+class CacheApiKeyStore(ApiKeyStorePort):
+    """
+    ApiKeyStorePort over a key-value CachePort, typically RedisCacheService: one
+    `<key_prefix><key hash>` entry per key, holding the principal, without expiry.
+    The cache must be persistent (Redis with persistence, not Memcached), since it is
+    the only copy of the keys.
+    """
+
+    def __init__(self, cache: CachePort, key_prefix: str = "api-key:"):
+        self.cache = cache
+        self.key_prefix = key_prefix
+
+    async def get_principal(self, key_hash: str) -> Optional[str]:
+        principal: Any = await self.cache.get(self._key(key_hash))
+        if isinstance(principal, bytes):
+            principal = principal.decode("utf-8")
+        return principal or None
+
+    async def add_key(self, key_hash: str, principal: str) -> None:
+        await self.cache.set(self._key(key_hash), principal)
+
+    async def revoke_key(self, key_hash: str) -> None:
+        await self.cache.delete(self._key(key_hash))
+
+    def _key(self, key_hash: str) -> str:
+        return f"{self.key_prefix}{key_hash}"
@@ -0,0 +1,169 @@
+import json
+import logging
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+from app.core.models.workplace import Workplace
+from app.core.ports.cache_port import CachePort, load_cached_json
+from app.core.ports.workplace_port import WorkplacePort
+from app.infrastructure.services.in_memory_cache_service import InMemoryCacheService
+
+logger = logging.getLogger(__name__)
+
+
+class CachingWorkplaceAdapter(WorkplacePort):
+    """
+    WorkplacePort caching each user's accessible workplace IDs in front of any other one.
+
+    Two levels: a process-local TTL + LRU map of frozensets (a dict lookup per request), and
+    an optional shared CachePort (Redis, Memcached) so worker processes fill each other's
+    misses instead of all calling the source. Shared entries are JSON lists tagged with a
+    generation number; invalidate_all() bumps it, which retires every shared entry at once.
+
+    Call invalidate(user_id) when a user's access changes, invalidate_all() when workplaces
+    or roles change in bulk. Other workers may keep serving their local copy for up to
+    local_ttl_seconds, which bounds how stale a revoked access can be. A lookup still running
+    when this process invalidates is answered but not cached, so it cannot put the access
+    from before the revocation back.
+    Workplace details (get_accessible_workplaces, get_workplace_by_id, get_workplaces_by_ids)
+    and searches are not cached; filter_accessible_workplace_ids uses the local copy when
+    there is one and is otherwise left to the source (e.g. its access index).
+    """
+
+    def __init__(
+        self,
+        source: WorkplacePort,
+        cache: Optional[CachePort] = None,
+        ttl_seconds: int = 300,
+        local_ttl_seconds: int = 30,
+        max_entries: int = 10_000,
+        key_prefix: str = "workplace-access:",
+    ):
+        self.source = source
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self.local_ttl_seconds = local_ttl_seconds
+        self.key_prefix = key_prefix
+        self._local = InMemoryCacheService(max_entries=max_entries)
+        # Bumped by invalidate() and invalidate_all(): a lookup in flight meanwhile is not cached
+        self._invalidations = 0
+
+    async def get_accessible_workplaces(
+        self, user_id: Optional[str]
+    ) -> List[Workplace]:
+        return await self.source.get_accessible_workplaces(user_id)
+
+    async def get_workplace_by_id(self, workplace_id: str) -> Optional[Workplace]:
+        return await self.source.get_workplace_by_id(workplace_id)
+
+    async def get_workplaces_by_ids(
+        self, workplace_ids: List[str]
+    ) -> Dict[str, Workplace]:
+        return await self.source.get_workplaces_by_ids(workplace_ids)
+
+    async def search_workplaces(
+        self, user_id: Optional[str], query: str, limit: int = 10
+    ) -> List[Workplace]:
+        return await self.source.search_workplaces(user_id, query, limit)
+
+    async def get_accessible_workplace_ids(
+        self, user_id: Optional[str]
+    ) -> FrozenSet[str]:
+        key = self._user_key(user_id)
+        workplace_ids = await self._local.get(key)
+        if workplace_ids is not None:
+            return workplace_ids
+
+        invalidations = self._invalidations
+        generation = await self._generation()
+        workplace_ids = await self._shared_get(key, generation)
+        if workplace_ids is None:
+            workplace_ids = await self.source.get_accessible_workplace_ids(user_id)
+            if invalidations != self._invalidations:
+                return workplace_ids  # Possibly from before a revocation: answer, but do not keep it
+            await self._shared_set(
+                key, {"generation": generation, "ids": sorted(workplace_ids)}
+            )
+        if invalidations == self._invalidations:
+            await self._local.set(key, workplace_ids, expire=self.local_ttl_seconds)
+        return workplace_ids
+
+    async def filter_accessible_workplace_ids(
+        self, user_id: Optional[str], workplace_ids: Iterable[str]
+    ) -> FrozenSet[str]:
+        # Intersected with this process's copy when it has one; otherwise the source answers
+        # from its access index instead of materializing (and caching) every accessible ID
+        accessible_ids = await self._local.get(self._user_key(user_id))
+        if accessible_ids is not None:
+            return frozenset(workplace_ids) & accessible_ids
+        return await self.source.filter_accessible_workplace_ids(user_id, workplace_ids)
+
+    async def invalidate(self, user_id: Optional[str]) -> None:
+        """Forgets the accessible workplaces of one user, in this process and in the shared cache."""
+        key = self._user_key(user_id)
+        self._invalidations += 1
+        await self._local.delete(key)
+        if self.cache is not None:
+            try:
+                await self.cache.delete(key)
+            except Exception as e:
+                logger.warning(
+                    f"Could not invalidate workplace access of user {user_id!r}: {e}"
+                )
+
+    async def invalidate_all(self) -> None:
+        """Forgets the accessible workplaces of every user."""
+        self._invalidations += 1
+        self._local = InMemoryCacheService(max_entries=self._local.max_entries)
+        if self.cache is not None:
+            try:
+                await self.cache.set(self._generation_key, await self._generation() + 1)
+            except Exception as e:
+                logger.warning(f"Could not invalidate workplace access: {e}")
+
+    @property
+    def _generation_key(self) -> str:
+        return f"{self.key_prefix}generation"
+
+    def _user_key(self, user_id: Optional[str]) -> str:
+        # None (system access) must not collide with a user literally named "None"
+        return (
+            f"{self.key_prefix}user:{user_id}"
+            if user_id is not None
+            else f"{self.key_prefix}system"
+        )
+
+    async def _generation(self) -> int:
+        if self.cache is None:
+            return 0
+        try:
+            generation: Any = await self.cache.get(self._generation_key)
+        except Exception as e:
+            logger.warning(f"Could not read workplace access generation: {e}")
+            return 0
+        return int(generation) if generation is not None else 0
+
+    async def _shared_get(self, key: str, generation: int) -> Optional[FrozenSet[str]]:
+        if self.cache is None:
+            return None
+        try:
+            raw: Any = await self.cache.get(key)
+        except Exception as e:
+            logger.warning(f"Could not read cached workplace access {key}: {e}")
+            return None  # Asked from the source, like any miss
+        raw = load_cached_json(raw)
+        if (
+            not isinstance(raw, dict)
+            or raw.get("generation") != generation
+            or not isinstance(raw.get("ids"), list)
+        ):
+            return None
+        return frozenset(raw["ids"])
+
+    async def _shared_set(self, key: str, entry: dict) -> None:
+        if self.cache is None:
+            return
+        try:
+            await self.cache.set(key, json.dumps(entry), expire=self.ttl_seconds)
+        except Exception as e:
+            # A cache outage must not fail the request being served
+            logger.warning(f"Could not cache workplace access {key}: {e}")
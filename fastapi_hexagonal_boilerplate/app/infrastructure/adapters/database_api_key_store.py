@@ -0,0 +1,35 @@
+from typing import Optional
+
+from app.core.ports.api_key_store_port import ApiKeyStorePort
+from app.core.ports.database_port import DatabasePort
+
+
+class DatabaseApiKeyStore(ApiKeyStorePort):
+    """
+    ApiKeyStorePort over a DatabasePort (MongoDB, PostgreSQL): one
+    {"key_hash", "principal"} record per key in `collection`, which should have a unique
+    index on key_hash. Revoked keys are deleted.
+    """
+
+    def __init__(self, database: DatabasePort, collection: str = "api_keys"):
+        self.database = database
+        self.collection = collection
+
+    async def get_principal(self, key_hash: str) -> Optional[str]:
+        record = await self.database.find_one(self.collection, {"key_hash": key_hash})
+        return record.get("principal") if record else None
+
+    async def add_key(self, key_hash: str, principal: str) -> None:
+        query = {"key_hash": key_hash}
+        # Not update_one's result: MongoDB reports False when the principal is unchanged
+        if await self.database.find_one(self.collection, query):
+            await self.database.update_one(
+                self.collection, query, {"principal": principal}
+            )
+        else:
+            await self.database.insert(
+                self.collection, {"key_hash": key_hash, "principal": principal}
+            )
+
+    async def revoke_key(self, key_hash: str) -> None:
+        await self.database.delete_many(self.collection, {"key_hash": key_hash})
@@ -0,0 +1,21 @@
+from typing import Dict, Optional
+
+from app.core.ports.api_key_store_port import ApiKeyStorePort
+
+
+class InMemoryApiKeyStore(ApiKeyStorePort):
+    """ApiKeyStorePort over a dict, for tests and single-key deployments."""
+
+    def __init__(self, principals: Optional[Dict[str, str]] = None):
+        self._principals: Dict[str, str] = dict(
+            principals or {}
+        )  # key hash -> principal
+
+    async def get_principal(self, key_hash: str) -> Optional[str]:
+        return self._principals.get(key_hash)
+
+    async def add_key(self, key_hash: str, principal: str) -> None:
+        self._principals[key_hash] = principal
+
+    async def revoke_key(self, key_hash: str) -> None:
+        self._principals.pop(key_hash, None)
@@ -1,75 +1,208 @@
-from typing import Any, List, Dict
-from app.core.models.report import ReportRequestParams
+import asyncio
+from concurrent.futures import Executor
+from datetime import timedelta
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from app.core.models.report import (
+    ColumnarBatch,
+    ReportPage,
+    ReportRequestParams,
+    ReportRowKey,
+    ReportRowStream,
+    ReportSchema,
+)
 from app.core.ports.report_port import ReportPort
-from datetime import timedelta, datetime
+from app.infrastructure.adapters.report_calendar import bucket_starts
+from app.infrastructure.adapters.report_columns import stream_report_batch
+from app.infrastructure.adapters.report_registry import ReportRegistry
+
+# Mock reports: each generator gets the day of month of every day in range and returns
+# the daily value of each metric column, for the whole range at once. `date` and
+# `workplace_id` are filled in by generate_reports_columns.
+MOCK_REPORTS = ReportRegistry()
+
+@MOCK_REPORTS.report("activity_summary", columns=[
+    ("date", "date"), ("workplace_id", "string"), ("visits", "int"), ("new_memberships", "int"),
+])
+def _activity_summary(day: np.ndarray) -> Dict[str, np.ndarray]:
+    return {
+        "visits": 100 + (day % 10) * 10, # Some variance
+        "new_memberships": 5 + (day % 5),
+    }
+
+@MOCK_REPORTS.report("item_statistics", columns=[
+    ("date", "date"), ("workplace_id", "string"), ("items_loaned", "int"), ("items_returned", "int"),
+])
+def _item_statistics(day: np.ndarray) -> Dict[str, np.ndarray]:
+    return {
+        "items_loaned": 500 + (day % 20) * 5,
+        "items_returned": 480 + (day % 20) * 4,
+    }
+
+@MOCK_REPORTS.report("financial_overview", columns=[
+    ("date", "date"), ("workplace_id", "string"),
+    ("revenue_books_usd", "float"), ("revenue_events_usd", "float"), ("late_fees_usd", "float"),
+])
+def _financial_overview(day: np.ndarray) -> Dict[str, np.ndarray]:
+    return {
+        "revenue_books_usd": 1000.00 + (day % 10) * 100,
+        "revenue_events_usd": 200.00 + (day % 5) * 20,
+        "late_fees_usd": 50.00 + (day % 7) * 5,
+    }
+
+# Longest bucket of each period, in days
+_MAX_BUCKET_DAYS = {"day": 1, "week": 7, "month": 31, "year": 366}
+
+
+def _report_days(params: ReportRequestParams) -> np.ndarray:
+    if params.start_date > params.end_date:
+        return np.array([], dtype="datetime64[D]")
+    return np.arange(
+        np.datetime64(params.start_date, "D"), np.datetime64(params.end_date, "D") + 1, dtype="datetime64[D]"
+    )
+
+
+def generate_reports_columns(report_keys: List[str], params: ReportRequestParams) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Builds several mock reports, as columns, from a single scan of the date range.
+
+    Daily values over [start_date, end_date] are summed per calendar bucket (see
+    bucket_starts), so partial first and last buckets only count the days in range.
+    Rows are ordered by bucket, then by workplace; `date` holds the bucket start.
+    Columns follow each registered schema. Raises UnknownReportError for unknown keys.
+
+    The day grid, bucket boundaries and workplace grid are computed once for all
+    reports, the daily metrics of every report are stacked into one matrix and reduced
+    per bucket in one pass, and reports share the `date`/`workplace_id` arrays.
+    """
+    reports = MOCK_REPORTS.resolve(report_keys)
+    days = _report_days(params)
+    day_of_month = (days - days.astype("datetime64[M]").astype("datetime64[D]")).astype(np.int64) + 1
+    # Days are sorted, so each bucket is a contiguous run starting where the bucket start changes
+    day_buckets = bucket_starts(days, params.period)
+    boundaries = np.flatnonzero(np.r_[True, day_buckets[1:] != day_buckets[:-1]]) if len(days) else np.array([], dtype=np.intp)
+    buckets = day_buckets[boundaries]
+
+    workplace_ids = np.asarray(params.workplace_ids or ["all_mocked"], dtype=object) # Use provided or a default
+    # Workplace grid: every bucket repeated once per workplace
+    date_column = np.repeat(buckets, len(workplace_ids))
+    workplace_column = np.tile(workplace_ids, len(buckets))
+
+    metrics = [] # (report key, column) of each stacked metric, in matrix column order
+    daily_values = []
+    for report in reports:
+        daily_metrics = report.generator(day_of_month)
+        for column in report.schema.columns:
+            if column.name not in ("date", "workplace_id"):
+                metrics.append((report.key, column))
+                daily_values.append(daily_metrics[column.name])
+    if len(days) and metrics:
+        totals = np.add.reduceat(np.column_stack(daily_values).astype(np.float64), boundaries, axis=0)
+    else:
+        totals = np.zeros((len(buckets), len(metrics)))
+
+    results: Dict[str, Dict[str, np.ndarray]] = {}
+    metric_totals = {}
+    for index, (report_key, column) in enumerate(metrics):
+        column_totals = totals[:, index]
+        column_totals = column_totals.round().astype(np.int64) if column.dtype == "int" else column_totals.round(2)
+        metric_totals[(report_key, column.name)] = np.repeat(column_totals, len(workplace_ids))
+    for report in reports:
+        columns: Dict[str, np.ndarray] = {}
+        for column in report.schema.columns:
+            if column.name == "date":
+                columns["date"] = date_column
+            elif column.name == "workplace_id":
+                columns["workplace_id"] = workplace_column
+            else:
+                columns[column.name] = metric_totals[(report.key, column.name)]
+        results[report.key] = columns
+    return results
+
+
+def generate_report_columns(report_key: str, params: ReportRequestParams) -> Dict[str, np.ndarray]:
+    """Builds one whole mock report as columns; see generate_reports_columns."""
+    return generate_reports_columns([report_key], params)[report_key]
+
 
 class MockReportAdapter(ReportPort):
     """
     Mock implementation of the ReportPort.
-    Simulates generating report data.
+    Simulates generating report data (see generate_report_columns); also used as the
+    data source for load tests and benchmarks, hence the vectorized generation.
     """
 
+    supports_multi_report_scan = True
+
+    def __init__(self, executor: Optional[Executor] = None):
+        """
+        :param executor: Where reports are generated. A ProcessPoolExecutor lets the
+                         date-range partitions of one export (see
+                         GenerateDashboardReportUseCase) use several cores. None generates
+                         them on the event loop.
+        """
+        self.executor = executor
+
+    async def _run(self, function, *args):
+        if self.executor is None:
+            return function(*args)
+        # Module-level functions with picklable arguments (params, keys), for process pools
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def get_report_schemas(self, report_keys: List[str]) -> List[ReportSchema]:
+        return [report.schema for report in MOCK_REPORTS.resolve(report_keys)]
+
+    async def _generate(self, report_key: str, params: ReportRequestParams) -> ColumnarBatch:
+        columns = await self._run(generate_report_columns, report_key, params)
+        return ColumnarBatch(list(columns), list(columns.values()))
+
     async def generate_report_data(
-        self, 
+        self,
         report_key: str,
         params: ReportRequestParams,
         # accessible_workplace_ids: List[str] # Use this if filtering by workplace is done here
-    ) -> Any: # Return type could be List[Dict] for CSV conversion
-        
-        # Simulate data generation based on report_key and params
-        # This data would typically come from database queries and processing
-        
-        report_data = []
-        # Generate some time-series data for the example
-        current_date = params.start_date
-        while current_date <= params.end_date:
-            for wp_id in params.workplace_ids or ["all_mocked"]: # Use provided or a default
-                if report_key == "activity_summary":
-                    report_data.append({
-                        "date": current_date.isoformat(),
-                        "workplace_id": wp_id,
-                        "visits": 100 + (current_date.day % 10) * 10, # Some variance
-                        "new_memberships": 5 + (current_date.day % 5),
-                    })
-                elif report_key == "item_statistics":
-                    report_data.append({
-                        "date": current_date.isoformat(),
-                        "workplace_id": wp_id,
-                        "items_loaned": 500 + (current_date.day % 20) * 5,
-                        "items_returned": 480 + (current_date.day % 20) * 4,
-                    })
-                elif report_key == "financial_overview":
-                     report_data.append({
-                        "date": current_date.isoformat(),
-                        "workplace_id": wp_id,
-                        "revenue_books_usd": 1000.00 + (current_date.day % 10) * 100,
-                        "revenue_events_usd": 200.00 + (current_date.day % 5) * 20,
-                        "late_fees_usd": 50.00 + (current_date.day % 7) * 5,
-                    })
-
-
-            # Increment date based on period (simplified for mock)
-            if params.period == "day":
-                current_date += timedelta(days=1)
-            elif params.period == "week":
-                current_date += timedelta(weeks=1)
-            elif params.period == "month":
-                # This is a simplification; real month increment is more complex
-                current_date += timedelta(days=30) 
-            elif params.period == "year":
-                current_date += timedelta(days=365)
-            else: # Default to month if period is unknown
-                current_date += timedelta(days=30)
-            
-            # Ensure we don't overshoot end_date significantly in loops
-            if params.period != "day" and current_date > params.end_date and len(report_data)>0 :
-                # If we jumped past end_date with a large step (week/month/year)
-                # and generated at least one entry, break.
-                # Or adjust last entry's date to end_date. For mock, this is fine.
-                break
-
-
-        if not report_data:
-            return [{"message": f"No data found or report key '{report_key}' not recognized for the given parameters."}]
-        
-        return report_data # Typically a list of dicts, where each dict is a row for a CSV
+    ) -> ColumnarBatch:
+        # Rows column by column; ColumnarBatch.to_rows() gives the list of dicts.
+        # Empty (but with the schema's columns) when no day falls in the range.
+        return await self._generate(report_key, params)
+
+    async def stream_report_data(
+        self,
+        report_key: str,
+        params: ReportRequestParams,
+        batch_size: int = 1000,
+    ) -> ReportRowStream:
+        report = await self._generate(report_key, params) # Raises UnknownReportError before any batch
+        return stream_report_batch(report, batch_size)
+
+    async def fetch_report_page(
+        self,
+        report_key: str,
+        params: ReportRequestParams,
+        after: Optional[ReportRowKey] = None,
+        limit: int = 100,
+    ) -> ReportPage:
+        # Only generate the buckets the page can reach: limit + 1 rows after the cursor's
+        # bucket, the cursor's bucket itself and the last, possibly cut, bucket; each at
+        # most _MAX_BUCKET_DAYS long
+        start_date = params.start_date if after is None else max(params.start_date, after[0])
+        buckets = (limit + 1) // len(params.workplace_ids or ["all_mocked"]) + 3
+        end_date = start_date + timedelta(days=buckets * _MAX_BUCKET_DAYS.get(params.period, _MAX_BUCKET_DAYS["month"]) - 1)
+        if end_date < params.end_date:
+            params = params.copy(update={"end_date": end_date})
+        return await super().fetch_report_page(report_key, params, after, limit)
+
+    async def stream_reports(
+        self,
+        report_keys: List[str],
+        params: ReportRequestParams,
+        batch_size: int = 1000,
+    ) -> Dict[str, ReportRowStream]:
+        # One scan for all reports (see generate_reports_columns)
+        reports = await self._run(generate_reports_columns, report_keys, params)
+        return {
+            report_key: stream_report_batch(ColumnarBatch(list(columns), list(columns.values())), batch_size)
+            for report_key, columns in reports.items()
+        }
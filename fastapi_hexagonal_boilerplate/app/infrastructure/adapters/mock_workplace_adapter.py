@@ -1,6 +1,8 @@
-from typing import List, Optional
+from typing import Dict, FrozenSet, Iterable, List, Optional
 from app.core.models.workplace import Workplace
 from app.core.ports.workplace_port import WorkplacePort
+from app.infrastructure.adapters.workplace_access_index import WorkplaceAccessIndex
+from app.infrastructure.adapters.workplace_name_index import WorkplaceNameIndex
 
 # Mock database
 MOCK_WORKPLACES_DB = {
@@ -15,8 +17,30 @@ USER_ACCESS_DB = {
     "user123": ["wp1", "wp2", "wp3"],
     "user456": ["wp2", "wp3"],
     "admin789": ["wp1", "wp2", "wp3", "wp4"], # Admin has access to all
+    "user_from_api_key_abc123": ["wp1", "wp2", "wp3"], # User behind the default API key
 }
 
+# Principal standing for requests without a user (system access)
+_SYSTEM_PRINCIPAL = "system:"
+
+def _build_access_index() -> WorkplaceAccessIndex:
+    index = WorkplaceAccessIndex()
+    index.add_workplaces(MOCK_WORKPLACES_DB)
+    for user_id, workplace_ids in USER_ACCESS_DB.items():
+        index.grant(f"user:{user_id}", [wp_id for wp_id in workplace_ids if wp_id in MOCK_WORKPLACES_DB])
+    index.grant(_SYSTEM_PRINCIPAL, [wp_id for wp_id in MOCK_WORKPLACES_DB if wp_id != "wp4"]) # Same rule as below
+    return index
+
+_ACCESS_INDEX = _build_access_index()
+
+def _build_name_index() -> WorkplaceNameIndex:
+    index = WorkplaceNameIndex()
+    for workplace in MOCK_WORKPLACES_DB.values():
+        index.upsert(workplace)
+    return index
+
+_NAME_INDEX = _build_name_index()
+
 class MockWorkplaceAdapter(WorkplacePort):
     """
     Mock implementation of the WorkplacePort.
@@ -32,5 +56,25 @@ class MockWorkplaceAdapter(WorkplacePort):
             return [wp for wp_id, wp in MOCK_WORKPLACES_DB.items() if wp_id != "wp4"] # Example: all but restricted
         return [] # Default to no access if user_id not found and is provided
 
+    async def get_accessible_workplace_ids(self, user_id: Optional[str]) -> FrozenSet[str]:
+        return _ACCESS_INDEX.accessible_ids(self._principal(user_id))
+
+    async def filter_accessible_workplace_ids(
+        self, user_id: Optional[str], workplace_ids: Iterable[str]
+    ) -> FrozenSet[str]:
+        return _ACCESS_INDEX.filter(self._principal(user_id), workplace_ids)
+
+    @staticmethod
+    def _principal(user_id: Optional[str]) -> str:
+        # Unknown users resolve to a principal without grants: no access
+        return f"user:{user_id}" if user_id else _SYSTEM_PRINCIPAL
+
     async def get_workplace_by_id(self, workplace_id: str) -> Optional[Workplace]:
         return MOCK_WORKPLACES_DB.get(workplace_id)
+
+    async def get_workplaces_by_ids(self, workplace_ids: List[str]) -> Dict[str, Workplace]:
+        return {wp_id: MOCK_WORKPLACES_DB[wp_id] for wp_id in workplace_ids if wp_id in MOCK_WORKPLACES_DB}
+
+    async def search_workplaces(self, user_id: Optional[str], query: str, limit: int = 10) -> List[Workplace]:
+        accessible_ids = await self.get_accessible_workplace_ids(user_id)
+        return _NAME_INDEX.search(query, limit=limit, accessible_ids=accessible_ids)
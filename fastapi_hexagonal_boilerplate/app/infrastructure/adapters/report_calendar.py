@@ -0,0 +1,24 @@
+import numpy as np
+
+# Calendar buckets of the report periods, shared by the report adapters.
+
+REPORT_PERIODS = ("day", "week", "month", "year")
+
+# 1970-01-01 (day 0 of datetime64[D]) was a Thursday: shifting by 3 makes Monday weekday 0
+_EPOCH_WEEKDAY_SHIFT = 3
+
+
+def bucket_starts(days: np.ndarray, period: str) -> np.ndarray:
+    """
+    Maps each datetime64[D] day to the first day of its calendar bucket: the day itself,
+    the Monday of its ISO week, the first of its month or of its year. Unknown periods
+    group by month, like the rest of the exporter.
+    """
+    if period == "day":
+        return days
+    if period == "week":
+        weekday = (days.astype(np.int64) + _EPOCH_WEEKDAY_SHIFT) % 7
+        return days - weekday.astype("timedelta64[D]")
+    if period == "year":
+        return days.astype("datetime64[Y]").astype("datetime64[D]")
+    return days.astype("datetime64[M]").astype("datetime64[D]")
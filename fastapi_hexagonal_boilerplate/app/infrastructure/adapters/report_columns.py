@@ -0,0 +1,56 @@
+import asyncio
+from typing import AsyncIterator, Dict, List, Sequence
+
+import numpy as np
+
+from app.core.models.report import ColumnarBatch, ReportRowStream, ReportSchema
+
+# NumPy dtype of each ReportColumn dtype
+COLUMN_NUMPY_DTYPES = {
+    "date": "datetime64[D]",
+    "string": object,
+    "int": np.int64,
+    "float": np.float64,
+}
+
+
+def as_column(values: Sequence, dtype: str) -> np.ndarray:
+    """Values of a report column (a list, or an array from any source) as a NumPy array of its dtype."""
+    if dtype == "date" and not isinstance(values, np.ndarray):
+        values = np.asarray(values, dtype=object)  # date objects or ISO strings
+    return np.asarray(values, dtype=COLUMN_NUMPY_DTYPES[dtype])
+
+
+async def collect_report_columns(
+    row_stream: ReportRowStream, schema: ReportSchema
+) -> Dict[str, np.ndarray]:
+    """Reads a whole report stream into one array per schema column."""
+    parts: Dict[str, List[np.ndarray]] = {column.name: [] for column in schema.columns}
+    async for batch in row_stream:
+        if not isinstance(batch, ColumnarBatch):
+            batch = ColumnarBatch.from_rows(batch, row_stream.columns)
+        for column in schema.columns:
+            parts[column.name].append(
+                as_column(batch.column(column.name), column.dtype)
+            )
+    return {
+        column.name: np.concatenate(parts[column.name])
+        if parts[column.name]
+        else as_column([], column.dtype)
+        for column in schema.columns
+    }
+
+
+def stream_report_batch(report: ColumnarBatch, batch_size: int) -> ReportRowStream:
+    """Streams an already generated report in slices of batch_size rows."""
+
+    async def batches() -> AsyncIterator[ColumnarBatch]:
+        for start in range(0, len(report), batch_size):
+            yield report.slice(
+                start, start + batch_size
+            )  # Views on the same arrays, nothing is copied
+            await asyncio.sleep(
+                0
+            )  # Simulate a cursor round trip; lets the consumer run
+
+    return ReportRowStream(columns=report.columns, batches=batches())
@@ -0,0 +1,80 @@
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.core.models.report import REPORT_COLUMN_DTYPES, ReportColumn, ReportSchema
+from app.core.ports.report_port import UnknownReportError
+
+
+class RegisteredReport:
+    """A report known to a ReportRegistry: its schema and the function that generates it."""
+
+    __slots__ = ("schema", "generator")
+
+    def __init__(self, schema: ReportSchema, generator: Callable[..., Any]):
+        self.schema = schema
+        self.generator = generator
+
+    @property
+    def key(self) -> str:
+        return self.schema.key
+
+
+class ReportRegistry:
+    """
+    Catalog of the reports a ReportPort adapter can produce.
+
+    Each report key registers its column schema (names and dtypes, in output order) and a
+    generator whose signature is up to the adapter. Requests resolve their keys once, up
+    front: unknown keys are rejected before any data is produced, and the schema gives
+    the CSV header without looking at the rows.
+    """
+
+    def __init__(self):
+        self._reports: Dict[str, RegisteredReport] = {}
+
+    def register(
+        self, key: str, columns: List[Tuple[str, str]], generator: Callable[..., Any]
+    ) -> RegisteredReport:
+        if key in self._reports:
+            raise ValueError(f"Report '{key}' is already registered.")
+        for name, dtype in columns:
+            if dtype not in REPORT_COLUMN_DTYPES:
+                raise ValueError(
+                    f"Column '{name}' of report '{key}' has unsupported dtype '{dtype}'."
+                )
+        schema = ReportSchema(
+            key=key,
+            columns=[ReportColumn(name=name, dtype=dtype) for name, dtype in columns],
+        )
+        report = RegisteredReport(schema, generator)
+        self._reports[key] = report
+        return report
+
+    def report(
+        self, key: str, columns: List[Tuple[str, str]]
+    ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Decorator form of register()."""
+
+        def decorator(generator: Callable[..., Any]) -> Callable[..., Any]:
+            self.register(key, columns, generator)
+            return generator
+
+        return decorator
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._reports
+
+    def keys(self) -> List[str]:
+        return list(self._reports)
+
+    def get(self, key: str) -> RegisteredReport:
+        report = self._reports.get(key)
+        if report is None:
+            raise UnknownReportError([key])
+        return report
+
+    def resolve(self, report_keys: List[str]) -> List[RegisteredReport]:
+        """The registered reports for `report_keys`, in order; all unknown keys are reported at once."""
+        unknown = [key for key in report_keys if key not in self._reports]
+        if unknown:
+            raise UnknownReportError(unknown)
+        return [self._reports[key] for key in report_keys]
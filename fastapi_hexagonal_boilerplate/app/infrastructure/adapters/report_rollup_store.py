@@ -0,0 +1,265 @@
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.infrastructure.adapters.report_calendar import bucket_starts
+
+# Coarse periods pre-aggregated from the daily values
+ROLLUP_PERIODS = ("week", "month", "year")
+
+
+def _epoch_day(day: date) -> int:
+    return int(np.datetime64(day, "D").astype(np.int64))
+
+
+def _to_date(epoch_day: int) -> date:
+    return np.datetime64(epoch_day, "D").astype(object)
+
+
+def period_totals(
+    start_date: date, values: np.ndarray, period: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sums dense daily values into period buckets. `values` has one entry per day from
+    start_date along its first axis (any trailing shape). Returns the bucket starts
+    (datetime64[D]) and, per bucket, the sum over its days in range. Unknown periods
+    group by month.
+    """
+    days = np.datetime64(start_date, "D") + np.arange(len(values))
+    if period == "day" or not len(values):
+        return days, values
+    day_buckets = bucket_starts(days, period if period in ROLLUP_PERIODS else "month")
+    boundaries = np.flatnonzero(np.r_[True, day_buckets[1:] != day_buckets[:-1]])
+    return day_buckets[boundaries], np.add.reduceat(values, boundaries, axis=0)
+
+
+class _WorkplaceRollups:
+    """Daily values of one report for one workplace, dense from `origin`, and their week/month/year sums."""
+
+    __slots__ = ("origin", "values", "levels", "covered", "expires_at")
+
+    def __init__(self, origin: int, metric_count: int, expires_at: Optional[float]):
+        self.origin = origin  # Epoch day of values[0]
+        self.values = np.zeros((0, metric_count))
+        # Per period: bucket starts (epoch days) over the stored days, and the sum of each bucket
+        self.levels: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # Day ranges already loaded: sorted, disjoint, inclusive (start, end) epoch days
+        self.covered: List[Tuple[int, int]] = []
+        self.expires_at = expires_at
+
+    def store(self, start: int, values: np.ndarray) -> None:
+        end = start + len(values)  # Exclusive
+        origin = min(self.origin, start)
+        stop = max(self.origin + len(self.values), end)
+        if origin != self.origin or stop != self.origin + len(self.values):
+            grown = np.zeros((stop - origin, self.values.shape[1]))
+            grown[self.origin - origin : self.origin - origin + len(self.values)] = (
+                self.values
+            )
+            self.origin, self.values = origin, grown
+        self.values[start - self.origin : end - self.origin] = values
+        self.roll_up()
+
+    def roll_up(self) -> None:
+        # Loads are rare next to reads: the levels are re-summed as a whole, vectorized
+        days = np.arange(self.origin, self.origin + len(self.values)).astype(
+            "datetime64[D]"
+        )
+        for period in ROLLUP_PERIODS:
+            day_buckets = bucket_starts(days, period)
+            boundaries = np.flatnonzero(
+                np.r_[True, day_buckets[1:] != day_buckets[:-1]]
+            )
+            self.levels[period] = (
+                day_buckets[boundaries].astype(np.int64),
+                np.add.reduceat(self.values, boundaries, axis=0),
+            )
+
+    def cover(self, start: int, end: int) -> None:
+        merged: List[Tuple[int, int]] = []
+        for range_start, range_end in sorted([*self.covered, (start, end)]):
+            if merged and range_start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], range_end))
+            else:
+                merged.append((range_start, range_end))
+        self.covered = merged
+
+    def missing(self, start: int, end: int) -> List[Tuple[int, int]]:
+        gaps: List[Tuple[int, int]] = []
+        cursor = start
+        for range_start, range_end in self.covered:
+            if range_end < cursor:
+                continue
+            if range_start > end:
+                break
+            if range_start > cursor:
+                gaps.append((cursor, range_start - 1))
+            cursor = range_end + 1
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return gaps
+
+
+class ReportRollupStore:
+    """
+    In-process store of pre-aggregated report metrics, per report key and workplace.
+
+    Daily values are loaded by date range (upsert) into one dense (days, metrics) array
+    per report and workplace; reloading a range (e.g. corrected data) replaces it. Each
+    load re-sums the week, month and year levels with np.add.reduceat, so a read of a
+    coarse period returns one stored row per whole bucket: a 5-year monthly read costs
+    about 60 rows, and only the partial first and last buckets are summed from days.
+
+    Entries are dropped `ttl_seconds` after their first load (0 keeps them) or on
+    invalidate(), and the least recently used ones once there are more than `max_entries`
+    (report, workplace) pairs. Callers should only load days that no longer change.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 24 * 3600,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self._rollups: "OrderedDict[Tuple[str, str], _WorkplaceRollups]" = OrderedDict()
+        self._metrics: Dict[str, List[str]] = {}
+
+    def metrics(self, report_key: str) -> List[str]:
+        return list(self._metrics.get(report_key, []))
+
+    def invalidate(
+        self, report_key: Optional[str] = None, workplace_id: Optional[str] = None
+    ) -> None:
+        """Drops the loaded days of a report and/or workplace (everything if neither is given)."""
+        for key in list(self._rollups):
+            if report_key in (None, key[0]) and workplace_id in (None, key[1]):
+                del self._rollups[key]
+
+    def missing_ranges(
+        self, report_key: str, workplace_id: str, start_date: date, end_date: date
+    ) -> List[Tuple[date, date]]:
+        """Sub-ranges of [start_date, end_date] not loaded yet for this report and workplace."""
+        if start_date > end_date:
+            return []
+        rollups = self._entry(report_key, workplace_id)
+        start, end = _epoch_day(start_date), _epoch_day(end_date)
+        gaps = rollups.missing(start, end) if rollups is not None else [(start, end)]
+        return [(_to_date(gap_start), _to_date(gap_end)) for gap_start, gap_end in gaps]
+
+    def upsert(
+        self,
+        report_key: str,
+        workplace_id: str,
+        metrics: List[str],
+        start_date: date,
+        end_date: date,
+        days: np.ndarray,
+        values: np.ndarray,
+    ) -> None:
+        """
+        Loads the daily values of [start_date, end_date]: `values` has one row per entry
+        of `days` and one column per metric. Days of the range missing from `days` are zero.
+        """
+        known_metrics = self._metrics.setdefault(report_key, list(metrics))
+        if known_metrics != list(metrics):
+            raise ValueError(
+                f"Report '{report_key}' has metrics {known_metrics}, got {list(metrics)}."
+            )
+        if start_date > end_date:
+            return
+        start, end = _epoch_day(start_date), _epoch_day(end_date)
+        day_numbers = np.asarray(days, dtype="datetime64[D]").astype(np.int64)
+        if len(day_numbers) and (day_numbers.min() < start or day_numbers.max() > end):
+            raise ValueError(
+                f"Days outside of {start_date}..{end_date} for report '{report_key}'."
+            )
+
+        new_values = np.zeros((end - start + 1, len(metrics)))
+        np.add.at(
+            new_values,
+            day_numbers - start,
+            np.asarray(values, dtype=np.float64).reshape(
+                len(day_numbers), len(metrics)
+            ),
+        )
+        rollups = self._entry(report_key, workplace_id)
+        if rollups is None:
+            expires_at = (
+                self.clock() + self.ttl_seconds if self.ttl_seconds > 0 else None
+            )
+            rollups = self._rollups[(report_key, workplace_id)] = _WorkplaceRollups(
+                start, len(metrics), expires_at
+            )
+            while len(self._rollups) > self.max_entries:
+                self._rollups.popitem(last=False)
+        rollups.store(start, new_values)
+        rollups.cover(start, end)
+
+    def days(
+        self, report_key: str, workplace_id: str, start_date: date, end_date: date
+    ) -> np.ndarray:
+        """
+        Daily values of [start_date, end_date], one row per day and one column per metric.
+        Raises KeyError if part of the range is not loaded (or was dropped since).
+        """
+        if start_date > end_date:
+            return np.zeros((0, len(self._metrics.get(report_key, []))))
+        if self.missing_ranges(report_key, workplace_id, start_date, end_date):
+            raise KeyError(
+                f"Report '{report_key}' is not loaded for '{workplace_id}' over {start_date}..{end_date}."
+            )
+        rollups = self._rollups[(report_key, workplace_id)]
+        start = _epoch_day(start_date) - rollups.origin
+        return rollups.values[start : start + (end_date - start_date).days + 1]
+
+    def read(
+        self,
+        report_key: str,
+        workplace_id: str,
+        period: str,
+        start_date: date,
+        end_date: date,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Bucket starts (datetime64[D]) of the [start_date, end_date] range and, per bucket,
+        the sum of each metric over the days in range. Whole buckets are read from the
+        week/month/year levels; only the partial first and last ones are summed from days.
+        Unknown periods group by month. Raises KeyError if part of the range is not loaded.
+        """
+        days = self.days(report_key, workplace_id, start_date, end_date)
+        if period == "day" or not len(days):
+            return period_totals(start_date, days, period)
+        period = period if period in ROLLUP_PERIODS else "month"
+        start, end = _epoch_day(start_date), _epoch_day(end_date)
+        edges = bucket_starts(
+            np.array([start, end, end + 1], dtype="datetime64[D]"), period
+        ).astype(np.int64)
+        level_starts, level_sums = self._rollups[(report_key, workplace_id)].levels[
+            period
+        ]
+        first = np.searchsorted(level_starts, edges[0])
+        stop = np.searchsorted(level_starts, edges[1], side="right")
+        buckets, totals = level_starts[first:stop], level_sums[first:stop].copy()
+        if edges[0] < start:
+            first_end = buckets[1] if len(buckets) > 1 else end + 1
+            totals[0] = days[: first_end - start].sum(axis=0)
+        if edges[2] == edges[1] and (len(buckets) > 1 or edges[0] == start):
+            totals[-1] = days[max(buckets[-1], start) - start :].sum(axis=0)
+        return buckets.astype("datetime64[D]"), totals
+
+    def _entry(self, report_key: str, workplace_id: str) -> Optional[_WorkplaceRollups]:
+        key = (report_key, workplace_id)
+        rollups = self._rollups.get(key)
+        if rollups is None:
+            return None
+        if rollups.expires_at is not None and rollups.expires_at <= self.clock():
+            del self._rollups[key]
+            return None
+        self._rollups.move_to_end(key)
+        return rollups
@@ -0,0 +1,325 @@
+import asyncio
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.models.report import (
+    ColumnarBatch,
+    ReportBatch,
+    ReportPage,
+    ReportRequestParams,
+    ReportRowKey,
+    ReportRowStream,
+    ReportSchema,
+)
+from app.core.ports.report_port import ReportPort
+from app.infrastructure.adapters.report_columns import (
+    collect_report_columns,
+    stream_report_batch,
+)
+from app.infrastructure.adapters.report_rollup_store import (
+    ReportRollupStore,
+    period_totals,
+)
+
+# Layout of the reports that can be rolled up: one row per date and workplace, numeric metrics
+_KEY_COLUMNS = ["date", "workplace_id"]
+_METRIC_DTYPES = ("int", "float")
+
+
+def _can_roll_up(schema: ReportSchema) -> bool:
+    return (
+        schema.column_names[:2] == _KEY_COLUMNS
+        and schema.columns[0].dtype == "date"
+        and all(column.dtype in _METRIC_DTYPES for column in schema.columns[2:])
+    )
+
+
+class RollupReportAdapter(ReportPort):
+    """
+    ReportPort answering week/month/year requests from a ReportRollupStore.
+
+    Closed days (before the last `open_days` days, today included) that the store has not
+    seen yet are requested from the source port once, with period=day, and loaded into the
+    store; a 5-year monthly export then reads about 60 pre-aggregated rows per workplace. The
+    open days are requested at day level on every call and never stored, so late data is
+    picked up. Day-level requests, requests without explicit workplace_ids, ranges that
+    are open altogether and reports that are not date x workplace x numeric metrics go
+    straight to the source.
+    """
+
+    supports_multi_report_scan = True
+
+    def __init__(
+        self,
+        source: ReportPort,
+        store: Optional[ReportRollupStore] = None,
+        open_days: int = 2,
+        today: Callable[[], date] = date.today,
+    ):
+        self.source = source
+        self.store = store if store is not None else ReportRollupStore()
+        self.open_days = open_days
+        self.today = today
+
+    async def get_report_schemas(self, report_keys: List[str]) -> List[ReportSchema]:
+        return await self.source.get_report_schemas(report_keys)
+
+    async def generate_report_data(
+        self, report_key: str, params: ReportRequestParams
+    ) -> ReportBatch:
+        schemas = await self._rollup_schemas([report_key], params)
+        reports = await self._from_rollups(schemas, params) if schemas else {}
+        if report_key not in reports:
+            return await self.source.generate_report_data(
+                report_key=report_key, params=params
+            )
+        return reports[report_key]
+
+    async def stream_report_data(
+        self,
+        report_key: str,
+        params: ReportRequestParams,
+        batch_size: int = 1000,
+    ) -> ReportRowStream:
+        return (await self.stream_reports([report_key], params, batch_size))[report_key]
+
+    async def fetch_report_page(
+        self,
+        report_key: str,
+        params: ReportRequestParams,
+        after: Optional[ReportRowKey] = None,
+        limit: int = 100,
+    ) -> ReportPage:
+        # Pages are small and bounded by the source's own limit push-down: no rollups needed
+        return await self.source.fetch_report_page(
+            report_key=report_key, params=params, after=after, limit=limit
+        )
+
+    async def stream_reports(
+        self,
+        report_keys: List[str],
+        params: ReportRequestParams,
+        batch_size: int = 1000,
+    ) -> Dict[str, ReportRowStream]:
+        schemas = await self._rollup_schemas(report_keys, params)
+        reports = await self._from_rollups(schemas, params) if schemas else {}
+        from_source = [
+            report_key for report_key in report_keys if report_key not in reports
+        ]
+
+        row_streams: Dict[str, ReportRowStream] = {}
+        if from_source:
+            row_streams.update(
+                await self.source.stream_reports(from_source, params, batch_size)
+            )
+        for report_key, report in reports.items():
+            row_streams[report_key] = stream_report_batch(report, batch_size)
+        return {report_key: row_streams[report_key] for report_key in report_keys}
+
+    def closed_before(self) -> date:
+        """First day that is still open: it and later days are never rolled up."""
+        return self.today() - timedelta(days=self.open_days - 1)
+
+    async def _rollup_schemas(
+        self, report_keys: List[str], params: ReportRequestParams
+    ) -> List[ReportSchema]:
+        """Schemas of the requested reports that can be answered from the store."""
+        schemas = await self.source.get_report_schemas(
+            report_keys
+        )  # Raises UnknownReportError
+        if (
+            params.period == "day"
+            or not params.workplace_ids
+            or params.start_date >= self.closed_before()
+        ):
+            return []
+        schemas = [schema for schema in schemas if _can_roll_up(schema)]
+        # More (report, workplace) pairs than the store keeps would evict themselves
+        if len(schemas) * len(params.workplace_ids) > self.store.max_entries:
+            return []
+        return schemas
+
+    async def _from_rollups(
+        self, schemas: List[ReportSchema], params: ReportRequestParams
+    ) -> Dict[str, ColumnarBatch]:
+        """
+        The reports built from stored closed days and freshly requested open days. Reports
+        whose days were dropped from the store in the meantime are left out.
+        """
+        closed_end = min(params.end_date, self.closed_before() - timedelta(days=1))
+        open_days, _ = await asyncio.gather(
+            self._fetch_days(
+                schemas,
+                params.workplace_ids,
+                params,
+                closed_end + timedelta(days=1),
+                params.end_date,
+            ),
+            self._load_missing_days(
+                schemas, params.workplace_ids, params.start_date, closed_end, params
+            ),
+        )
+        workplace_ids = params.workplace_ids
+        reports: Dict[str, ColumnarBatch] = {}
+        for schema in schemas:
+            try:
+                closed = [
+                    self.store.read(
+                        schema.key,
+                        workplace_id,
+                        params.period,
+                        params.start_date,
+                        closed_end,
+                    )
+                    for workplace_id in workplace_ids
+                ]
+            except KeyError:
+                continue
+            # (buckets, workplaces, metrics) from the stored levels, then the open days
+            buckets, totals = (
+                closed[0][0],
+                np.stack([workplace_totals for _, workplace_totals in closed], axis=1),
+            )
+            if schema.key in open_days:
+                open_buckets, open_totals = period_totals(
+                    closed_end + timedelta(days=1),
+                    open_days[schema.key].transpose(1, 0, 2),
+                    params.period,
+                )
+                if (
+                    len(buckets)
+                    and len(open_buckets)
+                    and open_buckets[0] == buckets[-1]
+                ):
+                    totals[-1] += open_totals[0]  # The bucket straddling the cutoff
+                    open_buckets, open_totals = open_buckets[1:], open_totals[1:]
+                buckets, totals = (
+                    np.concatenate([buckets, open_buckets]),
+                    np.concatenate([totals, open_totals]),
+                )
+            # Rows ordered by bucket, then by workplace, like the source
+            totals = totals.reshape(
+                len(buckets) * len(workplace_ids), len(schema.columns) - 2
+            )
+            values = [
+                np.repeat(buckets, len(workplace_ids)),
+                np.tile(np.asarray(workplace_ids, dtype=object), len(buckets)),
+            ]
+            for index, column in enumerate(schema.columns[2:]):
+                column_totals = totals[:, index]
+                values.append(
+                    column_totals.round().astype(np.int64)
+                    if column.dtype == "int"
+                    else column_totals.round(2)
+                )
+            reports[schema.key] = ColumnarBatch(schema.column_names, values)
+        return reports
+
+    async def _load_missing_days(
+        self,
+        schemas: List[ReportSchema],
+        workplace_ids: List[str],
+        start_date: date,
+        end_date: date,
+        params: ReportRequestParams,
+    ) -> None:
+        # Everything not loaded yet, grouped by missing day range so that each range is one
+        # multi-report request to the source
+        missing: Dict[Tuple[date, date], Tuple[List[ReportSchema], List[str]]] = {}
+        for schema in schemas:
+            for workplace_id in workplace_ids:
+                for day_range in self.store.missing_ranges(
+                    schema.key, workplace_id, start_date, end_date
+                ):
+                    range_schemas, range_workplaces = missing.setdefault(
+                        day_range, ([], [])
+                    )
+                    if schema not in range_schemas:
+                        range_schemas.append(schema)
+                    if workplace_id not in range_workplaces:
+                        range_workplaces.append(workplace_id)
+        await asyncio.gather(
+            *[
+                self._load_days(
+                    range_schemas, range_workplaces, params, range_start, range_end
+                )
+                for (range_start, range_end), (
+                    range_schemas,
+                    range_workplaces,
+                ) in missing.items()
+            ]
+        )
+
+    async def _load_days(
+        self,
+        schemas: List[ReportSchema],
+        workplace_ids: List[str],
+        params: ReportRequestParams,
+        start_date: date,
+        end_date: date,
+    ) -> None:
+        workplace_ids = sorted(workplace_ids)
+        loaded = await self._fetch_days(
+            schemas, workplace_ids, params, start_date, end_date
+        )
+        for schema in schemas:
+            for index, workplace_id in enumerate(workplace_ids):
+                self.store.upsert(
+                    schema.key,
+                    workplace_id,
+                    schema.column_names[2:],
+                    start_date,
+                    end_date,
+                    np.arange(
+                        np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1
+                    ),
+                    loaded[schema.key][index],
+                )
+
+    async def _fetch_days(
+        self,
+        schemas: List[ReportSchema],
+        workplace_ids: List[str],
+        params: ReportRequestParams,
+        start_date: date,
+        end_date: date,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Day-level values of [start_date, end_date] from the source: per report, a dense
+        (workplaces, days, metrics) array in the order of `workplace_ids`.
+        """
+        if start_date > end_date:
+            return {}
+        day_params = params.copy(
+            update={
+                "workplace_ids": sorted(workplace_ids),
+                "start_date": start_date,
+                "end_date": end_date,
+                "period": "day",
+                "reports": [schema.key for schema in schemas],
+            }
+        )
+        row_streams = await self.source.stream_reports(day_params.reports, day_params)
+        ids = np.asarray(workplace_ids, dtype=object)
+        order = np.argsort(ids)
+        day_count = (end_date - start_date).days + 1
+        fetched: Dict[str, np.ndarray] = {}
+        for schema in schemas:
+            columns = await collect_report_columns(row_streams[schema.key], schema)
+            metric_names = schema.column_names[2:]
+            dense = np.zeros((len(workplace_ids), day_count, len(metric_names)))
+            if len(columns["date"]) and metric_names:
+                workplaces = order[np.searchsorted(ids[order], columns["workplace_id"])]
+                offsets = (
+                    columns["date"].astype("datetime64[D]")
+                    - np.datetime64(start_date, "D")
+                ).astype(np.int64)
+                np.add.at(
+                    dense,
+                    (workplaces, offsets),
+                    np.column_stack([columns[name] for name in metric_names]),
+                )
+            fetched[schema.key] = dense
+        return fetched
@@ -0,0 +1,466 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+from datetime import date, timedelta
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.models.report import (
+    ColumnarBatch,
+    ReportBatch,
+    ReportPage,
+    ReportRequestParams,
+    ReportRowKey,
+    ReportRowStream,
+    ReportSchema,
+)
+from app.core.ports.cache_port import CachePort, load_cached_json
+from app.core.ports.report_port import ReportPort
+from app.infrastructure.adapters.report_columns import (
+    COLUMN_NUMPY_DTYPES,
+    as_column,
+    collect_report_columns,
+    stream_report_batch,
+)
+
+logger = logging.getLogger(__name__)
+
+# Weekly reports are cached in blocks of 13 ISO weeks (about a quarter), counted from the
+# Monday before 1970-01-01, so every block starts on a Monday.
+_WEEK_SEGMENT_DAYS = 13 * 7
+_WEEK_SEGMENT_EPOCH = date(1969, 12, 29)
+
+# Little-endian layout of the fixed-width columns in cached parts; dates are epoch days
+_BINARY_DTYPES = {"date": "<i4", "int": "<i8", "float": "<f8"}
+
+
+def segment_start(day: date, period: str) -> date:
+    """
+    First day of the calendar segment containing `day`. Segments are what the cache stores:
+    a month of daily rows, 13 weeks of weekly rows, a year of monthly or yearly rows.
+    Their boundaries are bucket boundaries of `period`, so no bucket spans two segments.
+    """
+    if period == "day":
+        return date(day.year, day.month, 1)
+    if period == "week":
+        offset = (day - _WEEK_SEGMENT_EPOCH).days
+        return _WEEK_SEGMENT_EPOCH + timedelta(
+            days=offset - offset % _WEEK_SEGMENT_DAYS
+        )
+    return date(day.year, 1, 1)  # month, year, and unknown periods (grouped by month)
+
+
+def _next_segment_start(day: date, period: str) -> date:
+    start = segment_start(day, period)
+    if period == "day":
+        return (
+            date(start.year + 1, 1, 1)
+            if start.month == 12
+            else date(start.year, start.month + 1, 1)
+        )
+    if period == "week":
+        return start + timedelta(days=_WEEK_SEGMENT_DAYS)
+    return date(start.year + 1, 1, 1)
+
+
+class ReportSegment:
+    """A piece of a requested date range that lies within a single calendar segment."""
+
+    __slots__ = ("start_date", "end_date", "segment_start", "cacheable")
+
+    def __init__(
+        self, start_date: date, end_date: date, segment_start: date, cacheable: bool
+    ):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.segment_start = segment_start
+        self.cacheable = cacheable
+
+    def __repr__(self) -> str:
+        return f"ReportSegment({self.start_date}..{self.end_date}, cacheable={self.cacheable})"
+
+
+def plan_segments(
+    start_date: date, end_date: date, period: str, today: date
+) -> List[ReportSegment]:
+    """
+    Splits [start_date, end_date] on calendar segment boundaries. Only whole segments that
+    ended before `today` are cacheable: the partial edges of a rolling window, and the
+    segment still receiving data, are always computed.
+    """
+    segments: List[ReportSegment] = []
+    cursor = start_date
+    while cursor <= end_date:
+        start = segment_start(cursor, period)
+        last_day = _next_segment_start(cursor, period) - timedelta(days=1)
+        piece_end = min(end_date, last_day)
+        cacheable = cursor == start and piece_end == last_day and last_day < today
+        segments.append(ReportSegment(cursor, piece_end, start, cacheable))
+        cursor = piece_end + timedelta(days=1)
+    return segments
+
+
+def _is_segmentable(schema: ReportSchema) -> bool:
+    # One row per date bucket and workplace
+    names = schema.column_names
+    return (
+        "date" in names
+        and "workplace_id" in names
+        and schema.columns[names.index("date")].dtype == "date"
+    )
+
+
+class SegmentCachingReportAdapter(ReportPort):
+    """
+    ReportPort caching report results per (report key, workplace, period, calendar segment)
+    on any CachePort.
+
+    A request is planned into segments (see plan_segments). Cached segments are read
+    back; each run of consecutive missing segments and partial edges is requested from the
+    source port in one multi-report call, and the whole segments of the answer are stored.
+    A rolling "last 365 days" export thus only computes its two edges and the current
+    segment once the window has been seen. Requests without explicit workplace_ids and
+    reports without `date`/`workplace_id` columns go straight to the source.
+    """
+
+    supports_multi_report_scan = True
+
+    def __init__(
+        self,
+        source: ReportPort,
+        cache: CachePort,
+        ttl_seconds: int = 24 * 3600,
+        key_prefix: str = "report-segment:",
+        today: Callable[[], date] = date.today,
+    ):
+        self.source = source
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self.today = today
+
+    async def get_report_schemas(self, report_keys: List[str]) -> List[ReportSchema]:
+        return await self.source.get_report_schemas(report_keys)
+
+    async def generate_report_data(
+        self, report_key: str, params: ReportRequestParams
+    ) -> ReportBatch:
+        schemas = await self._segmentable_schemas([report_key], params)
+        if not schemas:
+            return await self.source.generate_report_data(
+                report_key=report_key, params=params
+            )
+        reports, _ = await self._assemble(schemas, params)
+        return reports[report_key]
+
+    async def stream_report_data(
+        self,
+        report_key: str,
+        params: ReportRequestParams,
+        batch_size: int = 1000,
+    ) -> ReportRowStream:
+        return (await self.stream_reports([report_key], params, batch_size))[report_key]
+
+    async def fetch_report_page(
+        self,
+        report_key: str,
+        params: ReportRequestParams,
+        after: Optional[ReportRowKey] = None,
+        limit: int = 100,
+    ) -> ReportPage:
+        # Pages are small and bounded by the source's own limit push-down: no segments needed
+        return await self.source.fetch_report_page(
+            report_key=report_key, params=params, after=after, limit=limit
+        )
+
+    async def stream_reports(
+        self,
+        report_keys: List[str],
+        params: ReportRequestParams,
+        batch_size: int = 1000,
+    ) -> Dict[str, ReportRowStream]:
+        schemas = await self._segmentable_schemas(report_keys, params)
+        segmented = {schema.key for schema in schemas}
+        from_source = [
+            report_key for report_key in report_keys if report_key not in segmented
+        ]
+
+        row_streams: Dict[str, ReportRowStream] = {}
+        if from_source:
+            row_streams.update(
+                await self.source.stream_reports(from_source, params, batch_size)
+            )
+        if schemas:
+            reports, segments = await self._assemble(schemas, params)
+            for report_key, report in reports.items():
+                row_streams[report_key] = self._stream_segments(
+                    report_key, report, segments, params, batch_size
+                )
+        return {report_key: row_streams[report_key] for report_key in report_keys}
+
+    async def _segmentable_schemas(
+        self, report_keys: List[str], params: ReportRequestParams
+    ) -> List[ReportSchema]:
+        schemas = await self.source.get_report_schemas(
+            report_keys
+        )  # Raises UnknownReportError
+        if not params.workplace_ids:
+            return []
+        return [schema for schema in schemas if _is_segmentable(schema)]
+
+    def _key(
+        self, report_key: str, workplace_id: str, period: str, segment: ReportSegment
+    ) -> str:
+        return f"{self.key_prefix}{report_key}:{period}:{workplace_id}:{segment.segment_start.isoformat()}"
+
+    def _stream_segments(
+        self,
+        report_key: str,
+        report: ColumnarBatch,
+        segments: List[ReportSegment],
+        params: ReportRequestParams,
+        batch_size: int,
+    ) -> ReportRowStream:
+        """
+        Streams the assembled report with each cacheable segment as a single batch tagged
+        with a cache_key, so its encoded CSV can be cached and reused (see
+        ReportArchiveService); other rows come in slices of batch_size.
+        """
+        if not segments:
+            return stream_report_batch(report, batch_size)
+        segment_starts = np.array(
+            [segment.start_date for segment in segments], dtype="datetime64[D]"
+        )
+        row_segments = np.maximum(
+            np.searchsorted(segment_starts, report.column("date"), side="right") - 1, 0
+        )
+        bounds = np.searchsorted(
+            row_segments, np.arange(len(segments) + 1)
+        )  # Rows are sorted by date
+        workplaces = hashlib.sha1(
+            ",".join(params.workplace_ids).encode("utf-8"), usedforsecurity=False
+        ).hexdigest()[:16]
+
+        async def batches() -> AsyncIterator[ColumnarBatch]:
+            for index, segment in enumerate(segments):
+                first_row, end_row = int(bounds[index]), int(bounds[index + 1])
+                if segment.cacheable and end_row > first_row:
+                    batch = report.slice(first_row, end_row)
+                    batch.cache_key = f"{self.key_prefix}{report_key}:{params.period}:{workplaces}:{segment.segment_start.isoformat()}"
+                    yield batch
+                    continue
+                for start in range(first_row, end_row, batch_size):
+                    yield report.slice(start, min(start + batch_size, end_row))
+                    await asyncio.sleep(0)
+
+        return ReportRowStream(columns=report.columns, batches=batches())
+
+    async def _assemble(
+        self, schemas: List[ReportSchema], params: ReportRequestParams
+    ) -> Tuple[Dict[str, ColumnarBatch], List[ReportSegment]]:
+        workplace_ids = params.workplace_ids
+        segments = plan_segments(
+            params.start_date, params.end_date, params.period, self.today()
+        )
+
+        # Columns (without workplace_id) of every (report, segment, workplace) found or computed
+        parts: Dict[Tuple[str, int, str], Dict[str, np.ndarray]] = {}
+        lookups = [
+            (schema, index, workplace_id)
+            for index, segment in enumerate(segments)
+            if segment.cacheable
+            for schema in schemas
+            for workplace_id in workplace_ids
+        ]
+        cached = await asyncio.gather(
+            *[
+                self.cache.get(
+                    self._key(schema.key, workplace_id, params.period, segments[index])
+                )
+                for schema, index, workplace_id in lookups
+            ]
+        )
+        for (schema, index, workplace_id), raw in zip(lookups, cached, strict=True):
+            columns = self._load(raw, schema)
+            if columns is not None:
+                parts[(schema.key, index, workplace_id)] = columns
+
+        missing = [
+            index
+            for index in range(len(segments))
+            if any(
+                (schema.key, index, workplace_id) not in parts
+                for schema in schemas
+                for workplace_id in workplace_ids
+            )
+        ]
+        runs: List[List[int]] = []
+        for index in missing:
+            if runs and runs[-1][-1] == index - 1:
+                runs[-1].append(index)
+            else:
+                runs.append([index])
+        logger.info(
+            f"Report segments: {len(segments) - len(missing)} cached, {len(missing)} computed in {len(runs)} request(s)"
+        )
+        await asyncio.gather(
+            *[self._compute_run(schemas, params, segments, run, parts) for run in runs]
+        )
+
+        reports: Dict[str, ColumnarBatch] = {}
+        for schema in schemas:
+            reports[schema.key] = self._merge(
+                schema,
+                workplace_ids,
+                [
+                    (position, parts[(schema.key, index, workplace_id)])
+                    for index in range(len(segments))
+                    for position, workplace_id in enumerate(workplace_ids)
+                ],
+            )
+        return reports, segments
+
+    async def _compute_run(
+        self,
+        schemas: List[ReportSchema],
+        params: ReportRequestParams,
+        segments: List[ReportSegment],
+        run: List[int],
+        parts: Dict[Tuple[str, int, str], Dict[str, np.ndarray]],
+    ) -> None:
+        run_params = params.copy(
+            update={
+                "start_date": segments[run[0]].start_date,
+                "end_date": segments[run[-1]].end_date,
+                "reports": [schema.key for schema in schemas],
+            }
+        )
+        row_streams = await self.source.stream_reports(run_params.reports, run_params)
+        segment_starts = np.array(
+            [segments[index].start_date for index in run], dtype="datetime64[D]"
+        )
+        workplace_ids = np.unique(np.asarray(params.workplace_ids, dtype=object))
+        writes = []
+        for schema in schemas:
+            columns = await collect_report_columns(row_streams[schema.key], schema)
+            # A row belongs to the segment its bucket starts in; the first bucket of the run
+            # may start before the requested start date
+            row_segments = np.maximum(
+                np.searchsorted(segment_starts, columns["date"], side="right") - 1, 0
+            )
+            # One stable sort by (segment, workplace) keeps the source order within each
+            # part; every part is then a slice of the sorted columns
+            groups = row_segments * len(workplace_ids) + np.searchsorted(
+                workplace_ids, columns["workplace_id"]
+            )
+            order = np.argsort(groups, kind="stable")
+            bounds = np.searchsorted(
+                groups[order], np.arange(len(run) * len(workplace_ids) + 1)
+            )
+            ordered = {
+                name: values[order]
+                for name, values in columns.items()
+                if name != "workplace_id"
+            }
+            for offset, index in enumerate(run):
+                for position, workplace_id in enumerate(workplace_ids.tolist()):
+                    group = offset * len(workplace_ids) + position
+                    part = {
+                        name: values[bounds[group] : bounds[group + 1]]
+                        for name, values in ordered.items()
+                    }
+                    parts[(schema.key, index, workplace_id)] = part
+                    if segments[index].cacheable:
+                        writes.append(
+                            self.cache.set(
+                                self._key(
+                                    schema.key,
+                                    workplace_id,
+                                    params.period,
+                                    segments[index],
+                                ),
+                                self._dump(part, schema),
+                                expire=self.ttl_seconds,
+                            )
+                        )
+        await asyncio.gather(*writes)
+
+    @staticmethod
+    def _merge(
+        schema: ReportSchema,
+        workplace_ids: List[str],
+        parts: List[Tuple[int, Dict[str, np.ndarray]]],
+    ) -> ColumnarBatch:
+        """Joins (workplace position, columns) parts, ordering rows by bucket, then by workplace like the source."""
+        dates = np.concatenate(
+            [as_column([], "date")] + [part["date"] for _, part in parts]
+        )
+        positions = np.concatenate(
+            [np.zeros(0, dtype=np.int64)]
+            + [np.full(len(part["date"]), position) for position, part in parts]
+        )
+        order = np.lexsort((positions, dates))
+        values = []
+        for column in schema.columns:
+            if column.name == "workplace_id":
+                values.append(np.asarray(workplace_ids, dtype=object)[positions[order]])
+            else:
+                values.append(
+                    np.concatenate(
+                        [as_column([], column.dtype)]
+                        + [part[column.name] for _, part in parts]
+                    )[order]
+                )
+        return ColumnarBatch(schema.column_names, values)
+
+    @staticmethod
+    def _dump(part: Dict[str, np.ndarray], schema: ReportSchema) -> str:
+        """
+        Packs a part as the raw little-endian bytes of its fixed-width columns (dates as
+        int32 epoch days), base64-encoded in a small JSON envelope that every CachePort
+        backend can store. String columns, if any, stay JSON lists.
+        """
+        columns = [column for column in schema.columns if column.name != "workplace_id"]
+        data = b"".join(
+            part[column.name].astype(_BINARY_DTYPES[column.dtype]).tobytes()
+            for column in columns
+            if column.dtype in _BINARY_DTYPES
+        )
+        return json.dumps(
+            {
+                "columns": [f"{column.name}:{column.dtype}" for column in columns],
+                "rows": len(part["date"]),
+                "data": base64.b64encode(data).decode("ascii"),
+                "strings": {
+                    column.name: part[column.name].tolist()
+                    for column in columns
+                    if column.dtype not in _BINARY_DTYPES
+                },
+            }
+        )
+
+    @staticmethod
+    def _load(raw: Any, schema: ReportSchema) -> Optional[Dict[str, np.ndarray]]:
+        raw = load_cached_json(raw)
+        columns = [column for column in schema.columns if column.name != "workplace_id"]
+        if not isinstance(raw, dict) or raw.get("columns") != [
+            f"{column.name}:{column.dtype}" for column in columns
+        ]:
+            return None  # Stored for another schema version or format: recompute
+        data = base64.b64decode(raw["data"])
+        rows = raw["rows"]
+        part: Dict[str, np.ndarray] = {}
+        offset = 0
+        for column in columns:
+            if column.dtype not in _BINARY_DTYPES:
+                part[column.name] = as_column(raw["strings"][column.name], column.dtype)
+                continue
+            values = np.frombuffer(
+                data, dtype=_BINARY_DTYPES[column.dtype], count=rows, offset=offset
+            )
+            offset += values.nbytes
+            part[column.name] = values.astype(COLUMN_NUMPY_DTYPES[column.dtype])
+        return part
@@ -0,0 +1,109 @@
+from typing import Dict, FrozenSet, Iterable, List, Set
+
+import numpy as np
+
+
+class WorkplaceAccessIndex:
+    """
+    Access rights of principals (users and groups) to workplaces, as bitmaps.
+
+    Every workplace id gets a dense integer position; a principal's access is a Python
+    int with those bits set, so intersections and unions are single C-level word
+    operations however many workplaces a tenant has, and a bitmap costs one bit per
+    workplace instead of a list entry per grant. Principals inherit the access of the
+    groups they belong to (groups can belong to groups); effective bitmaps are memoized
+    until the next change.
+
+    Bitmaps are built from and decoded to id lists through NumPy in linear time.
+    """
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._grants: Dict[str, int] = {}
+        self._parents: Dict[str, Set[str]] = {}
+        self._effective: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add_workplaces(self, workplace_ids: Iterable[str]) -> None:
+        for workplace_id in workplace_ids:
+            if workplace_id not in self._positions:
+                self._positions[workplace_id] = len(self._ids)
+                self._ids.append(workplace_id)
+
+    def grant(self, principal: str, workplace_ids: Iterable[str]) -> None:
+        """Gives `principal` access to the workplaces (registering unknown ones)."""
+        workplace_ids = list(workplace_ids)
+        self.add_workplaces(workplace_ids)
+        self._grants[principal] = self._grants.get(principal, 0) | self.bitmap(
+            workplace_ids
+        )
+        self._effective.clear()
+
+    def revoke(self, principal: str, workplace_ids: Iterable[str]) -> None:
+        """Removes direct grants; access inherited from groups is kept."""
+        self._grants[principal] = self._grants.get(principal, 0) & ~self.bitmap(
+            workplace_ids
+        )
+        self._effective.clear()
+
+    def add_to_group(self, principal: str, group: str) -> None:
+        """`principal` (a user or a group) inherits every access of `group`."""
+        self._parents.setdefault(principal, set()).add(group)
+        self._effective.clear()
+
+    def remove_from_group(self, principal: str, group: str) -> None:
+        self._parents.get(principal, set()).discard(group)
+        self._effective.clear()
+
+    def bitmap(self, workplace_ids: Iterable[str]) -> int:
+        """Bitmap of the given workplaces; unknown ids are left out."""
+        positions = [
+            self._positions[wp_id]
+            for wp_id in workplace_ids
+            if wp_id in self._positions
+        ]
+        if not positions:
+            return 0
+        bits = np.zeros(len(self._ids), dtype=bool)
+        bits[positions] = True
+        return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+    def workplace_ids(self, bitmap: int) -> FrozenSet[str]:
+        """The workplaces whose bits are set in `bitmap`."""
+        if not bitmap:
+            return frozenset()
+        raw = np.frombuffer(
+            bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"), dtype=np.uint8
+        )
+        positions = np.flatnonzero(np.unpackbits(raw, bitorder="little"))
+        return frozenset(self._ids[position] for position in positions.tolist())
+
+    def access_bitmap(self, principal: str) -> int:
+        """Direct and inherited access of `principal`, as a bitmap."""
+        bitmap = self._effective.get(principal)
+        if bitmap is None:
+            bitmap = self._resolve(principal, set())
+            self._effective[principal] = bitmap
+        return bitmap
+
+    def accessible_ids(self, principal: str) -> FrozenSet[str]:
+        return self.workplace_ids(self.access_bitmap(principal))
+
+    def filter(self, principal: str, workplace_ids: Iterable[str]) -> FrozenSet[str]:
+        """The given workplaces `principal` may access: one AND of two bitmaps."""
+        return self.workplace_ids(
+            self.bitmap(workplace_ids) & self.access_bitmap(principal)
+        )
+
+    def _resolve(self, principal: str, visiting: Set[str]) -> int:
+        if principal in self._effective:
+            return self._effective[principal]
+        visiting.add(principal)  # Membership cycles contribute nothing twice
+        bitmap = self._grants.get(principal, 0)
+        for group in self._parents.get(principal, ()):
+            if group not in visiting:
+                bitmap |= self._resolve(group, visiting)
+        return bitmap
@@ -0,0 +1,211 @@
+import heapq
+import unicodedata
+from typing import Collection, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.models.workplace import Workplace
+
+# Terms shorter than this are matched as word prefixes, longer ones anywhere in a word
+_TRIGRAM = 3
+
+
+def normalize_name(text: str) -> str:
+    """Case- and accent-insensitive form of a name or query, with single spaces."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return " ".join(
+        "".join(char for char in decomposed if not unicodedata.combining(char)).split()
+    )
+
+
+def _trigrams(word: str) -> Set[str]:
+    return {word[i : i + _TRIGRAM] for i in range(len(word) - _TRIGRAM + 1)}
+
+
+def _short_prefixes(word: str) -> Set[str]:
+    return {word[:length] for length in range(1, _TRIGRAM)}
+
+
+def _add(postings: Dict[str, Set[str]], key: str, value: str) -> None:
+    postings.setdefault(key, set()).add(value)
+
+
+def _discard(postings: Dict[str, Set[str]], key: str, value: str) -> bool:
+    """Removes value from the key's postings; True when the key is left without any."""
+    values = postings[key]
+    values.discard(value)
+    if not values:
+        del postings[key]
+        return True
+    return False
+
+
+class WorkplaceNameIndex:
+    """
+    In-memory search index over workplace names, for type-ahead pickers.
+
+    Names are split into words, and each distinct word keeps the set of workplaces
+    using it. Query terms are matched against the vocabulary of distinct words, which
+    is far smaller than the number of workplaces: terms of three characters or more
+    through a trigram index (so they match anywhere in a word), shorter ones through
+    their one- and two-character prefixes. A term's workplaces are then the union of its
+    words' sets, and every term of the query must match, so the result is their
+    intersection with the caller's accessible ids. Most of the work is C-level set
+    arithmetic; selective queries answer in well under a millisecond at 100k workplaces.
+
+    Matches are ranked: exact name, then name prefix, then every term a word prefix,
+    then the rest, alphabetically within each rank. Ranks are filled in order and only
+    until `limit` results are found.
+
+    upsert() and remove() update the structures for one workplace, so the index follows
+    changes without being rebuilt.
+    """
+
+    def __init__(self):
+        self._workplaces: Dict[str, Workplace] = {}
+        self._sort_keys: Dict[str, Tuple[str, str]] = {}  # id -> (normalized name, id)
+        self._exact: Dict[str, Set[str]] = {}  # normalized name -> ids
+        self._word_postings: Dict[str, Set[str]] = {}  # word -> ids
+        self._first_word_postings: Dict[
+            str, Set[str]
+        ] = {}  # first word of the name -> ids
+        self._vocabulary_trigrams: Dict[str, Set[str]] = {}  # trigram -> words
+        self._vocabulary_prefixes: Dict[
+            str, Set[str]
+        ] = {}  # 1-2 character prefix -> words
+
+    def __len__(self) -> int:
+        return len(self._workplaces)
+
+    def upsert(self, workplace: Workplace) -> None:
+        if workplace.id in self._workplaces:
+            self.remove(workplace.id)
+        name = normalize_name(workplace.name)
+        words = name.split()
+        self._workplaces[workplace.id] = workplace
+        self._sort_keys[workplace.id] = (name, workplace.id)
+        _add(self._exact, name, workplace.id)
+        if words:
+            _add(self._first_word_postings, words[0], workplace.id)
+        for word in set(words):
+            if word not in self._word_postings:
+                self._add_to_vocabulary(word)
+            _add(self._word_postings, word, workplace.id)
+
+    def remove(self, workplace_id: str) -> None:
+        if workplace_id not in self._workplaces:
+            return
+        name, _ = self._sort_keys.pop(workplace_id)
+        del self._workplaces[workplace_id]
+        words = name.split()
+        _discard(self._exact, name, workplace_id)
+        if words:
+            _discard(self._first_word_postings, words[0], workplace_id)
+        for word in set(words):
+            if _discard(self._word_postings, word, workplace_id):
+                self._remove_from_vocabulary(word)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        accessible_ids: Optional[Collection[str]] = None,
+    ) -> List[Workplace]:
+        """
+        Up to `limit` best matches for `query`, among `accessible_ids` when given.
+        An empty query matches nothing.
+        """
+        terms = normalize_name(query).split()
+        if not terms or limit <= 0:
+            return []
+        term_words = [self._matching_words(term) for term in terms]
+        term_ids = sorted((self._ids_of(words) for words in term_words), key=len)
+        candidates = term_ids[0]
+        if accessible_ids is not None:
+            candidates = candidates.intersection(accessible_ids)
+        for ids in term_ids[1:]:
+            if not candidates:
+                return []
+            candidates = candidates & ids
+        if not candidates:
+            return []
+
+        results: List[str] = []
+        for rank in self._ranks(" ".join(terms), terms, term_words):
+            matches = rank(candidates)
+            if matches:
+                results.extend(
+                    heapq.nsmallest(
+                        limit - len(results), matches, key=self._sort_keys.__getitem__
+                    )
+                )
+                candidates = candidates - matches
+            if len(results) >= limit or not candidates:
+                break
+        return [self._workplaces[wp_id] for wp_id in results]
+
+    def _ranks(self, query: str, terms: List[str], term_words: List[Set[str]]):
+        """Functions selecting, among candidates, the matches of each rank, best rank first."""
+
+        def exact(candidates: Set[str]) -> Set[str]:
+            return candidates & self._exact.get(query, set())
+
+        def name_prefix(candidates: Set[str]) -> Set[str]:
+            first_words = [word for word in term_words[0] if word.startswith(terms[0])]
+            starting = candidates & self._ids_of(first_words, self._first_word_postings)
+            return {
+                wp_id
+                for wp_id in starting
+                if self._sort_keys[wp_id][0].startswith(query)
+            }
+
+        def word_prefixes(candidates: Set[str]) -> Set[str]:
+            for term, words in zip(terms, term_words, strict=True):
+                candidates = candidates & self._ids_of(
+                    word for word in words if word.startswith(term)
+                )
+            return candidates
+
+        def others(candidates: Set[str]) -> Set[str]:
+            return candidates
+
+        return exact, name_prefix, word_prefixes, others
+
+    def _matching_words(self, term: str) -> Set[str]:
+        """Vocabulary words containing `term` (words starting with it for short terms)."""
+        if len(term) < _TRIGRAM:
+            return self._vocabulary_prefixes.get(term, set())
+        word_sets = sorted(
+            (
+                self._vocabulary_trigrams.get(trigram, set())
+                for trigram in _trigrams(term)
+            ),
+            key=len,
+        )
+        # Trigrams may come in another order within the word: check the term itself
+        return {
+            word for word in word_sets[0].intersection(*word_sets[1:]) if term in word
+        }
+
+    def _ids_of(
+        self, words: Iterable[str], postings: Optional[Dict[str, Set[str]]] = None
+    ) -> Set[str]:
+        """Workplaces using any of `words`. May return a postings set itself: never mutate the result."""
+        postings = self._word_postings if postings is None else postings
+        words = list(words)
+        if len(words) == 1:
+            return postings.get(words[0], set())
+        ids: Set[str] = set()
+        for word in words:
+            ids.update(postings.get(word, ()))
+        return ids
+
+    def _add_to_vocabulary(self, word: str) -> None:
+        for trigram in _trigrams(word):
+            _add(self._vocabulary_trigrams, trigram, word)
+        for prefix in _short_prefixes(word):
+            _add(self._vocabulary_prefixes, prefix, word)
+
+    def _remove_from_vocabulary(self, word: str) -> None:
+        for trigram in _trigrams(word):
+            _discard(self._vocabulary_trigrams, trigram, word)
+        for prefix in _short_prefixes(word):
+            _discard(self._vocabulary_prefixes, prefix, word)
@@ -1,6 +1,12 @@
 from .redis_cache_service import RedisCacheService
 from .memcached_cache_service import MemcachedCacheService
 from .redis_distributed_lock_service import RedisDistributedLockService # New import
+from .report_archive_service import ArchiveStats, ReportArchiveService, ZipStreamWriter
+from .in_memory_cache_service import InMemoryCacheService
+from .export_cache_service import CachedExport, ExportCacheService
+from .in_memory_distributed_lock_service import InMemoryDistributedLockService
+from .export_job_service import ExportJobError, ExportJobService
+from .export_coalescing_service import ExportCoalescingService
 # It's good practice to also include other existing services if they are meant to be publicly available
 # For example, if example_service.py contains ExampleServiceImpl that should be available:
 # from .example_service import ExampleServiceImpl
@@ -9,5 +15,15 @@ __all__ = [
     "RedisCacheService",
     "MemcachedCacheService",
     "RedisDistributedLockService", # New export
+    "ArchiveStats",
+    "ReportArchiveService",
+    "ZipStreamWriter",
+    "InMemoryCacheService",
+    "CachedExport",
+    "ExportCacheService",
+    "InMemoryDistributedLockService",
+    "ExportJobError",
+    "ExportJobService",
+    "ExportCoalescingService",
     # "ExampleServiceImpl", # Add if it exists and should be exported
 ]
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import hmac
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from app.core.ports.api_key_store_port import ApiKeyStorePort
+
+
+def hash_api_key(api_key: str, pepper: bytes = b"") -> str:
+    """
+    The hex digest under which a key is stored: HMAC-SHA256 keyed with `pepper`, or
+    plain SHA-256 without one. API keys are long random strings, so a fast hash is
+    enough; the pepper keeps a leaked store from being checked against guessed keys.
+    """
+    if pepper:
+        return hmac.new(pepper, api_key.encode("utf-8"), hashlib.sha256).hexdigest()
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class ApiKeyAuthenticator:
+    """
+    Resolves API keys to principals through an ApiKeyStorePort, with an in-process cache.
+
+    Keys are hashed first and only the digest is looked up, so neither the cache nor the
+    store compares secrets byte by byte, and how long a lookup takes says nothing about
+    how close a guess was. Verified digests are kept in a TTL + LRU map: on the hot path,
+    authentication is one hash and one dict lookup, with no store round trip.
+
+    Unknown keys are cached too (negative caching), for a shorter time and in a separate,
+    smaller map, so a client retrying a bad key does not reach the store on every request
+    and a flood of random keys cannot evict the valid ones. Concurrent misses on the
+    same key share one store lookup.
+
+    A revoked key keeps working in a process for up to ttl_seconds unless invalidate() is
+    called there; a lookup racing with invalidate() is not cached. Store errors are not
+    cached and propagate to the caller.
+    """
+
+    def __init__(
+        self,
+        store: ApiKeyStorePort,
+        pepper: bytes = b"",
+        ttl_seconds: float = 60,
+        negative_ttl_seconds: float = 10,
+        max_entries: int = 100_000,
+        max_negative_entries: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.store = store
+        self.pepper = pepper
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self.max_negative_entries = max_negative_entries
+        self._clock = clock
+        self._principals: "OrderedDict[str, Tuple[str, float]]" = (
+            OrderedDict()
+        )  # digest -> (principal, expires at)
+        self._unknown: "OrderedDict[str, float]" = OrderedDict()  # digest -> expires at
+        self._lookups: Dict[str, "asyncio.Future[Optional[str]]"] = {}
+        # Bumped by invalidate(): a store lookup that was in flight meanwhile is not cached
+        self._generation = 0
+
+    def hash_key(self, api_key: str) -> str:
+        return hash_api_key(api_key, self.pepper)
+
+    async def authenticate(self, api_key: Optional[str]) -> Optional[str]:
+        """The principal of `api_key`, or None if it is missing, unknown or revoked."""
+        if not api_key:
+            return None
+        key_hash = self.hash_key(api_key)
+        now = self._clock()
+
+        entry = self._principals.get(key_hash)
+        if entry is not None:
+            if entry[1] > now:
+                self._principals.move_to_end(key_hash)
+                return entry[0]
+            del self._principals[key_hash]
+        expires_at = self._unknown.get(key_hash)
+        if expires_at is not None:
+            if expires_at > now:
+                return None
+            del self._unknown[key_hash]
+
+        lookup = self._lookups.get(key_hash)
+        if lookup is None:
+            lookup = asyncio.ensure_future(self._lookup(key_hash))
+            self._lookups[key_hash] = lookup
+            lookup.add_done_callback(lambda done: self._forget_lookup(key_hash, done))
+        return await asyncio.shield(
+            lookup
+        )  # One cancelled request must not fail the others
+
+    def invalidate(
+        self, api_key: Optional[str] = None, key_hash: Optional[str] = None
+    ) -> None:
+        """
+        Forgets one key (given in clear or as its hash) in this process, or every key without
+        arguments. Lookups already in flight are not cached, and later requests start anew.
+        """
+        self._generation += 1
+        if api_key is None and key_hash is None:
+            self._principals.clear()
+            self._unknown.clear()
+            self._lookups.clear()
+            return
+        key_hash = key_hash if key_hash is not None else self.hash_key(api_key)
+        self._principals.pop(key_hash, None)
+        self._unknown.pop(key_hash, None)
+        self._lookups.pop(key_hash, None)
+
+    async def _lookup(self, key_hash: str) -> Optional[str]:
+        generation = self._generation
+        principal = await self.store.get_principal(key_hash)
+        if generation != self._generation:
+            return principal  # Invalidated while the store answered: possibly a revoked key
+        now = self._clock()
+        if principal is not None:
+            if self.ttl_seconds > 0:
+                self._remember(
+                    self._principals,
+                    key_hash,
+                    (principal, now + self.ttl_seconds),
+                    self.max_entries,
+                )
+        elif self.negative_ttl_seconds > 0:
+            self._remember(
+                self._unknown,
+                key_hash,
+                now + self.negative_ttl_seconds,
+                self.max_negative_entries,
+            )
+        return principal
+
+    def _forget_lookup(
+        self, key_hash: str, lookup: "asyncio.Future[Optional[str]]"
+    ) -> None:
+        # invalidate() may have replaced it with a newer lookup already
+        if self._lookups.get(key_hash) is lookup:
+            del self._lookups[key_hash]
+
+    @staticmethod
+    def _remember(entries: OrderedDict, key_hash: str, value, max_entries: int) -> None:
+        entries[key_hash] = value
+        entries.move_to_end(key_hash)
+        while len(entries) > max_entries:
+            entries.popitem(last=False)
@@ -0,0 +1,79 @@
+import base64
+import json
+import logging
+from typing import Any, Optional, Tuple
+
+from app.core.ports.cache_port import CachePort, load_cached_json
+
+logger = logging.getLogger(__name__)
+
+
+class EncodedBlock:
+    """A CSV batch as ReportArchiveService writes it: the compressed block, CRC32 and raw size."""
+
+    __slots__ = ("block", "crc", "size")
+
+    def __init__(self, block: bytes, crc: int, size: int):
+        self.block = block
+        self.crc = crc
+        self.size = size
+
+    def as_tuple(self) -> Tuple[bytes, int, int]:
+        return self.block, self.crc, self.size
+
+
+class EncodedBlockCache:
+    """
+    Caches encoded archive blocks on top of any CachePort.
+
+    Blocks are independent raw-deflate blocks (or stored bytes), so a cached one is
+    spliced into any later archive as is (ZipStreamWriter.write_block) and its CRC32 is
+    combined with the others: serving a cached report segment costs a copy instead of CSV
+    encoding and compression. Entries are keyed by the batch's cache_key plus everything
+    that changes the encoded bytes (compression, level, header, columns); see
+    ReportArchiveService. Values are JSON strings, which every CachePort backend can store.
+    """
+
+    def __init__(
+        self,
+        cache: CachePort,
+        ttl_seconds: int = 24 * 3600,
+        max_block_bytes: int = 8 * 1024 * 1024,
+        key_prefix: str = "report-block:",
+    ):
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self.max_block_bytes = max_block_bytes
+        self.key_prefix = key_prefix
+
+    async def get(self, key: str) -> Optional[EncodedBlock]:
+        try:
+            raw: Any = await self.cache.get(f"{self.key_prefix}{key}")
+        except Exception as e:
+            logger.warning(f"Could not read encoded block {key}: {e}")
+            return None  # Encoded again, like any miss
+        raw = load_cached_json(raw)
+        if not isinstance(raw, dict) or not {"block", "crc", "size"} <= raw.keys():
+            return None
+        return EncodedBlock(base64.b64decode(raw["block"]), raw["crc"], raw["size"])
+
+    async def put(self, key: str, block: EncodedBlock) -> bool:
+        if len(block.block) > self.max_block_bytes:
+            return False
+        try:
+            await self.cache.set(
+                f"{self.key_prefix}{key}",
+                json.dumps(
+                    {
+                        "block": base64.b64encode(block.block).decode("ascii"),
+                        "crc": block.crc,
+                        "size": block.size,
+                    }
+                ),
+                expire=self.ttl_seconds,
+            )
+        except Exception as e:
+            # A cache outage must not break the archive being written
+            logger.warning(f"Could not cache encoded block {key}: {e}")
+            return False
+        return True
@@ -0,0 +1,60 @@
+from typing import Dict
+
+from app.core.models.report import ReportCostEstimate
+
+# Admission decisions
+ADMIT_SYNC = "sync"  # Streamed in the response
+ADMIT_JOB = "job"  # Queued as a background export job
+ADMIT_REJECT = "reject"  # Refused with 413
+
+
+class ExportAdmissionService:
+    """
+    Decides how an export runs from its cost estimate, before anything is generated.
+
+    Exports above max_rows or max_bytes are refused outright. Exports above sync_max_rows
+    or sync_max_bytes are too large to build while a client waits on the response: they go
+    to the background job queue, or are refused too when route_to_jobs is off. A limit of
+    0 disables it.
+    """
+
+    def __init__(
+        self,
+        max_rows: int = 0,
+        max_bytes: int = 0,
+        sync_max_rows: int = 0,
+        sync_max_bytes: int = 0,
+        route_to_jobs: bool = True,
+    ):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.sync_max_rows = sync_max_rows
+        self.sync_max_bytes = sync_max_bytes
+        self.route_to_jobs = route_to_jobs
+
+    def admit(self, estimate: ReportCostEstimate, background: bool = False) -> str:
+        """
+        ADMIT_SYNC, ADMIT_JOB or ADMIT_REJECT. Exports requested as background jobs only
+        have to fit the hard limits.
+        """
+        if _exceeds(estimate, self.max_rows, self.max_bytes):
+            return ADMIT_REJECT
+        if background:
+            return ADMIT_JOB
+        if _exceeds(estimate, self.sync_max_rows, self.sync_max_bytes):
+            return ADMIT_JOB if self.route_to_jobs else ADMIT_REJECT
+        return ADMIT_SYNC
+
+    @staticmethod
+    def headers(estimate: ReportCostEstimate) -> Dict[str, str]:
+        """The estimate as response headers, for capacity planning on the client and proxy side."""
+        return {
+            "X-Export-Estimated-Rows": str(estimate.rows),
+            "X-Export-Estimated-Bytes": str(estimate.bytes),
+        }
+
+
+def _exceeds(estimate: ReportCostEstimate, max_rows: int, max_bytes: int) -> bool:
+    return (max_rows > 0 and estimate.rows > max_rows) or (
+        max_bytes > 0 and estimate.bytes > max_bytes
+    )
@@ -0,0 +1,136 @@
+import base64
+import hashlib
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Optional
+
+from app.core.ports.cache_port import CachePort, load_cached_json
+
+logger = logging.getLogger(__name__)
+
+
+class CachedExport:
+    __slots__ = ("etag", "content")
+
+    def __init__(self, etag: str, content: bytes):
+        self.etag = etag
+        self.content = content
+
+
+class ExportCacheService:
+    """
+    Caches finished export archives on top of any CachePort.
+
+    Entries are addressed by the fingerprint of the effective report parameters (after the
+    access filter), so users with the same access set share them. Each stored archive gets
+    a strong ETag derived from a digest of its bytes: an archive regenerated identically
+    after an eviction gets the same ETag back, and different bytes never share one. The
+    ETag is only known once the archive is complete, so a streamed miss goes without it.
+
+    Two cache keys are kept per entry: a small one with the ETag, so conditional requests
+    (If-None-Match) are answered without loading the archive, and one with the archive itself.
+    Values are JSON strings, which every CachePort backend can store.
+    """
+
+    def __init__(
+        self,
+        cache: CachePort,
+        ttl_seconds: int = 300,
+        max_entry_bytes: int = 32 * 1024 * 1024,
+        key_prefix: str = "export:",
+    ):
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self.max_entry_bytes = max_entry_bytes
+        self.key_prefix = key_prefix
+
+    def _etag_key(self, fingerprint: str) -> str:
+        return f"{self.key_prefix}{fingerprint}:etag"
+
+    def _content_key(self, fingerprint: str) -> str:
+        return f"{self.key_prefix}{fingerprint}:content"
+
+    @staticmethod
+    def _load(raw: Any) -> Optional[dict]:
+        raw = load_cached_json(raw)
+        return raw if isinstance(raw, dict) else None
+
+    @staticmethod
+    def content_etag(content: bytes) -> str:
+        return f'"{hashlib.sha256(content).hexdigest()[:40]}"'
+
+    @staticmethod
+    def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        """If-None-Match evaluation (RFC 9110 13.1.2): weak comparison, '*' matches anything."""
+        if not if_none_match:
+            return False
+        candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+        if "*" in candidates:
+            return True
+        opaque = etag[2:] if etag.startswith("W/") else etag
+        return any((c[2:] if c.startswith("W/") else c) == opaque for c in candidates)
+
+    async def get_etag(self, fingerprint: str) -> Optional[str]:
+        entry = self._load(await self.cache.get(self._etag_key(fingerprint)))
+        return entry.get("etag") if entry else None
+
+    async def get(self, fingerprint: str) -> Optional[CachedExport]:
+        entry = self._load(await self.cache.get(self._content_key(fingerprint)))
+        if not entry or "etag" not in entry or "content" not in entry:
+            return None
+        return CachedExport(
+            etag=entry["etag"], content=base64.b64decode(entry["content"])
+        )
+
+    async def put(self, fingerprint: str, content: bytes) -> Optional[str]:
+        """Stores the archive; returns its ETag, or None when it is too large to be cached."""
+        if len(content) > self.max_entry_bytes:
+            return None
+        etag = self.content_etag(content)
+        # Content first: an ETag must never point at an entry that is not there yet
+        await self.cache.set(
+            self._content_key(fingerprint),
+            json.dumps(
+                {"etag": etag, "content": base64.b64encode(content).decode("ascii")}
+            ),
+            expire=self.ttl_seconds,
+        )
+        await self.cache.set(
+            self._etag_key(fingerprint),
+            json.dumps({"etag": etag}),
+            expire=self.ttl_seconds,
+        )
+        return etag
+
+    async def invalidate(self, fingerprint: str) -> None:
+        await self.cache.delete(self._etag_key(fingerprint))
+        await self.cache.delete(self._content_key(fingerprint))
+
+    async def tee(
+        self,
+        fingerprint: str,
+        chunks: AsyncIterator[bytes],
+        is_cacheable: Callable[[], bool] = lambda: True,
+    ) -> AsyncIterator[bytes]:
+        """
+        Passes `chunks` through unchanged while keeping a copy, and stores the archive once
+        the stream completes. Archives larger than max_entry_bytes stop being copied as soon
+        as they cross the limit; `is_cacheable` is checked at the end (e.g. to skip exports
+        in which a report failed).
+        """
+        buffer: Optional[bytearray] = bytearray()
+        async for chunk in chunks:
+            if buffer is not None:
+                if len(buffer) + len(chunk) > self.max_entry_bytes:
+                    buffer = None
+                else:
+                    buffer.extend(chunk)
+            yield chunk
+
+        if buffer is None or not is_cacheable():
+            return
+        try:
+            await self.put(fingerprint, bytes(buffer))
+        except Exception as e:
+            # A cache outage must not break a download that already succeeded
+            logger.warning(f"Could not cache export {fingerprint}: {e}")
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.ports.distributed_lock_port import DistributedLockPort
+from app.infrastructure.services.export_cache_service import ExportCacheService
+
+logger = logging.getLogger(__name__)
+
+# What a flight's starter returns: response headers and the archive byte stream
+FlightStart = Callable[[], Awaitable[Tuple[Dict[str, str], AsyncIterator[bytes]]]]
+
+
+class _Flight:
+    """One in-progress export, shared by every request that asked for it."""
+
+    def __init__(self):
+        self.headers: Dict[str, str] = {}
+        self.started = asyncio.Event()
+        self.changed = asyncio.Event()
+        self.chunks: List[bytes] = []
+        self.base = 0  # Absolute index of chunks[0] once the consumed prefix is trimmed
+        self.buffered_bytes = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.joinable = True
+        self.subscribers: Dict[
+            int, int
+        ] = {}  # subscriber id -> next absolute chunk index
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def end(self) -> int:
+        return self.base + len(self.chunks)
+
+    def notify(self) -> None:
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def trim(self) -> None:
+        # Once late joiners are refused, chunks every subscriber has sent can be dropped
+        if self.joinable or not self.subscribers:
+            return
+        drop = min(self.subscribers.values()) - self.base
+        if drop > 0:
+            self.buffered_bytes -= sum(len(chunk) for chunk in self.chunks[:drop])
+            del self.chunks[:drop]
+            self.base += drop
+            self.notify()  # Wakes the producer up if it waits for room
+
+
+class ExportCoalescingService:
+    """
+    Single-flight execution of identical exports.
+
+    Requests for the same key (the effective parameter fingerprint) that arrive while an
+    export is being produced do not run the report pipeline again: they attach to the
+    running flight, replay the bytes produced so far and then follow it live, so every
+    waiter receives exactly the same archive and headers (including the ETag). Production
+    runs in its own task, so it survives the disconnect of the request that started it and
+    is only cancelled once nobody is listening any more.
+
+    Replaying needs the whole prefix in memory, so a flight only accepts newcomers until it
+    has produced `join_window_bytes` (1 MiB by default; every export in progress holds
+    that much at most while joinable). Later requests start a new flight, or are served
+    from the export cache once the archive is complete, and the buffer is trimmed as
+    subscribers advance. From then on production is paced by the slowest subscriber: it
+    pauses while the chunks not yet sent to every subscriber exceed `max_buffer_bytes`, so
+    a flight holds at most that much (plus one chunk) however large the archive, as an
+    uncoalesced stream would.
+
+    Optionally, with a DistributedLockPort and an ExportCacheService shared between worker
+    processes (e.g. the Redis services), only the worker holding the fingerprint lock
+    generates; the others wait up to `cross_worker_wait_seconds` for the archive to appear
+    in the cache before falling back to generating it themselves.
+    """
+
+    def __init__(
+        self,
+        max_buffer_bytes: int = 32 * 1024 * 1024,
+        join_window_bytes: int = 1024 * 1024,
+        lock_service: Optional[DistributedLockPort] = None,
+        export_cache: Optional[ExportCacheService] = None,
+        cross_worker_wait_seconds: float = 30.0,
+        lock_expire_seconds: int = 300,
+        poll_interval: float = 0.1,
+        key_prefix: str = "export-flight:",
+    ):
+        self.max_buffer_bytes = max_buffer_bytes
+        # Nothing is trimmed while joinable: the window must fit in the buffer
+        self.join_window_bytes = min(join_window_bytes, max_buffer_bytes)
+        self.lock_service = lock_service
+        self.export_cache = export_cache
+        self.cross_worker_wait_seconds = cross_worker_wait_seconds
+        self.lock_expire_seconds = lock_expire_seconds
+        self.poll_interval = poll_interval
+        self.key_prefix = key_prefix
+        self._flights: Dict[str, _Flight] = {}
+        self._next_subscriber_id = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def join(
+        self, key: str, start: FlightStart
+    ) -> Tuple[Dict[str, str], AsyncIterator[bytes], bool]:
+        """
+        Returns the headers and byte stream of the export identified by `key`, starting it
+        with `start` if no joinable flight exists, plus whether this call started it.
+        Errors raised by `start` (before any byte is produced) are re-raised to every waiter.
+        """
+        flight = self._flights.get(key)
+        leader = flight is None or not flight.joinable
+        if leader:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._run(key, flight, start))
+
+        subscriber_id = self._next_subscriber_id
+        self._next_subscriber_id += 1
+        flight.subscribers[subscriber_id] = flight.base
+        try:
+            await flight.started.wait()
+            if flight.error is not None and not flight.chunks and flight.done:
+                raise flight.error
+        except BaseException:
+            self._leave(key, flight, subscriber_id)
+            raise
+        return dict(flight.headers), self._follow(key, flight, subscriber_id), leader
+
+    async def _run(self, key: str, flight: _Flight, start: FlightStart) -> None:
+        lock_key = f"{self.key_prefix}{key}"
+        lock_acquired = False
+        chunks: Optional[AsyncIterator[bytes]] = None
+        try:
+            if self.lock_service and self.export_cache:
+                lock_acquired = await self.lock_service.acquire(
+                    lock_key, timeout=0.05, expire=self.lock_expire_seconds
+                )
+                if lock_acquired:
+                    # The previous holder may have cached the archive just before releasing
+                    cached = await self.export_cache.get(key)
+                else:
+                    cached = await self._wait_for_other_worker(key, lock_key)
+                if cached is not None:
+                    flight.headers = {"ETag": cached.etag, "X-Export-Cache": "hit"}
+                    flight.started.set()
+                    await self._append(key, flight, cached.content)
+                    return
+
+            headers, chunks = await start()
+            flight.headers = headers
+            flight.started.set()
+            async for chunk in chunks:
+                await self._append(key, flight, chunk)
+        except asyncio.CancelledError as e:
+            flight.error = e
+            raise
+        except Exception as e:
+            # Delivered to every subscriber; logged once here
+            logger.info(f"Export flight {key[:12]} failed: {e}")
+            flight.error = e
+        finally:
+            if chunks is not None and hasattr(chunks, "aclose"):
+                await (
+                    chunks.aclose()
+                )  # Stops the archive producer when cancelled mid-stream
+            flight.done = True
+            flight.started.set()
+            flight.notify()
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if lock_acquired:
+                await self.lock_service.release(lock_key)
+
+    async def _wait_for_other_worker(self, key: str, lock_key: str):
+        deadline = time.monotonic() + self.cross_worker_wait_seconds
+        while time.monotonic() < deadline:
+            cached = await self.export_cache.get(key)
+            if cached is not None:
+                return cached
+            if not await self.lock_service.is_locked(lock_key):
+                # The other worker finished without caching (or died): generate here
+                return await self.export_cache.get(key)
+            await asyncio.sleep(self.poll_interval)
+        return None
+
+    async def _append(self, key: str, flight: _Flight, chunk: bytes) -> None:
+        flight.chunks.append(chunk)
+        flight.buffered_bytes += len(chunk)
+        if flight.joinable and flight.buffered_bytes > self.join_window_bytes:
+            flight.joinable = False
+            if self._flights.get(key) is flight:
+                del self._flights[key]  # Newcomers start their own flight
+            flight.trim()
+        flight.notify()
+        # Backpressure: wait for the slowest subscriber before producing more
+        while flight.buffered_bytes > self.max_buffer_bytes and flight.subscribers:
+            await flight.changed.wait()
+
+    async def _follow(
+        self, key: str, flight: _Flight, subscriber_id: int
+    ) -> AsyncIterator[bytes]:
+        try:
+            while True:
+                position = flight.subscribers[subscriber_id]
+                if position < flight.end:
+                    chunk = flight.chunks[position - flight.base]
+                    flight.subscribers[subscriber_id] = position + 1
+                    flight.trim()
+                    yield chunk
+                elif flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                else:
+                    await flight.changed.wait()
+        finally:
+            self._leave(key, flight, subscriber_id)
+
+    def _leave(self, key: str, flight: _Flight, subscriber_id: int) -> None:
+        flight.subscribers.pop(subscriber_id, None)
+        flight.trim()
+        if not flight.subscribers and flight.task and not flight.task.done():
+            # Nobody is listening any more: stop producing
+            flight.task.cancel()
+            if self._flights.get(key) is flight:
+                del self._flights[key]
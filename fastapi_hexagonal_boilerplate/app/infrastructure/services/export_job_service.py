@@ -0,0 +1,332 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from app.core.models.export_job import (
+    EXPORT_JOB_FAILED,
+    EXPORT_JOB_RUNNING,
+    EXPORT_JOB_SUCCEEDED,
+    ExportJob,
+)
+from app.core.models.report import ReportRequestParams
+from app.core.ports.cache_port import CachePort, load_cached_json
+from app.core.ports.distributed_lock_port import DistributedLockPort
+from app.core.use_cases.generate_dashboard_report_use_case import (
+    GenerateDashboardReportUseCase,
+)
+from app.infrastructure.services.report_archive_service import (
+    ArchiveStats,
+    ReportArchiveService,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ExportJobError(Exception):
+    """Raised when an export job cannot be created."""
+
+    pass
+
+
+class ExportJobService:
+    """
+    Runs dashboard exports in the background.
+
+    `submit` records a job and queues it; a pool of worker tasks executes
+    GenerateDashboardReportUseCase and writes the archive into `spool_dir`, updating the
+    job's progress as report files are completed. Job records live in a CachePort (shared
+    across workers when backed by Redis) and expire after `job_ttl_seconds`, together with
+    their spool file; a background task removes expired spool files every
+    `purge_interval_seconds`, off the event loop.
+
+    Identical exports are deduplicated: the first submitter takes a lock named after the
+    parameter fingerprint through the DistributedLockPort and holds it while the job is in
+    flight; later submitters find the lock taken and are handed the existing job. A job
+    that already succeeded is only handed out for `reuse_max_age_seconds` after it
+    finished, so a new request never gets an old export as its result; its archive stays
+    downloadable through its own job id until the job expires.
+    With several processes, the spool directory must be shared for downloads to work anywhere.
+    """
+
+    def __init__(
+        self,
+        use_case_factory: Callable[[], GenerateDashboardReportUseCase],
+        archive_service_factory: Callable[[], ReportArchiveService],
+        job_store: CachePort,
+        lock_service: DistributedLockPort,
+        spool_dir: Optional[str] = None,
+        max_workers: int = 2,
+        job_ttl_seconds: int = 3600,
+        reuse_max_age_seconds: int = 60,
+        purge_interval_seconds: int = 300,
+        lock_timeout: int = 1,
+        key_prefix: str = "export-job:",
+    ):
+        self.use_case_factory = use_case_factory
+        self.archive_service_factory = archive_service_factory
+        self.job_store = job_store
+        self.lock_service = lock_service
+        self.spool_dir = spool_dir or os.path.join(
+            tempfile.gettempdir(), "dashboard_exports"
+        )
+        self.max_workers = max(1, max_workers)
+        self.job_ttl_seconds = job_ttl_seconds
+        self.reuse_max_age_seconds = reuse_max_age_seconds
+        self.purge_interval_seconds = purge_interval_seconds
+        self.lock_timeout = lock_timeout
+        self.key_prefix = key_prefix
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+    # --- Job records -------------------------------------------------------------
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.key_prefix}{job_id}"
+
+    def _fingerprint_key(self, fingerprint: str) -> str:
+        return f"{self.key_prefix}by-fingerprint:{fingerprint}"
+
+    def _owners_key(self, job_id: str) -> str:
+        return f"{self.key_prefix}{job_id}:owners"
+
+    def _lock_key(self, fingerprint: str) -> str:
+        return f"{self.key_prefix}{fingerprint}"
+
+    def spool_path(self, job_id: str) -> str:
+        return os.path.join(self.spool_dir, f"{job_id}.zip")
+
+    async def get_job(self, job_id: str) -> Optional[ExportJob]:
+        raw = await self.job_store.get(self._job_key(job_id))
+        if raw is None:
+            return None
+        job = (
+            ExportJob.parse_raw(raw)
+            if isinstance(raw, (str, bytes))
+            else ExportJob.parse_obj(raw)
+        )
+        owners = await self._get_owners(job_id)
+        if owners:
+            job.owner_ids = owners
+        return job
+
+    async def _get_owners(self, job_id: str) -> List[str]:
+        raw = load_cached_json(await self.job_store.get(self._owners_key(job_id)))
+        return list(raw) if isinstance(raw, list) else []
+
+    async def _add_owner(self, job: ExportJob, owner: str) -> None:
+        """
+        Owners live under their own key rather than in the job record, which the worker
+        keeps rewriting with progress; re-reading after each write recovers an owner lost
+        to a concurrent joiner.
+        """
+        for _ in range(5):
+            owners = await self._get_owners(job.job_id)
+            if owner in owners:
+                break
+            await self.job_store.set(
+                self._owners_key(job.job_id),
+                json.dumps([*owners, owner]),
+                expire=self.job_ttl_seconds,
+            )
+        job.owner_ids = owners if owner in owners else [*owners, owner]
+
+    async def _save_job(self, job: ExportJob) -> None:
+        await self.job_store.set(
+            self._job_key(job.job_id), job.json(), expire=self.job_ttl_seconds
+        )
+
+    async def _find_reusable_job(self, fingerprint: str) -> Optional[ExportJob]:
+        job_id = await self.job_store.get(self._fingerprint_key(fingerprint))
+        job = await self.get_job(str(job_id)) if job_id else None
+        if job is None or job.status == EXPORT_JOB_FAILED:
+            return None
+        if job.status == EXPORT_JOB_SUCCEEDED:
+            age = (
+                (datetime.utcnow() - job.finished_at).total_seconds()
+                if job.finished_at
+                else 0
+            )
+            if age > self.reuse_max_age_seconds or not os.path.exists(
+                self.spool_path(job.job_id)
+            ):
+                return None
+        return job
+
+    # --- Submission ----------------------------------------------------------------
+
+    async def submit(
+        self, params: ReportRequestParams, user_id: Optional[str]
+    ) -> ExportJob:
+        """
+        Creates (or joins) the export job for already-resolved parameters
+        (see GenerateDashboardReportUseCase.resolve_params).
+        """
+        fingerprint = params.fingerprint()
+        owner = user_id or ""
+
+        job = await self._find_reusable_job(fingerprint)
+        if job is None:
+            if await self.lock_service.acquire(
+                self._lock_key(fingerprint),
+                timeout=self.lock_timeout,
+                expire=self.job_ttl_seconds,
+            ):
+                job = await self._create_job(fingerprint, params, owner)
+                return job
+            # Somebody else is creating or running the same export: join it
+            job = await self._wait_for_reusable_job(fingerprint)
+            if job is None:
+                raise ExportJobError(
+                    "An identical export is being set up, please retry shortly."
+                )
+
+        if owner not in job.owner_ids:
+            await self._add_owner(job, owner)
+        logger.info(
+            f"Export job {job.job_id} reused for fingerprint {fingerprint[:12]} by '{owner}'"
+        )
+        return job
+
+    async def _create_job(
+        self, fingerprint: str, params: ReportRequestParams, owner: str
+    ) -> ExportJob:
+        job = ExportJob(
+            job_id=uuid.uuid4().hex,
+            fingerprint=fingerprint,
+            params=params,
+            files_total=len(params.reports),
+            owner_ids=[owner],
+        )
+        await self._save_job(job)
+        await self.job_store.set(
+            self._owners_key(job.job_id),
+            json.dumps([owner]),
+            expire=self.job_ttl_seconds,
+        )
+        await self.job_store.set(
+            self._fingerprint_key(fingerprint), job.job_id, expire=self.job_ttl_seconds
+        )
+        self._ensure_workers()
+        await self._queue.put(job.job_id)
+        logger.info(
+            f"Export job {job.job_id} queued for fingerprint {fingerprint[:12]}"
+        )
+        return job
+
+    async def _wait_for_reusable_job(
+        self, fingerprint: str, attempts: int = 20
+    ) -> Optional[ExportJob]:
+        # The lock holder writes the fingerprint mapping right after taking the lock
+        for _ in range(attempts):
+            job = await self._find_reusable_job(fingerprint)
+            if job is not None:
+                return job
+            await asyncio.sleep(0.05)
+        return None
+
+    # --- Workers -------------------------------------------------------------------
+
+    def _ensure_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and all(not worker.done() for worker in self._workers):
+            return
+        # First use, or the previous loop is gone (e.g. between test sessions)
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._workers = [
+            loop.create_task(self._worker(index)) for index in range(self.max_workers)
+        ]
+        self._workers.append(loop.create_task(self._purge_periodically()))
+
+    async def _purge_periodically(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(
+                    self._purge_spool
+                )  # Directory scans block: keep them off the loop
+            except Exception as e:
+                logger.warning(f"Could not purge export spool {self.spool_dir}: {e}")
+            await asyncio.sleep(self.purge_interval_seconds)
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except Exception as e:  # The worker must survive any single job
+                logger.error(
+                    f"Export worker {index} crashed on job {job_id}: {e}", exc_info=True
+                )
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str) -> None:
+        job = await self.get_job(job_id)
+        if job is None:
+            logger.warning(f"Export job {job_id} expired before it could run")
+            return
+
+        job.status = EXPORT_JOB_RUNNING
+        await self._save_job(job)
+        final_path = self.spool_path(job_id)
+        partial_path = f"{final_path}.part"
+        started = time.monotonic()
+        try:
+            report = await self.use_case_factory().generate(job.params)
+            stats = ArchiveStats()
+            with open(partial_path, "wb") as spool_file:
+                async for chunk in self.archive_service_factory().stream(
+                    report, stats=stats
+                ):
+                    await asyncio.to_thread(spool_file.write, chunk)
+                    files_done = len(stats.files_written) + len(stats.failed_files)
+                    if files_done != job.files_done:
+                        job.files_done = files_done
+                        await self._save_job(job)
+            os.replace(partial_path, final_path)
+
+            job.status = EXPORT_JOB_SUCCEEDED
+            job.files_done = job.files_total
+            job.size_bytes = stats.bytes_written
+            logger.info(
+                f"Export job {job_id} finished in {time.monotonic() - started:.2f}s ({stats.bytes_written} bytes)"
+            )
+        except Exception as e:
+            logger.error(f"Export job {job_id} failed: {e}", exc_info=True)
+            job.status = EXPORT_JOB_FAILED
+            job.error = str(e)
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        finally:
+            job.finished_at = datetime.utcnow()
+            await self._save_job(job)
+            await self.lock_service.release(self._lock_key(job.fingerprint))
+
+    def _purge_spool(self) -> None:
+        """Removes archives older than the job TTL (their records have expired too)."""
+        cutoff = time.time() - self.job_ttl_seconds
+        try:
+            entries = list(os.scandir(self.spool_dir))
+        except FileNotFoundError:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            return
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass  # Being written or already removed by another process
+
+    async def shutdown(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
@@ -0,0 +1,47 @@
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from app.core.ports.cache_port import CachePort
+
+
+class InMemoryCacheService(CachePort):
+    """
+    Process-local CachePort implementation.
+    Entries honour `expire` (seconds) and, when `max_entries` is set, the least recently
+    used entry is evicted first. Useful as a default when no Redis/Memcached is configured,
+    and in tests. Values are stored as-is (no serialization), so callers must not mutate them.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+
+    def _get_live(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        _, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._get_live(key)
+        return entry[0] if entry else None
+
+    async def set(self, key: str, value: Any, expire: Optional[int] = None) -> None:
+        expires_at = time.monotonic() + expire if expire else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        if self.max_entries is not None:
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def exists(self, key: str) -> bool:
+        return self._get_live(key) is not None
@@ -0,0 +1,46 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+from app.core.ports.distributed_lock_port import DistributedLockPort
+
+
+class InMemoryDistributedLockService(DistributedLockPort):
+    """
+    Process-local DistributedLockPort implementation with the same semantics as
+    RedisDistributedLockService (expiring locks, polling acquire). Only coordinates
+    the tasks of one worker process; use the Redis service across processes.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, float] = {}  # lock_key -> monotonic expiry time
+
+    def _held(self, lock_key: str) -> bool:
+        expires_at = self._locks.get(lock_key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del self._locks[lock_key]
+            return False
+        return True
+
+    async def acquire(
+        self, lock_key: str, timeout: int = 10, expire: Optional[int] = 60
+    ) -> bool:
+        lock_expire_time = expire if expire is not None else 60
+        end_time = time.monotonic() + timeout
+        while True:
+            if not self._held(lock_key):
+                self._locks[lock_key] = time.monotonic() + lock_expire_time
+                return True
+            if time.monotonic() >= end_time:
+                return False
+            await asyncio.sleep(0.01)
+
+    async def release(self, lock_key: str) -> bool:
+        held = self._held(lock_key)
+        self._locks.pop(lock_key, None)
+        return held
+
+    async def is_locked(self, lock_key: str) -> bool:
+        return self._held(lock_key)
@@ -0,0 +1,761 @@
+import asyncio
+import csv
+import io
+import logging
+import os
+import struct
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import Executor
+from typing import AsyncIterator, Deque, List, Optional, Tuple, Union
+
+from app.core.models.report import (
+    ColumnarBatch,
+    GeneratedReport,
+    ReportFile,
+    ReportRowStream,
+)
+from app.infrastructure.services.encoded_block_cache import (
+    EncodedBlock,
+    EncodedBlockCache,
+)
+
+logger = logging.getLogger(__name__)
+
+# ZIP record signatures and limits (see PKWARE APPNOTE.TXT)
+_LOCAL_FILE_HEADER_SIG = 0x04034B50
+_DATA_DESCRIPTOR_SIG = 0x08074B50
+_CENTRAL_DIR_HEADER_SIG = 0x02014B50
+_ZIP64_END_OF_CENTRAL_DIR_SIG = 0x06064B50
+_ZIP64_END_OF_CENTRAL_DIR_LOCATOR_SIG = 0x07064B50
+_END_OF_CENTRAL_DIR_SIG = 0x06054B50
+_ZIP64_EXTRA_TAG = 0x0001
+
+_ZIP32_LIMIT = 0xFFFFFFFF
+_ZIP32_MAX_ENTRIES = 0xFFFF
+
+_FLAG_DATA_DESCRIPTOR = 0x08  # sizes and CRC follow the file data
+_FLAG_UTF8_FILENAME = 0x800
+
+_VERSION_DEFAULT = 20
+_VERSION_ZIP64 = 45
+_CREATE_SYSTEM_UNIX = 3
+_EXTERNAL_ATTR_FILE = 0o100644 << 16  # regular file, rw-r--r--
+
+# An empty final block with fixed Huffman codes: terminates a raw deflate stream
+_DEFLATE_FINAL_EMPTY_BLOCK = b"\x03\x00"
+
+_CRC32_POLY = 0xEDB88320  # Reflected CRC-32 polynomial
+
+_END_OF_STREAM = object()  # Sentinel closing the producer/consumer queue
+
+
+def _raw_deflate_compressor(compresslevel: int):
+    return zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+
+
+def _dos_date_time(date_time: Tuple[int, int, int, int, int, int]) -> Tuple[int, int]:
+    year, month, day, hour, minute, second = date_time
+    dos_date = ((year - 1980) << 9) | (month << 5) | day
+    dos_time = (hour << 11) | (minute << 5) | (second // 2)
+    return dos_date, dos_time
+
+
+def _crc32_multmodp(a: int, b: int) -> int:
+    # Multiplies two polynomials modulo the CRC-32 polynomial (zlib's multmodp)
+    m = 1 << 31
+    product = 0
+    while True:
+        if a & m:
+            product ^= b
+            if (a & (m - 1)) == 0:
+                break
+        m >>= 1
+        b = (b >> 1) ^ _CRC32_POLY if b & 1 else b >> 1
+    return product
+
+
+def _crc32_x2n_table() -> List[int]:
+    table = [1 << 30]  # x^1
+    for _ in range(31):
+        table.append(_crc32_multmodp(table[-1], table[-1]))
+    return table
+
+
+_CRC32_X2N_TABLE = _crc32_x2n_table()
+
+
+def crc32_combine(crc1: int, crc2: int, len2: int) -> int:
+    """
+    CRC-32 of A + B given crc32(A), crc32(B) and len(B), like zlib's crc32_combine
+    (which the zlib module does not expose). Costs O(log len2), independent of the data.
+    """
+    if len2 <= 0:
+        return crc1
+    # x^(8 * len2) mod P, i.e. the effect of appending len2 zero bytes to A
+    p = 1 << 31
+    n, k = len2, 3
+    while n:
+        if n & 1:
+            p = _crc32_multmodp(_CRC32_X2N_TABLE[k & 31], p)
+        n >>= 1
+        k += 1
+    return _crc32_multmodp(p, crc1) ^ crc2
+
+
+class _ZipEntry:
+    __slots__ = (
+        "filename",
+        "header_offset",
+        "zip64",
+        "crc",
+        "compress_size",
+        "file_size",
+        "compressor",
+        "has_blocks",
+    )
+
+    def __init__(self, filename: bytes, header_offset: int, zip64: bool):
+        self.filename = filename
+        self.header_offset = header_offset
+        self.zip64 = zip64
+        self.crc = 0
+        self.compress_size = 0
+        self.file_size = 0
+        self.compressor = None
+        self.has_blocks = False
+
+
+class ZipStreamWriter:
+    """
+    Incremental ZIP archive writer that never needs to seek.
+
+    Every method returns the bytes to emit next, so the caller decides where they go
+    (an HTTP response, a file, a queue). Entries are written with a trailing data
+    descriptor because their CRC and sizes are unknown until the data has been seen.
+    The central directory switches to ZIP64 records automatically once offsets or
+    the entry count outgrow the 32-bit format. A single entry larger than 4 GiB needs
+    `force_zip64=True` on `start_entry`, mirroring `zipfile.ZipFile.open(..., force_zip64=True)`;
+    ReportArchiveService sets it on every entry, whose sizes are never known up front.
+
+    Entry data is either passed raw to `write` (compressed here, on the calling thread) or
+    as blocks already compressed elsewhere with `write_block` (see encode_report_block);
+    an entry uses one or the other.
+    """
+
+    def __init__(
+        self,
+        compression: int = zipfile.ZIP_DEFLATED,
+        compresslevel: Optional[int] = None,
+        date_time: Optional[Tuple[int, int, int, int, int, int]] = None,
+    ):
+        if compression not in (zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED):
+            raise ValueError(
+                "Only ZIP_DEFLATED and ZIP_STORED are supported for streaming."
+            )
+        self.compression = compression
+        self.compresslevel = (
+            zlib.Z_DEFAULT_COMPRESSION if compresslevel is None else compresslevel
+        )
+        self._dos_date, self._dos_time = _dos_date_time(
+            date_time or time.localtime()[:6]
+        )
+        self._offset = 0
+        self._entries: List[_ZipEntry] = []
+        self._current: Optional[_ZipEntry] = None
+        self._closed = False
+
+    @property
+    def bytes_written(self) -> int:
+        return self._offset
+
+    def _emit(self, data: bytes) -> bytes:
+        self._offset += len(data)
+        return data
+
+    def start_entry(self, filename: str, force_zip64: bool = False) -> bytes:
+        if self._closed:
+            raise ValueError("Cannot add entries to a closed archive.")
+        if self._current is not None:
+            raise ValueError(
+                "The previous entry must be ended before starting a new one."
+            )
+
+        entry = _ZipEntry(filename.encode("utf-8"), self._offset, force_zip64)
+        self._current = entry
+
+        extra = b""
+        size_field = 0
+        if force_zip64:
+            # Sizes are unknown yet: placeholders in the header, real values in the descriptor
+            extra = struct.pack("<HHQQ", _ZIP64_EXTRA_TAG, 16, 0, 0)
+            size_field = _ZIP32_LIMIT
+        header = struct.pack(
+            "<IHHHHHIIIHH",
+            _LOCAL_FILE_HEADER_SIG,
+            _VERSION_ZIP64 if force_zip64 else _VERSION_DEFAULT,
+            _FLAG_DATA_DESCRIPTOR | _FLAG_UTF8_FILENAME,
+            self.compression,
+            self._dos_time,
+            self._dos_date,
+            0,
+            size_field,
+            size_field,
+            len(entry.filename),
+            len(extra),
+        )
+        return self._emit(header + entry.filename + extra)
+
+    def write(self, data: bytes) -> bytes:
+        entry = self._current
+        if entry is None:
+            raise ValueError("No entry has been started.")
+        if entry.has_blocks:
+            raise ValueError("Cannot mix write() and write_block() in one entry.")
+        if not data:
+            return b""
+        if self.compression == zipfile.ZIP_DEFLATED and entry.compressor is None:
+            # Negative wbits -> raw deflate stream, as required inside ZIP entries
+            entry.compressor = _raw_deflate_compressor(self.compresslevel)
+        entry.crc = zlib.crc32(data, entry.crc)
+        entry.file_size += len(data)
+        out = entry.compressor.compress(data) if entry.compressor else data
+        entry.compress_size += len(out)
+        return self._emit(out)
+
+    def write_block(self, block: bytes, crc: int, size: int) -> bytes:
+        """
+        Appends data compressed outside the writer: `block` must be a raw deflate sequence
+        ending on a byte boundary without a final block (Z_SYNC_FLUSH), or the data itself
+        for ZIP_STORED; `crc` and `size` describe the uncompressed data.
+        """
+        entry = self._current
+        if entry is None:
+            raise ValueError("No entry has been started.")
+        if entry.compressor is not None:
+            raise ValueError("Cannot mix write() and write_block() in one entry.")
+        entry.has_blocks = True
+        if not size:
+            return b""
+        entry.crc = crc32_combine(entry.crc, crc, size)
+        entry.file_size += size
+        entry.compress_size += len(block)
+        return self._emit(block)
+
+    def end_entry(self) -> bytes:
+        entry = self._current
+        if entry is None:
+            raise ValueError("No entry has been started.")
+        out = b""
+        if entry.compressor:
+            out = entry.compressor.flush()
+            entry.compressor = None
+        elif self.compression == zipfile.ZIP_DEFLATED:
+            # Block-mode (or empty) entry: the deflate stream still needs its final block
+            out = _DEFLATE_FINAL_EMPTY_BLOCK
+        entry.compress_size += len(out)
+
+        if not entry.zip64 and (
+            entry.file_size >= _ZIP32_LIMIT or entry.compress_size >= _ZIP32_LIMIT
+        ):
+            raise zipfile.LargeZipFile(
+                "File size too large, start the entry with force_zip64=True."
+            )
+
+        if entry.zip64:
+            descriptor = struct.pack(
+                "<IIQQ",
+                _DATA_DESCRIPTOR_SIG,
+                entry.crc,
+                entry.compress_size,
+                entry.file_size,
+            )
+        else:
+            descriptor = struct.pack(
+                "<IIII",
+                _DATA_DESCRIPTOR_SIG,
+                entry.crc,
+                entry.compress_size,
+                entry.file_size,
+            )
+
+        self._entries.append(entry)
+        self._current = None
+        return self._emit(out + descriptor)
+
+    def add_entry(self, filename: str, data: bytes) -> bytes:
+        """Convenience wrapper writing a complete small entry in one call."""
+        return self.start_entry(filename) + self.write(data) + self.end_entry()
+
+    def close(self) -> bytes:
+        if self._closed:
+            return b""
+        if self._current is not None:
+            raise ValueError("The last entry must be ended before closing the archive.")
+        self._closed = True
+
+        central_dir_offset = self._offset
+        records = []
+        for entry in self._entries:
+            zip64_fields = []
+            file_size, compress_size, header_offset = (
+                entry.file_size,
+                entry.compress_size,
+                entry.header_offset,
+            )
+            if file_size >= _ZIP32_LIMIT:
+                zip64_fields.append(file_size)
+                file_size = _ZIP32_LIMIT
+            if compress_size >= _ZIP32_LIMIT:
+                zip64_fields.append(compress_size)
+                compress_size = _ZIP32_LIMIT
+            if header_offset >= _ZIP32_LIMIT:
+                zip64_fields.append(header_offset)
+                header_offset = _ZIP32_LIMIT
+
+            extra = b""
+            if zip64_fields:
+                extra = struct.pack(
+                    f"<HH{len(zip64_fields)}Q",
+                    _ZIP64_EXTRA_TAG,
+                    8 * len(zip64_fields),
+                    *zip64_fields,
+                )
+            version = (
+                _VERSION_ZIP64 if (zip64_fields or entry.zip64) else _VERSION_DEFAULT
+            )
+            records.append(
+                struct.pack(
+                    "<IHHHHHHIIIHHHHHII",
+                    _CENTRAL_DIR_HEADER_SIG,
+                    (_CREATE_SYSTEM_UNIX << 8) | version,
+                    version,
+                    _FLAG_DATA_DESCRIPTOR | _FLAG_UTF8_FILENAME,
+                    self.compression,
+                    self._dos_time,
+                    self._dos_date,
+                    entry.crc,
+                    compress_size,
+                    file_size,
+                    len(entry.filename),
+                    len(extra),
+                    0,  # comment length
+                    0,  # disk number start
+                    0,  # internal attributes
+                    _EXTERNAL_ATTR_FILE,
+                    header_offset,
+                )
+                + entry.filename
+                + extra
+            )
+        central_dir = b"".join(records)
+        out = [self._emit(central_dir)]
+
+        entry_count = len(self._entries)
+        central_dir_size = len(central_dir)
+        if (
+            entry_count >= _ZIP32_MAX_ENTRIES
+            or central_dir_size >= _ZIP32_LIMIT
+            or central_dir_offset >= _ZIP32_LIMIT
+        ):
+            zip64_eocd_offset = self._offset
+            out.append(
+                self._emit(
+                    struct.pack(
+                        "<IQHHIIQQQQ",
+                        _ZIP64_END_OF_CENTRAL_DIR_SIG,
+                        44,  # size of the remaining record
+                        (_CREATE_SYSTEM_UNIX << 8) | _VERSION_ZIP64,
+                        _VERSION_ZIP64,
+                        0,
+                        0,
+                        entry_count,
+                        entry_count,
+                        central_dir_size,
+                        central_dir_offset,
+                    )
+                )
+            )
+            out.append(
+                self._emit(
+                    struct.pack(
+                        "<IIQI",
+                        _ZIP64_END_OF_CENTRAL_DIR_LOCATOR_SIG,
+                        0,
+                        zip64_eocd_offset,
+                        1,
+                    )
+                )
+            )
+            entry_count = min(entry_count, _ZIP32_MAX_ENTRIES)
+            central_dir_size = min(central_dir_size, _ZIP32_LIMIT)
+            central_dir_offset = min(central_dir_offset, _ZIP32_LIMIT)
+
+        out.append(
+            self._emit(
+                struct.pack(
+                    "<IHHHHIIH",
+                    _END_OF_CENTRAL_DIR_SIG,
+                    0,
+                    0,
+                    entry_count,
+                    entry_count,
+                    central_dir_size,
+                    central_dir_offset,
+                    0,
+                )
+            )
+        )
+        return b"".join(out)
+
+
+def _is_archivable(report_file: ReportFile) -> bool:
+    content = report_file.content
+    if isinstance(content, (ReportRowStream, str, bytes)):
+        return True
+    if isinstance(content, ColumnarBatch):
+        return len(content) > 0
+    return (
+        report_file.content_type == "text/csv"
+        and isinstance(content, list)
+        and bool(content)
+    )
+
+
+# One unit of work for encode_report_block: rows (or text) plus how to encode them
+ReportBlockPayload = Tuple[
+    Union[ColumnarBatch, list, str, bytes], Optional[List[str]], bool
+]
+
+
+def encode_report_block(
+    payload: Union[ColumnarBatch, list, str, bytes],
+    columns: Optional[List[str]],
+    write_header: bool,
+    compression: int,
+    compresslevel: int,
+) -> Tuple[bytes, int, int, float]:
+    """
+    Encodes one batch of report content and compresses it as an independent block.
+
+    `payload` is a ColumnarBatch, a list of CSV rows (dicts written with `columns`, or
+    plain sequences when `columns` is None) or already-encoded text. Deflate blocks start with an empty history
+    and end with Z_SYNC_FLUSH, so blocks produced anywhere concatenate into a valid stream
+    (ZipStreamWriter.write_block). Module-level and free of shared state, so it can run
+    in a thread or a process pool.
+
+    Returns (block, crc32 of the raw bytes, raw size, seconds spent).
+    """
+    started = time.perf_counter()
+    if isinstance(payload, bytes):
+        data = payload
+    elif isinstance(payload, str):
+        data = payload.encode("utf-8")
+    elif isinstance(payload, ColumnarBatch):
+        # Written straight from the column arrays: no dict per row
+        batch = payload.select(columns) if columns is not None else payload
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if write_header:
+            writer.writerow(batch.columns)
+        writer.writerows(batch.iter_rows())
+        data = buffer.getvalue().encode("utf-8")
+    else:
+        buffer = io.StringIO()
+        if columns is not None:
+            writer = csv.DictWriter(buffer, fieldnames=columns)
+            if write_header:
+                writer.writeheader()
+        else:  # Fallback for simple list of strings or other non-dict list
+            writer = csv.writer(buffer)
+        writer.writerows(payload)
+        data = buffer.getvalue().encode("utf-8")
+
+    if compression == zipfile.ZIP_DEFLATED and data:
+        compressor = _raw_deflate_compressor(compresslevel)
+        block = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    else:
+        block = data
+    return block, zlib.crc32(data), len(data), time.perf_counter() - started
+
+
+async def iter_report_file_payloads(
+    report_file: ReportFile, batch_rows: int = 1000
+) -> AsyncIterator[ReportBlockPayload]:
+    """
+    Splits a ReportFile into encode_report_block payloads without encoding anything.
+    CSV content (ColumnarBatch, list of dicts, list of lists, or a ReportRowStream) comes `batch_rows`
+    rows (or one stream batch) at a time, so only a few batches exist at any moment.
+    """
+    content = report_file.content
+    if isinstance(content, ReportRowStream):
+        # The CSV header comes from the declared columns, so even an empty stream has one
+        write_header = True
+        async for batch in content:
+            yield batch, content.columns, write_header
+            write_header = False
+        if write_header:
+            yield [], content.columns, True
+    elif isinstance(content, ColumnarBatch):
+        for start in range(0, len(content), batch_rows):
+            yield content.slice(start, start + batch_rows), content.columns, start == 0
+    elif (
+        report_file.content_type == "text/csv" and isinstance(content, list) and content
+    ):
+        # Ensure it's list of dicts, otherwise fall back to plain rows
+        columns = list(content[0].keys()) if isinstance(content[0], dict) else None
+        for start in range(0, len(content), batch_rows):
+            yield content[start : start + batch_rows], columns, start == 0
+    elif isinstance(content, (bytes, str)):
+        yield content, None, False
+    else:
+        raise TypeError(
+            f"Unsupported content for file '{report_file.filename}': {type(content).__name__}"
+        )
+
+
+class ArchiveStats:
+    """Outcome of one archive stream, filled in while the archive is produced."""
+
+    __slots__ = (
+        "files_written",
+        "failed_files",
+        "bytes_written",
+        "raw_bytes",
+        "offloaded_seconds",
+        "elapsed_seconds",
+        "cached_blocks",
+    )
+
+    def __init__(self):
+        self.files_written: List[str] = []
+        self.failed_files: List[str] = []
+        self.bytes_written = 0
+        self.raw_bytes = 0  # Uncompressed size of all entries
+        self.offloaded_seconds = (
+            0.0  # CSV encoding + compression done off the event loop
+        )
+        self.elapsed_seconds = 0.0
+        self.cached_blocks = 0  # Blocks spliced from the block cache, not encoded
+
+
+class ReportArchiveService:
+    """
+    Streams a GeneratedReport as a ZIP archive with bounded memory.
+
+    A producer task splits each report file into batches and has them CSV-encoded and
+    compressed by `executor` (a thread or process pool; None means the event loop's default
+    thread pool), keeping up to `max_pending_blocks` batches in flight per file. Blocks are
+    spliced in order by a ZipStreamWriter and handed to the consumer (the HTTP response)
+    through a bounded queue of roughly `chunk_size` byte chunks. The event loop itself only
+    moves bytes around, so a large export does not stall other requests.
+
+    Peak memory is about `queue_maxsize * chunk_size` plus `max_pending_blocks` CSV batches,
+    whatever the size of the export. `compresslevel` 0 stores entries uncompressed
+    (ZIP_STORED), the fastest option when bandwidth is cheaper than CPU.
+
+    With a `block_cache`, batches carrying a cache_key (e.g. whole past report segments)
+    are encoded once: later archives splice the cached compressed block and combine its
+    CRC32 instead of encoding and compressing the rows again.
+
+    Entries are stamped with the day the archive is produced (at midnight) rather than
+    the current time, so exporting unchanged data again that day yields the same bytes,
+    hence the same content-derived ETag (see ExportCacheService).
+    """
+
+    def __init__(
+        self,
+        queue_maxsize: int = 8,
+        chunk_size: int = 64 * 1024,
+        csv_batch_rows: int = 1000,
+        compresslevel: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        max_pending_blocks: int = 2,
+        block_cache: Optional[EncodedBlockCache] = None,
+    ):
+        self.queue_maxsize = queue_maxsize
+        self.chunk_size = chunk_size
+        self.csv_batch_rows = csv_batch_rows
+        self.compresslevel = (
+            zlib.Z_DEFAULT_COMPRESSION if compresslevel is None else compresslevel
+        )
+        self.compression = (
+            zipfile.ZIP_STORED if self.compresslevel == 0 else zipfile.ZIP_DEFLATED
+        )
+        self.executor = executor
+        self.max_pending_blocks = max(1, max_pending_blocks)
+        self.block_cache = block_cache
+
+    async def stream(
+        self, report: GeneratedReport, stats: Optional[ArchiveStats] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Yields the archive bytes. Pass an ArchiveStats to learn, once the stream is
+        exhausted, which files were written and which failed part-way through.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_maxsize)
+        producer = asyncio.create_task(
+            self._produce(report, queue, stats or ArchiveStats())
+        )
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is _END_OF_STREAM:
+                    break
+                yield chunk
+            await producer  # Re-raises any error from the producer
+        finally:
+            if not producer.done():
+                # Consumer went away (e.g. client disconnected): stop producing
+                producer.cancel()
+                try:
+                    await producer
+                except asyncio.CancelledError:
+                    pass
+
+    def _submit(self, payload: ReportBlockPayload) -> asyncio.Future:
+        return asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            encode_report_block,
+            *payload,
+            self.compression,
+            self.compresslevel,
+        )
+
+    def _block_key(self, payload: ReportBlockPayload) -> Optional[str]:
+        content, columns, write_header = payload
+        if (
+            self.block_cache is None
+            or not isinstance(content, ColumnarBatch)
+            or content.cache_key is None
+        ):
+            return None
+        # Everything besides the rows that changes the encoded bytes
+        columns_crc = zlib.crc32(
+            ",".join(columns if columns is not None else content.columns).encode(
+                "utf-8"
+            )
+        )
+        return f"{content.cache_key}:{self.compression}:{self.compresslevel}:{int(write_header)}:{columns_crc:08x}"
+
+    async def _encoded_block(
+        self, payload: ReportBlockPayload, stats: ArchiveStats
+    ) -> asyncio.Future:
+        """Future of the payload's block: from the block cache when it has it, else from the executor."""
+        key = self._block_key(payload)
+        if key is None:
+            return self._submit(payload)
+        cached = await self.block_cache.get(key)
+        if cached is not None:
+            stats.cached_blocks += 1
+            future = asyncio.get_running_loop().create_future()
+            future.set_result((*cached.as_tuple(), 0.0))
+            return future
+        return asyncio.ensure_future(self._encode_and_cache(payload, key))
+
+    async def _encode_and_cache(
+        self, payload: ReportBlockPayload, key: str
+    ) -> Tuple[bytes, int, int, float]:
+        block, crc, size, seconds = await self._submit(payload)
+        await self.block_cache.put(key, EncodedBlock(block, crc, size))
+        return block, crc, size, seconds
+
+    async def _produce(
+        self, report: GeneratedReport, queue: asyncio.Queue, stats: ArchiveStats
+    ) -> None:
+        writer = ZipStreamWriter(
+            compression=self.compression,
+            compresslevel=self.compresslevel,
+            date_time=(*time.localtime()[:3], 0, 0, 0),
+        )
+        pending = bytearray()
+        started = time.perf_counter()
+
+        async def emit(data: bytes) -> None:
+            pending.extend(data)
+            if len(pending) >= self.chunk_size:
+                await queue.put(bytes(pending))
+                pending.clear()
+
+        async def write_block(future: asyncio.Future) -> None:
+            block, crc, size, seconds = await future
+            stats.raw_bytes += size
+            stats.offloaded_seconds += seconds
+            await emit(writer.write_block(block, crc, size))
+
+        try:
+            async for report_file in report.iter_files():
+                if not _is_archivable(report_file):
+                    # Skip or log unsupported content for zipping
+                    logger.warning(
+                        f"Skipping file {report_file.filename} due to unsupported content type for zipping."
+                    )
+                    continue
+
+                # The entry's size is unknown until it has been streamed: always leave room
+                # for ZIP64 sizes, or an entry past 4 GiB would fail once already sent
+                await emit(writer.start_entry(report_file.filename, force_zip64=True))
+                payloads = iter_report_file_payloads(report_file, self.csv_batch_rows)
+                in_flight: Deque[asyncio.Future] = deque()
+                source_error: Optional[Exception] = None
+                try:
+                    while True:
+                        try:
+                            payload = await payloads.__anext__()
+                        except StopAsyncIteration:
+                            break
+                        except Exception as e:
+                            source_error = e
+                            break
+                        in_flight.append(await self._encoded_block(payload, stats))
+                        if len(in_flight) >= self.max_pending_blocks:
+                            await write_block(in_flight.popleft())
+                    # Batches already handed to the pool belong to the file even if the source failed
+                    while in_flight:
+                        await write_block(in_flight.popleft())
+                    if source_error is not None:
+                        raise source_error
+                except Exception as e:
+                    # Rows already sent cannot be taken back: close the truncated entry
+                    # and record the failure next to it, like the use case does for reports
+                    # that fail before streaming starts.
+                    logger.error(
+                        f"Error while streaming file {report_file.filename}: {e}",
+                        exc_info=True,
+                    )
+                    await emit(writer.end_entry())
+                    error_filename = (
+                        f"{os.path.splitext(report_file.filename)[0]}_error.txt"
+                    )
+                    message = f"An error occurred while generating '{report_file.filename}', the file is incomplete: {e}"
+                    await emit(
+                        writer.add_entry(error_filename, message.encode("utf-8"))
+                    )
+                    stats.failed_files.append(report_file.filename)
+                    continue
+                finally:
+                    for future in in_flight:
+                        future.cancel()  # Only left over after a failed block or a cancellation
+                await emit(writer.end_entry())
+                stats.files_written.append(report_file.filename)
+
+            pending.extend(writer.close())
+            stats.bytes_written = writer.bytes_written
+            stats.elapsed_seconds = time.perf_counter() - started
+            logger.info(
+                f"Archive of {len(stats.files_written)} files: {stats.raw_bytes} -> {stats.bytes_written} bytes "
+                f"in {stats.elapsed_seconds:.3f}s, {stats.offloaded_seconds:.3f}s of encoding/compression off the event loop, "
+                f"{stats.cached_blocks} cached block(s)"
+            )
+            if pending:
+                await queue.put(bytes(pending))
+            await queue.put(_END_OF_STREAM)
+        except Exception:
+            # Wake the consumer up; it re-raises this error when awaiting the producer.
+            # Cancellation is not caught here: the consumer has gone and nobody is reading.
+            await queue.put(_END_OF_STREAM)
+            raise
+        finally:
+            await report.aclose()  # Reports not sent yet must not keep generating
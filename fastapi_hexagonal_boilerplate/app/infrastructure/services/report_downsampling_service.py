@@ -0,0 +1,194 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.models.report import ColumnarBatch, ReportRowStream
+from app.infrastructure.adapters.report_columns import as_column
+
+# Layout of the reports that can be charted: one row per date and workplace, then metrics
+_KEY_COLUMNS = ["date", "workplace_id"]
+
+
+class ReportNotChartableError(ValueError):
+    """The report has no date x workplace x numeric metric layout to draw series from."""
+
+    pass
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets over many series at once.
+
+    `x` holds the n shared x values (ascending), `y` one row of n values per series.
+    Returns a (series, threshold) array of the selected indices, ascending per series,
+    always including the first and last point. Series with no more than `threshold`
+    points (or a threshold below 3) keep every point.
+
+    The next-bucket averages are computed for all buckets and series in one pass; only
+    the choice of each bucket's point depends on the previous one, so the Python loop
+    runs once per bucket (a few hundred times), each step vectorized over every series.
+    """
+    n = len(x)
+    series = y.shape[0]
+    if threshold >= n or threshold < 3:
+        return np.tile(np.arange(n), (series, 1))
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    # Buckets 1..threshold-2 split the points between the first and the last one
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(
+        np.int64
+    ) + 1
+    edges[-1] = n - 1
+    bucket_sizes = np.diff(edges)
+    # Average of each bucket, then the last point as the "bucket" after the last one
+    next_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / bucket_sizes, x[-1])[1:]
+    next_y = np.concatenate(
+        [np.add.reduceat(y[:, :-1], edges[:-1], axis=1) / bucket_sizes, y[:, -1:]],
+        axis=1,
+    )[:, 1:]
+
+    selected = np.empty((series, threshold), dtype=np.int64)
+    selected[:, 0] = 0
+    selected[:, -1] = n - 1
+    rows = np.arange(series)
+    a_x = np.full(series, x[0])
+    a_y = y[:, 0]
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        c_x, c_y = next_x[bucket], next_y[:, bucket]
+        # Twice the area of the triangle (a, point, c average) for every point of the bucket
+        areas = np.abs(
+            (a_x - c_x)[:, None] * (y[:, start:stop] - a_y[:, None])
+            - (a_x[:, None] - x[start:stop]) * (c_y - a_y)[:, None]
+        )
+        chosen = start + areas.argmax(axis=1)
+        selected[:, bucket + 1] = chosen
+        a_x = x[chosen]
+        a_y = y[rows, chosen]
+    return selected
+
+
+def downsample_report_columns(
+    columns: Dict[str, np.ndarray],
+    metrics: List[str],
+    workplace_ids: List[str],
+    points: int,
+) -> List[Dict[str, Any]]:
+    """
+    One series per (workplace, metric), each reduced to at most `points` points with LTTB.
+    Workplaces reported on the same dates are downsampled together in one vectorized call.
+    Module-level and free of shared state, so it can run in a thread or a process pool.
+    """
+    # Rows of each workplace, in date order: one sort by (workplace, date), then slices.
+    # Rows of workplaces that were not asked for sort last and are left out.
+    requested = np.unique(np.asarray(workplace_ids, dtype=object))
+    per_workplace: Dict[str, np.ndarray] = {}
+    if len(requested):
+        positions = np.minimum(
+            np.searchsorted(requested, columns["workplace_id"]), len(requested) - 1
+        )
+        codes = np.where(
+            requested[positions] == columns["workplace_id"], positions, len(requested)
+        )
+        order = np.lexsort((columns["date"], codes))
+        bounds = np.searchsorted(codes[order], np.arange(len(requested) + 1))
+        for index, workplace_id in enumerate(requested.tolist()):
+            per_workplace[workplace_id] = order[bounds[index] : bounds[index + 1]]
+
+    # Group the workplaces by date axis (with the mock and most real reports: a single group)
+    groups: Dict[bytes, List[str]] = {}
+    for workplace_id, rows in per_workplace.items():
+        groups.setdefault(columns["date"][rows].tobytes(), []).append(workplace_id)
+
+    selections: Dict[str, np.ndarray] = {}
+    for group_workplaces in groups.values():
+        x = columns["date"][per_workplace[group_workplaces[0]]].astype(np.int64)
+        if not metrics or not len(x):
+            continue
+        y = np.stack(
+            [
+                columns[metric][per_workplace[workplace_id]]
+                for workplace_id in group_workplaces
+                for metric in metrics
+            ]
+        )
+        chosen = lttb_indices(x, y, points).reshape(
+            len(group_workplaces), len(metrics), -1
+        )
+        for workplace_index, workplace_id in enumerate(group_workplaces):
+            selections[workplace_id] = chosen[workplace_index]
+
+    result = []
+    for workplace_id in workplace_ids:
+        if workplace_id not in selections:
+            continue
+        rows = per_workplace[workplace_id]
+        for metric_index, metric in enumerate(metrics):
+            series_rows = rows[selections[workplace_id][metric_index]]
+            result.append(
+                {
+                    "workplace_id": workplace_id,
+                    "metric": metric,
+                    "dates": [
+                        day.isoformat() for day in columns["date"][series_rows].tolist()
+                    ],
+                    "values": columns[metric][series_rows].tolist(),
+                }
+            )
+    return result
+
+
+class ReportDownsamplingService:
+    """
+    Turns a report stream into chart series of at most `points` points each.
+
+    A daily multi-year report has thousands of rows per workplace while a chart only draws a
+    few hundred: each (workplace, metric) series is reduced with LTTB, which keeps peaks and
+    troughs that plain striding or averaging would lose. The rows are read into arrays once;
+    the downsampling runs in `executor` (None means the event loop's default thread pool).
+    """
+
+    def __init__(self, executor: Optional[Executor] = None):
+        self.executor = executor
+
+    async def downsample(
+        self, row_stream: ReportRowStream, workplace_ids: List[str], points: int
+    ) -> List[Dict[str, Any]]:
+        if row_stream.columns[:2] != _KEY_COLUMNS:
+            raise ReportNotChartableError(
+                "Only reports with date and workplace_id columns can be charted."
+            )
+        columns = await self._collect(row_stream)
+        metrics = [
+            name for name in row_stream.columns[2:] if columns[name].dtype.kind in "iuf"
+        ]
+        if not metrics:
+            raise ReportNotChartableError("The report has no numeric columns to chart.")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            downsample_report_columns,
+            columns,
+            metrics,
+            workplace_ids,
+            points,
+        )
+
+    @staticmethod
+    async def _collect(row_stream: ReportRowStream) -> Dict[str, np.ndarray]:
+        parts: Dict[str, List[np.ndarray]] = {name: [] for name in row_stream.columns}
+        async for batch in row_stream:
+            if not isinstance(batch, ColumnarBatch):
+                batch = ColumnarBatch.from_rows(batch, row_stream.columns)
+            for name in row_stream.columns:
+                parts[name].append(np.asarray(batch.column(name)))
+        columns = {
+            name: np.concatenate(values) if values else np.array([])
+            for name, values in parts.items()
+        }
+        columns["date"] = as_column(columns["date"], "date")
+        columns["workplace_id"] = as_column(columns["workplace_id"], "string")
+        return columns
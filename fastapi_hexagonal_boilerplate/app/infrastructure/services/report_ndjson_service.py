@@ -0,0 +1,205 @@
+import asyncio
+import json
+import logging
+import zlib
+from concurrent.futures import Executor
+from datetime import date
+from typing import Any, AsyncIterator, List, Optional, Union
+
+from app.core.models.report import (
+    ColumnarBatch,
+    GeneratedReport,
+    ReportBatch,
+    ReportRowStream,
+)
+
+try:
+    import zstandard
+except (
+    ImportError
+):  # Optional dependency (the "zstd" extra): zstd is only offered when installed
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+_GZIP_WBITS = 31  # zlib container: gzip header and trailer
+
+
+def supported_encodings() -> List[str]:
+    """Content codings the NDJSON stream can use, most preferred first."""
+    return (["zstd"] if zstandard is not None else []) + ["gzip", "identity"]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """
+    Picks the content coding for an Accept-Encoding header (RFC 9110 12.5.3): the highest
+    q-value among the supported codings, ties broken by supported_encodings() order.
+    Falls back to identity, which is always acceptable here.
+    """
+    if not accept_encoding:
+        return "identity"
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, parameters = item.strip().partition(";")
+        quality = 1.0
+        parameter = parameters.strip()
+        if parameter.startswith("q="):
+            try:
+                quality = float(parameter[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding.strip().lower()] = quality
+    wildcard = weights.get("*", 0.0)
+    candidates = [
+        (weights.get(coding, wildcard), -rank, coding)
+        for rank, coding in enumerate(supported_encodings())
+        if coding != "identity"
+    ]
+    quality, _, coding = max(candidates)
+    return coding if quality > 0 else "identity"
+
+
+class _StreamCompressor:
+    """Compresses a stream chunk by chunk, flushing each chunk so clients can decode it right away."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(
+                zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, _GZIP_WBITS
+            )
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+        elif encoding == "identity":
+            self._compressor = None
+        else:
+            raise ValueError(f"Unsupported content coding '{encoding}'.")
+
+    def compress(self, data: bytes) -> bytes:
+        if self._compressor is None:
+            return data
+        if self.encoding == "gzip":
+            return self._compressor.compress(data) + self._compressor.flush(
+                zlib.Z_SYNC_FLUSH
+            )
+        return self._compressor.compress(data) + self._compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush() if self._compressor is not None else b""
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, date):
+        return value.isoformat()
+    if hasattr(value, "tolist"):  # NumPy scalars
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_ndjson_batch(
+    report_key: str, columns: List[str], batch: ReportBatch
+) -> bytes:
+    """
+    One JSON object per row, each with a "report" field, newline-terminated.
+    Module-level and free of shared state, so it can run in a thread or a process pool.
+    """
+    if isinstance(batch, ColumnarBatch):
+        rows = (dict(zip(batch.columns, row, strict=True)) for row in batch.iter_rows())
+    else:
+        rows = (
+            batch
+            if columns is None
+            else ({name: row.get(name) for name in columns} for row in batch)
+        )
+    lines = [
+        json.dumps(
+            {"report": report_key, **row}, default=_json_default, separators=(",", ":")
+        )
+        for row in rows
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+
+
+def _message_line(report_key: str, field: str, message: str) -> bytes:
+    return (
+        json.dumps({"report": report_key, field: message}, separators=(",", ":")) + "\n"
+    ).encode("utf-8")
+
+
+class ReportNdjsonService:
+    """
+    Streams the rows of a GeneratedReport as newline-delimited JSON (application/x-ndjson).
+
+    Batches are pulled from the report streams one at a time, JSON-encoded by `executor`
+    (None means the event loop's default thread pool), compressed and yielded. Nothing is
+    read ahead: the next batch is only requested once the consumer (the HTTP response,
+    hence the client socket) has taken the previous chunk, so memory stays flat at one
+    batch however many rows are sent. Reports that failed or had no data become a single
+    {"report": ..., "error" | "notice": ...} line; a failure in the middle of a report
+    appends an "error" line after the rows already sent.
+    """
+
+    def __init__(self, executor: Optional[Executor] = None):
+        self.executor = executor
+
+    async def stream(
+        self,
+        report_keys: List[str],
+        report: GeneratedReport,
+        encoding: str = "identity",
+    ) -> AsyncIterator[bytes]:
+        """`report_keys` are the requested keys, in the order of the report's files (see the use case)."""
+        compressor = _StreamCompressor(encoding)
+        loop = asyncio.get_running_loop()
+        try:
+            position = 0
+            async for report_file in report.iter_files():
+                report_key, position = report_keys[position], position + 1
+                content: Union[ReportRowStream, ColumnarBatch, list, str, bytes] = (
+                    report_file.content
+                )
+                if isinstance(content, (str, bytes)):
+                    message = (
+                        content.decode("utf-8")
+                        if isinstance(content, bytes)
+                        else content
+                    )
+                    field = "error" if report_key in report.failed_reports else "notice"
+                    yield compressor.compress(_message_line(report_key, field, message))
+                    continue
+
+                if isinstance(content, ReportRowStream):
+                    columns, batches = content.columns, content
+                else:
+                    columns, batches = None, _single_batch(content)
+                try:
+                    async for batch in batches:
+                        data = await loop.run_in_executor(
+                            self.executor,
+                            encode_ndjson_batch,
+                            report_key,
+                            columns,
+                            batch,
+                        )
+                        chunk = compressor.compress(data)
+                        if chunk:
+                            yield chunk
+                except Exception as e:
+                    # Rows already sent cannot be taken back: say the report is incomplete
+                    logger.error(
+                        f"Error while streaming report {report_key}: {e}", exc_info=True
+                    )
+                    yield compressor.compress(
+                        _message_line(
+                            report_key, "error", f"The report is incomplete: {e}"
+                        )
+                    )
+        finally:
+            await report.aclose()  # Reports not sent yet must not keep generating
+        yield compressor.finish()
+
+
+async def _single_batch(batch: ReportBatch) -> AsyncIterator[ReportBatch]:
+    yield batch
@@ -0,0 +1,70 @@
+import asyncio
+from typing import Dict, List, Optional, Set
+
+from app.core.models.workplace import Workplace
+from app.core.ports.workplace_port import WorkplacePort
+
+
+class WorkplaceLoader:
+    """
+    Request-scoped batching of workplace lookups (the DataLoader pattern).
+
+    load() calls made during the same event-loop iteration are not sent one by one: they
+    are queued and, once the current callbacks have run, fetched with a single
+    WorkplacePort.get_workplaces_by_ids call. Results are memoized for the loader's
+    lifetime, so asking twice for an ID costs nothing. Create one loader per request
+    (see get_workplace_loader): the memo is not invalidated and must not outlive it.
+    """
+
+    def __init__(self, workplace_port: WorkplacePort, max_batch_size: int = 1000):
+        self.workplace_port = workplace_port
+        self.max_batch_size = max_batch_size
+        self._results: Dict[str, "asyncio.Future[Optional[Workplace]]"] = {}
+        self._queue: List[str] = []
+        self._fetches: Set["asyncio.Task[None]"] = set()  # Referenced until done
+
+    async def load(self, workplace_id: str) -> Optional[Workplace]:
+        """The workplace with this ID, or None if there is none."""
+        future = self._results.get(workplace_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._results[workplace_id] = future
+            if not self._queue:
+                loop.call_soon(self._dispatch)  # After every load() of this iteration
+            self._queue.append(workplace_id)
+        return await asyncio.shield(
+            future
+        )  # One cancelled caller must not fail the others
+
+    async def load_many(self, workplace_ids: List[str]) -> List[Optional[Workplace]]:
+        """Workplaces in the order of `workplace_ids`, None for unknown IDs; one backend call."""
+        return list(
+            await asyncio.gather(
+                *[self.load(workplace_id) for workplace_id in workplace_ids]
+            )
+        )
+
+    def _dispatch(self) -> None:
+        queue, self._queue = self._queue, []
+        for start in range(0, len(queue), self.max_batch_size):
+            fetch = asyncio.ensure_future(
+                self._fetch(queue[start : start + self.max_batch_size])
+            )
+            self._fetches.add(fetch)
+            fetch.add_done_callback(self._fetches.discard)
+
+    async def _fetch(self, workplace_ids: List[str]) -> None:
+        try:
+            workplaces = await self.workplace_port.get_workplaces_by_ids(workplace_ids)
+        except Exception as e:
+            for workplace_id in workplace_ids:
+                # Failures are not memoized: a later load() asks the backend again
+                future = self._results.pop(workplace_id)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for workplace_id in workplace_ids:
+            future = self._results[workplace_id]
+            if not future.done():
+                future.set_result(workplaces.get(workplace_id))
@@ -3,11 +3,12 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
-from .api.routers import api_router
-
 # Initialize Limiter
+# Defined before the router import: endpoint modules import it from here.
 limiter = Limiter(key_func=get_remote_address, default_limits=["5/minute"])
 
+from .api.routers import api_router  # noqa: E402
+
 app = FastAPI(
     title="FastAPI Hexagonal Boilerplate",
     description="A boilerplate project for FastAPI with Hexagonal Architecture.",
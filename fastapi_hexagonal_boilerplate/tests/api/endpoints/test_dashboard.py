@@ -1,12 +1,18 @@
 import pytest
+import asyncio
 from httpx import AsyncClient
 from fastapi import status
 import zipfile
 import io
+import json
 from datetime import date, timedelta
 
 from app.main import app # Import your FastAPI app instance
 from app.api.security import VALID_API_KEY # To use the valid API key in tests
+from app.api.dependencies import get_export_admission_service, get_export_cache_service, get_workplace_port
+from app.core.models.report import ReportRequestParams
+from app.infrastructure.adapters.mock_workplace_adapter import MockWorkplaceAdapter
+from app.infrastructure.services.export_admission_service import ExportAdmissionService
 
 # Mark all tests in this module as async
 pytestmark = pytest.mark.asyncio
@@ -47,6 +53,12 @@ async def test_export_dashboard_data_success(client: AsyncClient, valid_headers)
         #     csv_content = csv_file.read().decode('utf-8')
         #     assert "date,workplace_id,visits,new_memberships" in csv_content # Check header
 
+        # Header declared by the report stream, one row per day and workplace
+        with zip_ref.open(f"activity_summary_day_{start_date}_to_{end_date}.csv") as csv_file:
+            csv_lines = csv_file.read().decode('utf-8').splitlines()
+            assert csv_lines[0] == "date,workplace_id,visits,new_memberships"
+            assert len(csv_lines) == 1 + 11 * 2
+
 async def test_export_dashboard_data_default_dates_and_period(client: AsyncClient, valid_headers):
     """Test with default dates and period."""
     today = date.today()
@@ -89,6 +101,15 @@ async def test_export_dashboard_empty_reports_string(client: AsyncClient, valid_
     assert "reports' query parameter cannot be empty" in response.json()["detail"]
 
 
+async def test_export_dashboard_unknown_report_key(client: AsyncClient, valid_headers):
+    """Unknown report keys are rejected with 400 before anything is generated."""
+    response = await client.get(
+        "/api/v1/dashboard/data/exporter?reports=activity_summary,no_such_report",
+        headers=valid_headers
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "no_such_report" in response.json()["detail"]
+
 async def test_export_dashboard_no_api_key(client: AsyncClient):
     """Test request without API key."""
     response = await client.get(
@@ -151,3 +172,262 @@ async def test_export_dashboard_no_workplace_ids_uses_accessible(client: AsyncCl
         #     content = csv_file.read().decode()
         #     assert "wp1" in content and "wp2" in content and "wp3" in content
         #     assert "wp4" not in content # Ensure restricted one isn't there by default
+
+async def test_requested_workplaces_are_filtered_by_the_access_index(client: AsyncClient, valid_headers, monkeypatch):
+    """The app's workplace port (cached in front of the mock) checks requested IDs with the mock's access index."""
+    filtered = []
+    original_filter = MockWorkplaceAdapter.filter_accessible_workplace_ids
+
+    async def recording_filter(self, user_id, workplace_ids):
+        workplace_ids = list(workplace_ids)
+        filtered.append(sorted(workplace_ids))
+        return await original_filter(self, user_id, workplace_ids)
+
+    monkeypatch.setattr(MockWorkplaceAdapter, "filter_accessible_workplace_ids", recording_filter)
+    await get_workplace_port().invalidate_all()
+    response = await client.get(
+        "/api/v1/dashboard/data/stream?workplace_ids=wp1,wp4&period=month&reports=activity_summary",
+        headers=valid_headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert {json.loads(line)["workplace_id"] for line in response.text.splitlines()} == {"wp1"}
+    assert filtered == [["wp1", "wp4"]]
+
+async def test_export_dashboard_cache_etag_and_not_modified(client: AsyncClient, valid_headers):
+    """A repeated export is served from the export cache and honours If-None-Match."""
+    url = "/api/v1/dashboard/data/exporter?workplace_ids=wp3,wp1&start_date=2023-02-01&end_date=2023-02-10&period=day&reports=item_statistics"
+
+    first = await client.get(url, headers=valid_headers)
+    assert first.status_code == status.HTTP_200_OK
+    assert first.headers["x-export-cache"] == "miss"
+    assert "etag" not in first.headers # Only known once the archive has been streamed
+
+    # Same effective workplace set in a different order hits the same entry
+    second = await client.get(url.replace("wp3,wp1", "wp1,wp3,wp1"), headers=valid_headers)
+    assert second.status_code == status.HTTP_200_OK
+    assert second.headers["x-export-cache"] == "hit"
+    etag = second.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+    assert second.content == first.content
+
+    not_modified = await client.get(url, headers={**valid_headers, "If-None-Match": etag})
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.content == b""
+
+    stale = await client.get(url, headers={**valid_headers, "If-None-Match": '"something-else"'})
+    assert stale.status_code == status.HTTP_200_OK
+
+    # Evicted, then regenerated with the same bytes: the client's ETag still validates
+    fingerprint = ReportRequestParams(
+        workplace_ids=["wp1", "wp3"], start_date=date(2023, 2, 1), end_date=date(2023, 2, 10), period="day",
+        reports=["item_statistics"],
+    ).fingerprint()
+    await get_export_cache_service().invalidate(fingerprint)
+    regenerated = await client.get(url, headers=valid_headers)
+    assert regenerated.headers["x-export-cache"] == "miss"
+    assert (await client.get(url, headers={**valid_headers, "If-None-Match": etag})).status_code == status.HTTP_304_NOT_MODIFIED
+
+async def test_export_dashboard_concurrent_identical_requests_share_archive(client: AsyncClient, valid_headers):
+    """Identical exports requested at the same time get the same bytes and headers."""
+    url = "/api/v1/dashboard/data/exporter?workplace_ids=wp2&start_date=2023-03-01&end_date=2023-06-30&period=week&reports=activity_summary,item_statistics"
+
+    responses = await asyncio.gather(*[client.get(url, headers=valid_headers) for _ in range(4)])
+
+    assert all(response.status_code == status.HTTP_200_OK for response in responses)
+    assert len({response.content for response in responses}) == 1
+    assert len({response.headers.get("etag") for response in responses}) == 1
+
+async def test_export_job_lifecycle(client: AsyncClient, valid_headers):
+    """POST creates a background job, identical jobs are shared, the archive is downloadable when done."""
+    body = {
+        "workplace_ids": ["wp2", "wp1"],
+        "start_date": "2022-03-01",
+        "end_date": "2022-03-31",
+        "period": "day",
+        "reports": ["activity_summary", "financial_overview"],
+    }
+    created = await client.post("/api/v1/dashboard/data/exports", json=body, headers=valid_headers)
+    assert created.status_code == status.HTTP_202_ACCEPTED
+    job = created.json()
+    assert job["files_total"] == 2
+    assert created.headers["location"] == job["status_url"]
+
+    duplicate = await client.post("/api/v1/dashboard/data/exports", json=body, headers=valid_headers)
+    assert duplicate.json()["job_id"] == job["job_id"]
+
+    for _ in range(100):
+        status_response = await client.get(job["status_url"], headers=valid_headers)
+        if status_response.json()["status"] == "succeeded":
+            break
+        await asyncio.sleep(0.02)
+    assert status_response.json()["progress"] == 1.0
+
+    download = await client.get(job["download_url"], headers=valid_headers)
+    assert download.status_code == status.HTTP_200_OK
+    assert download.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(download.content)) as zip_ref:
+        assert zip_ref.namelist() == [
+            "activity_summary_day_2022-03-01_to_2022-03-31.csv",
+            "financial_overview_day_2022-03-01_to_2022-03-31.csv",
+        ]
+
+async def test_export_job_unknown_id(client: AsyncClient, valid_headers):
+    response = await client.get("/api/v1/dashboard/data/exports/does-not-exist", headers=valid_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+async def test_report_pages_follow_keyset_cursors(client: AsyncClient, valid_headers):
+    """Pages chain through next_cursor and add up to the exported CSV."""
+    query = "workplace_ids=wp2,wp1&start_date=2023-01-10&end_date=2023-03-05&period=week"
+    export = await client.get(f"/api/v1/dashboard/data/exporter?{query}&reports=item_statistics", headers=valid_headers)
+    with zipfile.ZipFile(io.BytesIO(export.content)) as zip_ref:
+        csv_lines = zip_ref.read("item_statistics_week_2023-01-10_to_2023-03-05.csv").decode("utf-8").splitlines()
+
+    rows, cursor = [], None
+    while True:
+        url = f"/api/v1/dashboard/data/reports/item_statistics?{query}&limit=5" + (f"&cursor={cursor}" if cursor else "")
+        response = await client.get(url, headers=valid_headers)
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        assert page["columns"] == ["date", "workplace_id", "items_loaned", "items_returned"]
+        assert len(page["rows"]) <= 5
+        rows.extend(page["rows"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [",".join(str(value) for value in row) for row in rows] == csv_lines[1:]
+    assert rows[0][:2] == ["2023-01-09", "wp1"]
+
+async def test_report_page_rejects_foreign_cursor_and_unknown_report(client: AsyncClient, valid_headers):
+    first = await client.get(
+        "/api/v1/dashboard/data/reports/activity_summary?workplace_ids=wp1&period=day&limit=2", headers=valid_headers
+    )
+    cursor = first.json()["next_cursor"]
+    assert cursor
+
+    other_query = await client.get(
+        f"/api/v1/dashboard/data/reports/activity_summary?workplace_ids=wp2&period=day&limit=2&cursor={cursor}",
+        headers=valid_headers,
+    )
+    assert other_query.status_code == status.HTTP_400_BAD_REQUEST
+    garbage = await client.get("/api/v1/dashboard/data/reports/activity_summary?cursor=!!!", headers=valid_headers)
+    assert garbage.status_code == status.HTTP_400_BAD_REQUEST
+    unknown = await client.get("/api/v1/dashboard/data/reports/no_such_report", headers=valid_headers)
+    assert unknown.status_code == status.HTTP_400_BAD_REQUEST
+
+async def test_stream_dashboard_data_ndjson_matches_export(client: AsyncClient, valid_headers):
+    query = "workplace_ids=wp1,wp2&start_date=2023-01-01&end_date=2023-02-15&period=week&reports=activity_summary,item_statistics"
+    response = await client.get(f"/api/v1/dashboard/data/stream?{query}", headers={**valid_headers, "Accept-Encoding": "gzip"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    export = await client.get(f"/api/v1/dashboard/data/exporter?{query}", headers=valid_headers)
+    with zipfile.ZipFile(io.BytesIO(export.content)) as zip_ref:
+        for report_key in ("activity_summary", "item_statistics"):
+            csv_lines = zip_ref.read(f"{report_key}_week_2023-01-01_to_2023-02-15.csv").decode("utf-8").splitlines()
+            columns = csv_lines[0].split(",")
+            rows = [line for line in lines if line["report"] == report_key]
+            assert [",".join(str(row[name]) for name in columns) for row in rows] == csv_lines[1:]
+    assert lines[0]["report"] == "activity_summary" and lines[-1]["report"] == "item_statistics"
+
+async def test_stream_dashboard_data_identity_and_errors(client: AsyncClient, valid_headers):
+    response = await client.get(
+        "/api/v1/dashboard/data/stream?workplace_ids=wp1&period=month&reports=activity_summary",
+        headers={**valid_headers, "Accept-Encoding": "identity"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert "content-encoding" not in response.headers
+    assert all(json.loads(line)["workplace_id"] == "wp1" for line in response.text.splitlines())
+
+    unknown = await client.get("/api/v1/dashboard/data/stream?reports=no_such_report", headers=valid_headers)
+    assert unknown.status_code == status.HTTP_400_BAD_REQUEST
+    empty = await client.get("/api/v1/dashboard/data/stream?reports=,", headers=valid_headers)
+    assert empty.status_code == status.HTTP_400_BAD_REQUEST
+
+async def test_chart_series_are_downsampled(client: AsyncClient, valid_headers):
+    response = await client.get(
+        "/api/v1/dashboard/data/charts/activity_summary?workplace_ids=wp1,wp2&start_date=2021-01-01&end_date=2023-12-31&points=200",
+        headers=valid_headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    chart = response.json()
+    assert chart["period"] == "day"
+    assert [(s["workplace_id"], s["metric"]) for s in chart["series"]] == [
+        ("wp1", "visits"), ("wp1", "new_memberships"), ("wp2", "visits"), ("wp2", "new_memberships"),
+    ]
+    assert [s["workplace_name"] for s in chart["series"]] == ["Main Library"] * 2 + ["Downtown Branch"] * 2
+    for series in chart["series"]:
+        assert len(series["dates"]) == 200
+        assert series["dates"][0] == "2021-01-01" and series["dates"][-1] == "2023-12-31"
+
+    short = await client.get(
+        "/api/v1/dashboard/data/charts/activity_summary?workplace_ids=wp1&period=month&start_date=2023-01-01&end_date=2023-12-31",
+        headers=valid_headers,
+    )
+    assert [len(s["dates"]) for s in short.json()["series"]] == [12, 12] # Fewer rows than points: all kept
+
+    unknown = await client.get("/api/v1/dashboard/data/charts/no_such_report", headers=valid_headers)
+    assert unknown.status_code == status.HTTP_400_BAD_REQUEST
+    too_few = await client.get("/api/v1/dashboard/data/charts/activity_summary?points=2", headers=valid_headers)
+    assert too_few.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+async def test_export_admission_routes_large_exports_to_jobs_and_rejects_huge_ones(client: AsyncClient, valid_headers):
+    query = "workplace_ids=wp1,wp2&start_date=2023-01-01&end_date=2023-12-31&period=day&reports=activity_summary"
+    small = await client.get(f"/api/v1/dashboard/data/exporter?{query}", headers=valid_headers)
+    assert small.status_code == status.HTTP_200_OK
+    assert small.headers["x-export-estimated-rows"] == str(365 * 2)
+    assert int(small.headers["x-export-estimated-bytes"]) > 0
+
+    app.dependency_overrides[get_export_admission_service] = lambda: ExportAdmissionService(
+        max_rows=5_000, sync_max_rows=500
+    )
+    try:
+        # The archive cached above is still served as is
+        cached = await client.get(f"/api/v1/dashboard/data/exporter?{query}", headers=valid_headers)
+        assert cached.status_code == status.HTTP_200_OK
+
+        routed = await client.get(f"/api/v1/dashboard/data/exporter?{query.replace('12-31', '12-30')}", headers=valid_headers)
+        assert routed.status_code == status.HTTP_202_ACCEPTED
+        assert routed.headers["location"] == routed.json()["status_url"]
+        assert routed.headers["x-export-estimated-rows"] == str(364 * 2)
+
+        huge_query = "workplace_ids=wp1,wp2&start_date=2010-01-01&end_date=2023-12-31&period=day&reports=activity_summary"
+        rejected = await client.get(f"/api/v1/dashboard/data/exporter?{huge_query}", headers=valid_headers)
+        assert rejected.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        assert int(rejected.headers["x-export-estimated-rows"]) > 5_000
+        rejected_job = await client.post(
+            "/api/v1/dashboard/data/exports",
+            json={"workplace_ids": ["wp1", "wp2"], "start_date": "2010-01-01", "end_date": "2023-12-31", "period": "day", "reports": ["activity_summary"]},
+            headers=valid_headers,
+        )
+        assert rejected_job.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    finally:
+        app.dependency_overrides.pop(get_export_admission_service)
+
+async def test_export_from_json_body_matches_query_export(client: AsyncClient, valid_headers):
+    query = "workplace_ids=wp2,wp1&start_date=2023-03-01&end_date=2023-04-15&period=week&reports=activity_summary,item_statistics"
+    from_query = await client.get(f"/api/v1/dashboard/data/exporter?{query}", headers=valid_headers)
+
+    # Thousands of ids fit in a body; inaccessible and unknown ones are skipped
+    workplace_ids = ["wp2", "wp1"] + [f"other{i}" for i in range(5_000)]
+    from_body = await client.post(
+        "/api/v1/dashboard/data/exporter",
+        json={"workplace_ids": workplace_ids, "start_date": "2023-03-01", "end_date": "2023-04-15", "period": "week",
+              "reports": ["activity_summary", " item_statistics "]},
+        headers=valid_headers,
+    )
+    assert from_body.status_code == status.HTTP_200_OK
+    assert from_body.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(from_query.content)) as expected, zipfile.ZipFile(io.BytesIO(from_body.content)) as actual:
+        assert actual.namelist() == expected.namelist()
+        for name in expected.namelist():
+            assert actual.read(name) == expected.read(name)
+
+    empty = await client.post("/api/v1/dashboard/data/exporter", json={"reports": [" "]}, headers=valid_headers)
+    assert empty.status_code == status.HTTP_400_BAD_REQUEST
+    no_access = await client.post("/api/v1/dashboard/data/exporter", json={"workplace_ids": ["wp4"], "reports": ["activity_summary"]}, headers=valid_headers)
+    assert no_access.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,98 @@
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+
+from app.main import app
+from app.api.security import VALID_API_KEY
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(scope="module")
+async def client():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture(scope="module")
+def valid_headers():
+    return {"X-API-KEY": VALID_API_KEY}
+
+
+async def test_search_workplaces_by_name(client: AsyncClient, valid_headers):
+    response = await client.get(
+        "/api/v1/workplaces/search?q=lib", headers=valid_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "query": "lib",
+        "workplaces": [{"id": "wp1", "name": "Main Library"}],
+    }
+
+    annex = await client.get(
+        "/api/v1/workplaces/search?q=WEST%20ann&limit=5", headers=valid_headers
+    )
+    assert [wp["id"] for wp in annex.json()["workplaces"]] == ["wp3"]
+
+
+async def test_search_workplaces_hides_inaccessible_and_validates(
+    client: AsyncClient, valid_headers
+):
+    restricted = await client.get(
+        "/api/v1/workplaces/search?q=collections", headers=valid_headers
+    )
+    assert (
+        restricted.json()["workplaces"] == []
+    )  # wp4 is not accessible with the default key
+
+    assert (
+        await client.get("/api/v1/workplaces/search?q=", headers=valid_headers)
+    ).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert (await client.get("/api/v1/workplaces/search?q=lib")).status_code in (
+        status.HTTP_401_UNAUTHORIZED,
+        status.HTTP_403_FORBIDDEN,
+    )
+
+
+async def test_api_keys_resolve_to_their_own_user(client: AsyncClient, valid_headers):
+    from app.api.dependencies import get_api_key_authenticator
+
+    authenticator = get_api_key_authenticator()
+    await authenticator.store.add_key(authenticator.hash_key("admin-key"), "admin789")
+    try:
+        response = await client.get(
+            "/api/v1/workplaces/search?q=collections",
+            headers={"X-API-KEY": "admin-key"},
+        )
+        assert [wp["id"] for wp in response.json()["workplaces"]] == [
+            "wp4"
+        ]  # Hidden from the default key
+    finally:
+        await authenticator.store.revoke_key(authenticator.hash_key("admin-key"))
+        authenticator.invalidate("admin-key")
+
+    unknown = await client.get(
+        "/api/v1/workplaces/search?q=collections", headers={"X-API-KEY": "admin-key"}
+    )
+    assert unknown.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+async def test_api_key_is_authenticated_once_per_request(
+    client: AsyncClient, valid_headers, monkeypatch
+):
+    from app.api.dependencies import get_api_key_authenticator
+
+    authenticator = get_api_key_authenticator()
+    calls = []
+    original_authenticate = authenticator.authenticate
+
+    async def counting_authenticate(api_key):
+        calls.append(api_key)
+        return await original_authenticate(api_key)
+
+    monkeypatch.setattr(authenticator, "authenticate", counting_authenticate)
+    response = await client.get(
+        "/api/v1/workplaces/search?q=lib", headers=valid_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert calls == [VALID_API_KEY]
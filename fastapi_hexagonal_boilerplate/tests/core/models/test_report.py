@@ -0,0 +1,60 @@
+import pickle
+from array import array
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.core.models.report import ColumnarBatch
+
+
+def _batch():
+    return ColumnarBatch(
+        ["date", "workplace_id", "visits"],
+        [
+            np.array(["2024-01-01", "2024-01-02", "2024-01-03"], dtype="datetime64[D]"),
+            ["wp1", "wp2", "wp3"],
+            array("q", [10, 20, 30]),
+        ],
+    )
+
+
+def test_columnar_batch_rows_are_plain_values():
+    batch = _batch()
+
+    assert len(batch) == 3
+    assert batch.to_rows()[0] == {
+        "date": date(2024, 1, 1),
+        "workplace_id": "wp1",
+        "visits": 10,
+    }
+    assert list(batch.column("visits")) == [10, 20, 30]
+
+
+def test_columnar_batch_slice_and_select():
+    batch = _batch()
+
+    tail = batch.slice(1, 3)
+    assert len(tail) == 2 and list(tail.iter_rows())[0] == (date(2024, 1, 2), "wp2", 20)
+
+    reordered = batch.select(["visits", "workplace_id"])
+    assert reordered.columns == ["visits", "workplace_id"]
+    assert list(reordered.iter_rows())[-1] == (30, "wp3")
+    assert batch.select(batch.columns) is batch
+
+
+def test_columnar_batch_validates_shape():
+    with pytest.raises(ValueError):
+        ColumnarBatch(["a", "b"], [[1, 2]])
+    with pytest.raises(ValueError):
+        ColumnarBatch(["a", "b"], [[1, 2], [3]])
+    assert len(ColumnarBatch([], [])) == 0
+
+
+def test_columnar_batch_from_rows_and_pickle():
+    batch = ColumnarBatch.from_rows([{"a": 1, "b": "x"}, {"a": 2, "b": "y"}])
+    assert batch.columns == ["a", "b"] and batch.values == [[1, 2], ["x", "y"]]
+
+    # Batches travel to process pools (see ReportArchiveService)
+    restored = pickle.loads(pickle.dumps(_batch()))
+    assert restored.to_rows() == _batch().to_rows()
@@ -0,0 +1,9 @@
+from app.core.ports.cache_port import load_cached_json
+
+
+def test_load_cached_json_accepts_every_backend_representation():
+    assert load_cached_json('{"a": [1]}') == {"a": [1]}  # Redis: the stored string
+    assert load_cached_json(b'{"a": [1]}') == {"a": [1]}  # Raw bytes
+    assert load_cached_json({"a": [1]}) == {"a": [1]}  # Memcached: already decoded
+    assert load_cached_json(None) is None
+    assert load_cached_json("not json") is None
@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.core.models.report import ReportRequestParams, ReportRowStream
+from app.core.ports.report_port import ReportPort
+
+
+class EndlessReportPort(ReportPort):
+    """Only implements streaming: one row per day and workplace, for ever, recording when closed."""
+
+    def __init__(self):
+        self.closed = 0
+
+    async def generate_report_data(self, report_key, params):
+        raise NotImplementedError
+
+    async def stream_report_data(self, report_key, params, batch_size=1000):
+        async def batches():
+            try:
+                day = params.start_date
+                while True:
+                    yield [
+                        {"date": day, "workplace_id": "wp1"},
+                        {"date": day, "workplace_id": "wp2"},
+                    ]
+                    day += timedelta(days=1)
+            finally:
+                self.closed += 1
+
+        return ReportRowStream(columns=["date", "workplace_id"], batches=batches())
+
+
+@pytest.mark.asyncio
+async def test_default_report_page_stops_and_closes_the_stream():
+    port = EndlessReportPort()
+    params = ReportRequestParams(
+        workplace_ids=["wp1", "wp2"],
+        start_date=date(2024, 1, 1),
+        end_date=date(2024, 12, 31),
+        period="day",
+        reports=["r"],
+    )
+
+    page = await port.fetch_report_page("r", params, limit=3)
+    assert page.rows == [
+        (date(2024, 1, 1), "wp1"),
+        (date(2024, 1, 1), "wp2"),
+        (date(2024, 1, 2), "wp1"),
+    ]
+    assert page.next_key == (date(2024, 1, 2), "wp1")
+    assert port.closed == 1
+
+    page = await port.fetch_report_page("r", params, after=page.next_key, limit=1)
+    assert page.rows == [(date(2024, 1, 2), "wp2")]
+    assert port.closed == 2
@@ -0,0 +1,345 @@
+import pytest
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from itertools import pairwise
+
+from app.core.models.report import ReportRequestParams, ReportRowStream
+from app.core.ports.report_port import ReportPort, UnknownReportError
+from app.core.ports.workplace_port import WorkplacePort
+from app.core.use_cases.generate_dashboard_report_use_case import (
+    GenerateDashboardReportUseCase,
+    count_buckets,
+    partition_date_range,
+)
+from app.infrastructure.adapters.mock_report_adapter import MockReportAdapter
+from app.infrastructure.adapters.mock_workplace_adapter import MockWorkplaceAdapter
+
+
+class DelayedReportAdapter(ReportPort):
+    """Report port whose reports take a configurable time before the first row."""
+
+    def __init__(self, delays, failing=()):
+        self.delays = delays
+        self.failing = set(failing)
+        self.running = 0
+        self.max_running = 0
+        self.streaming = 0  # Streams opened and not finished yet
+        self.max_streaming = 0
+
+    async def generate_report_data(self, report_key, params):
+        raise NotImplementedError
+
+    async def stream_report_data(self, report_key, params, batch_size=1000):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delays.get(report_key, 0))
+        finally:
+            self.running -= 1
+        if report_key in self.failing:
+            raise RuntimeError(f"{report_key} backend failure")
+
+        self.streaming += 1
+        self.max_streaming = max(self.max_streaming, self.streaming)
+
+        async def batches():
+            try:
+                yield [
+                    {"workplace_id": wp_id, "value": 1}
+                    for wp_id in params.workplace_ids
+                ]
+            finally:
+                self.streaming -= 1
+
+        return ReportRowStream(columns=["workplace_id", "value"], batches=batches())
+
+
+def _params(reports):
+    return ReportRequestParams(
+        workplace_ids=["wp1", "wp2"],
+        start_date=date(2024, 1, 1),
+        end_date=date(2024, 1, 31),
+        reports=reports,
+    )
+
+
+async def _rows(report_file):
+    return [row async for batch in report_file.content for row in batch]
+
+
+@pytest.mark.asyncio
+async def test_reports_run_concurrently_and_keep_order():
+    adapter = DelayedReportAdapter({"a": 0.2, "b": 0.1, "c": 0.15})
+    use_case = GenerateDashboardReportUseCase(
+        MockWorkplaceAdapter(), adapter, max_concurrent_reports=3
+    )
+
+    started = time.monotonic()
+    report = await use_case.execute(_params(["a", "b", "c"]), user_id="user123")
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.4  # Sequential execution would take 0.45s
+    assert [f.filename.split("_")[0] for f in report.files] == ["a", "b", "c"]
+    assert await _rows(report.files[0]) == [
+        {"workplace_id": "wp1", "value": 1},
+        {"workplace_id": "wp2", "value": 1},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap_is_respected():
+    adapter = DelayedReportAdapter({key: 0.02 for key in "abcdef"})
+    use_case = GenerateDashboardReportUseCase(
+        MockWorkplaceAdapter(), adapter, max_concurrent_reports=2
+    )
+
+    report = await use_case.execute(_params(list("abcdef")), user_id="user123")
+    assert len(report.files) == 2 and len(report.deferred_files) == 4
+
+    # A report keeps its slot until its rows are consumed: later ones start as earlier ones end
+    filenames = []
+    async for report_file in report.iter_files():
+        filenames.append(report_file.filename.split("_")[0])
+        assert len(await _rows(report_file)) == 2
+    assert filenames == list("abcdef")
+    assert adapter.max_running == 2
+    assert adapter.max_streaming == 2
+
+
+@pytest.mark.asyncio
+async def test_closing_a_report_gives_up_the_deferred_ones():
+    adapter = DelayedReportAdapter({}, failing={"d"})
+    use_case = GenerateDashboardReportUseCase(
+        MockWorkplaceAdapter(), adapter, max_concurrent_reports=1
+    )
+
+    report = await use_case.execute(_params(list("abcd")), user_id="user123")
+    files = report.iter_files()
+    first = await files.__anext__()
+    await _rows(first)
+    second = await files.__anext__()  # Started once the first one was read
+    assert second.filename.startswith("b_")
+
+    await report.aclose()
+    await asyncio.sleep(0.01)
+    assert all(deferred.done() for deferred in report.deferred_files)
+    assert adapter.streaming == 0
+    assert report.failed_reports == []  # "d" never ran
+
+
+@pytest.mark.asyncio
+async def test_deferred_failures_are_recorded():
+    adapter = DelayedReportAdapter({}, failing={"c"})
+    use_case = GenerateDashboardReportUseCase(
+        MockWorkplaceAdapter(), adapter, max_concurrent_reports=1
+    )
+
+    report = await use_case.execute(_params(["a", "b", "c"]), user_id="user123")
+    filenames = [report_file.filename async for report_file in report.iter_files()]
+
+    assert filenames[-1] == "c_error.txt"
+    assert report.failed_reports == ["c"]
+
+
+@pytest.mark.asyncio
+async def test_slow_and_failing_reports_become_error_files():
+    adapter = DelayedReportAdapter({"slow": 5, "fast": 0}, failing={"broken"})
+    use_case = GenerateDashboardReportUseCase(
+        MockWorkplaceAdapter(), adapter, report_timeout=0.05
+    )
+
+    report = await use_case.execute(
+        _params(["fast", "slow", "broken"]), user_id="user123"
+    )
+
+    assert [f.filename for f in report.files] == [
+        "fast_month_2024-01-01_to_2024-01-31.csv",
+        "slow_error.txt",
+        "broken_error.txt",
+    ]
+    assert "timed out" in report.files[1].content
+    assert "backend failure" in report.files[2].content
+
+
+@pytest.mark.asyncio
+async def test_inaccessible_workplaces_are_filtered_out():
+    adapter = DelayedReportAdapter({})
+    use_case = GenerateDashboardReportUseCase(MockWorkplaceAdapter(), adapter)
+    params = _params(["a"]).copy(update={"workplace_ids": ["wp2", "wp4"]})
+
+    report = await use_case.execute(params, user_id="user456")
+
+    assert await _rows(report.files[0]) == [{"workplace_id": "wp2", "value": 1}]
+
+
+@pytest.mark.asyncio
+async def test_large_workplace_lists_are_filtered_as_sets():
+    class ManyWorkplacesAdapter(WorkplacePort):
+        async def get_accessible_workplaces(self, user_id):
+            raise AssertionError("access is checked on ids only")
+
+        async def get_accessible_workplace_ids(self, user_id):
+            return frozenset(f"wp{i:05d}" for i in range(0, 20_000, 2))
+
+        async def get_workplace_by_id(self, workplace_id):
+            return None
+
+    use_case = GenerateDashboardReportUseCase(
+        ManyWorkplacesAdapter(), DelayedReportAdapter({})
+    )
+    requested = [f"wp{i:05d}" for i in range(10_000)] + ["wp00002", "unknown"]
+
+    effective = await use_case.resolve_params(
+        _params(["a"]).copy(update={"workplace_ids": requested}), user_id="user123"
+    )
+
+    assert effective.workplace_ids == [f"wp{i:05d}" for i in range(0, 10_000, 2)]
+
+
+@pytest.mark.asyncio
+async def test_unknown_report_keys_are_rejected_before_any_work():
+    class CountingWorkplaceAdapter(MockWorkplaceAdapter):
+        calls = 0
+
+        async def get_accessible_workplaces(self, user_id):
+            self.calls += 1
+            return await super().get_accessible_workplaces(user_id)
+
+    workplace_adapter = CountingWorkplaceAdapter()
+    use_case = GenerateDashboardReportUseCase(workplace_adapter, MockReportAdapter())
+
+    with pytest.raises(UnknownReportError) as error:
+        await use_case.resolve_params(
+            _params(["activity_summary", "no_such_report"]), user_id="user123"
+        )
+    assert error.value.report_keys == ["no_such_report"]
+    assert workplace_adapter.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_multi_report_scan_is_shared_by_all_reports():
+    class SharedScanAdapter(DelayedReportAdapter):
+        supports_multi_report_scan = True
+        scans = 0
+
+        async def stream_reports(self, report_keys, params, batch_size=1000):
+            self.scans += 1
+            return await super().stream_reports(report_keys, params, batch_size)
+
+    adapter = SharedScanAdapter({"b": 0.02}, failing={"c"})
+    use_case = GenerateDashboardReportUseCase(MockWorkplaceAdapter(), adapter)
+
+    report = await use_case.execute(_params(["a", "b"]), user_id="user123")
+
+    assert adapter.scans == 1
+    assert [f.filename.split("_")[0] for f in report.files] == ["a", "b"]
+    assert await _rows(report.files[1]) == [
+        {"workplace_id": "wp1", "value": 1},
+        {"workplace_id": "wp2", "value": 1},
+    ]
+
+    # The scan fails as a whole: every report it was producing gets an error file
+    report = await use_case.execute(_params(["a", "c"]), user_id="user123")
+    assert [f.filename for f in report.files] == ["a_error.txt", "c_error.txt"]
+    assert report.failed_reports == ["a", "c"]
+
+
+@pytest.mark.parametrize(
+    "period, max_days",
+    [("day", 10), ("week", 14), ("month", 40), ("year", 100), ("month", 1)],
+)
+def test_partitions_cover_the_range_on_bucket_boundaries(period, max_days):
+    start, end = date(2022, 11, 17), date(2024, 3, 5)
+
+    partitions = partition_date_range(start, end, period, max_days)
+
+    assert partitions[0][0] == start and partitions[-1][1] == end
+    assert all(
+        next_start == previous_end + timedelta(days=1)
+        for (_, previous_end), (next_start, _) in pairwise(partitions)
+    )
+    for partition_start, _ in partitions[1:]:
+        assert {
+            "day": True,
+            "week": partition_start.weekday() == 0,
+            "month": partition_start.day == 1,
+            "year": (partition_start.month, partition_start.day) == (1, 1),
+        }[period]
+    if period in ("day", "week"):
+        assert all(
+            (partition_end - partition_start).days < max_days
+            for partition_start, partition_end in partitions
+        )
+
+
+@pytest.mark.asyncio
+async def test_partitioned_generation_matches_single_pass():
+    params = ReportRequestParams(
+        workplace_ids=["wp1", "wp3"],
+        start_date=date(2021, 3, 10),
+        end_date=date(2023, 8, 20),
+        period="week",
+        reports=["activity_summary", "financial_overview"],
+    )
+
+    async def export(use_case):
+        report = await use_case.execute(params, user_id="user123")
+        return [
+            [row async for batch in f.content for row in batch.to_rows()]
+            for f in report.files
+        ]
+
+    expected = await export(
+        GenerateDashboardReportUseCase(MockWorkplaceAdapter(), MockReportAdapter())
+    )
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        partitioned = GenerateDashboardReportUseCase(
+            MockWorkplaceAdapter(),
+            MockReportAdapter(executor=executor),
+            partition_days=120,
+        )
+        assert len(partitioned._partitions(params)) > 5
+        assert await export(partitioned) == expected
+
+
+@pytest.mark.parametrize("period", ["day", "week", "month", "year"])
+def test_count_buckets_matches_partitions_of_one_bucket(period):
+    start, end = date(2022, 11, 17), date(2024, 3, 5)
+    assert count_buckets(start, end, period) == len(
+        partition_date_range(start, end, period, 1)
+    )
+    assert count_buckets(end, start, period) == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("period", ["day", "week", "month"])
+async def test_cost_estimate_matches_generated_export(period):
+    params = ReportRequestParams(
+        workplace_ids=["wp1", "wp2", "wp3"],
+        start_date=date(2022, 2, 10),
+        end_date=date(2023, 7, 4),
+        period=period,
+        reports=["activity_summary", "item_statistics"],
+    )
+    use_case = GenerateDashboardReportUseCase(
+        MockWorkplaceAdapter(), MockReportAdapter()
+    )
+    effective = await use_case.resolve_params(params, user_id="user123")
+
+    estimate = await use_case.estimate_cost(effective)
+    report = await use_case.generate(effective)
+    rows = [
+        row
+        for f in report.files
+        async for batch in f.content
+        for row in batch.iter_rows()
+    ]
+    csv_bytes = sum(len(",".join(str(value) for value in row)) + 1 for row in rows)
+
+    assert estimate.buckets == count_buckets(
+        effective.start_date, effective.end_date, period
+    )
+    assert estimate.rows == len(rows)
+    assert 0.5 < estimate.bytes / csv_bytes < 2
@@ -0,0 +1,41 @@
+import pytest
+
+from app.infrastructure.adapters.cache_api_key_store import CacheApiKeyStore
+from app.infrastructure.adapters.database_api_key_store import DatabaseApiKeyStore
+from app.infrastructure.adapters.in_memory_adapter import InMemoryAdapter
+from app.infrastructure.adapters.in_memory_api_key_store import InMemoryApiKeyStore
+from app.infrastructure.services.in_memory_cache_service import InMemoryCacheService
+
+
+@pytest.fixture(params=["memory", "cache", "database"])
+def store(request):
+    if request.param == "memory":
+        return InMemoryApiKeyStore()
+    if request.param == "cache":
+        return CacheApiKeyStore(InMemoryCacheService())
+    return DatabaseApiKeyStore(InMemoryAdapter())
+
+
+@pytest.mark.asyncio
+async def test_keys_can_be_added_replaced_and_revoked(store):
+    assert await store.get_principal("hash-1") is None
+
+    await store.add_key("hash-1", "user-1")
+    await store.add_key("hash-2", "user-2")
+    assert await store.get_principal("hash-1") == "user-1"
+
+    await store.add_key("hash-1", "user-1")  # Re-adding is idempotent
+    await store.add_key("hash-1", "user-3")
+    assert await store.get_principal("hash-1") == "user-3"
+
+    await store.revoke_key("hash-1")
+    await store.revoke_key("hash-1")
+    assert await store.get_principal("hash-1") is None
+    assert await store.get_principal("hash-2") == "user-2"
+
+
+@pytest.mark.asyncio
+async def test_cache_store_decodes_bytes_from_redis():
+    cache = InMemoryCacheService()
+    await cache.set("api-key:hash-1", b"user-1")
+    assert await CacheApiKeyStore(cache).get_principal("hash-1") == "user-1"
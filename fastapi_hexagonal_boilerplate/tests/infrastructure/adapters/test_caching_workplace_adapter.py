@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+from typing import List, Optional
+
+from app.core.models.workplace import Workplace
+from app.core.ports.workplace_port import WorkplacePort
+from app.infrastructure.adapters.caching_workplace_adapter import (
+    CachingWorkplaceAdapter,
+)
+from app.infrastructure.adapters.mock_workplace_adapter import MockWorkplaceAdapter
+from app.infrastructure.services.in_memory_cache_service import InMemoryCacheService
+
+
+class CountingWorkplaceAdapter(WorkplacePort):
+    """Workplace port with mutable access rights that counts its lookups."""
+
+    def __init__(self, access):
+        self.access = access
+        self.calls = 0
+
+    async def get_accessible_workplaces(
+        self, user_id: Optional[str]
+    ) -> List[Workplace]:
+        self.calls += 1
+        return [
+            Workplace(id=wp_id, name=wp_id) for wp_id in self.access.get(user_id, [])
+        ]
+
+    async def get_workplace_by_id(self, workplace_id: str) -> Optional[Workplace]:
+        return None
+
+
+@pytest.mark.asyncio
+async def test_default_id_accessor_matches_workplaces():
+    adapter = MockWorkplaceAdapter()
+    for user_id in ("user123", "admin789", "nobody", None):
+        workplaces = await adapter.get_accessible_workplaces(user_id)
+        assert await adapter.get_accessible_workplace_ids(user_id) == frozenset(
+            wp.id for wp in workplaces
+        )
+        assert await WorkplacePort.get_accessible_workplace_ids(
+            adapter, user_id
+        ) == frozenset(wp.id for wp in workplaces)
+
+
+@pytest.mark.asyncio
+async def test_ids_are_cached_locally_and_shared_between_workers():
+    source = CountingWorkplaceAdapter({"u1": ["wp1", "wp2"], "u2": []})
+    shared = InMemoryCacheService()
+    worker_a = CachingWorkplaceAdapter(source, cache=shared)
+    worker_b = CachingWorkplaceAdapter(source, cache=shared)
+
+    assert await worker_a.get_accessible_workplace_ids("u1") == frozenset(
+        {"wp1", "wp2"}
+    )
+    assert await worker_a.get_accessible_workplace_ids("u1") == frozenset(
+        {"wp1", "wp2"}
+    )
+    assert await worker_b.get_accessible_workplace_ids("u1") == frozenset(
+        {"wp1", "wp2"}
+    )
+    assert await worker_b.get_accessible_workplace_ids("u2") == frozenset()
+    assert await worker_a.get_accessible_workplace_ids("u2") == frozenset()
+    assert source.calls == 2  # One per user, whichever worker asks
+
+
+@pytest.mark.asyncio
+async def test_invalidation_hooks():
+    source = CountingWorkplaceAdapter({"u1": ["wp1"], "u2": ["wp2"]})
+    shared = InMemoryCacheService()
+    worker_a = CachingWorkplaceAdapter(source, cache=shared)
+    worker_b = CachingWorkplaceAdapter(source, cache=shared, local_ttl_seconds=0)
+    await worker_a.get_accessible_workplace_ids("u1")
+    await worker_a.get_accessible_workplace_ids("u2")
+
+    source.access["u1"] = ["wp1", "wp3"]
+    await worker_a.invalidate("u1")
+    assert await worker_a.get_accessible_workplace_ids("u1") == frozenset(
+        {"wp1", "wp3"}
+    )
+    assert await worker_b.get_accessible_workplace_ids("u1") == frozenset(
+        {"wp1", "wp3"}
+    )  # Refilled by worker_a
+
+    source.access["u2"] = []
+    await worker_a.invalidate_all()
+    assert await worker_a.get_accessible_workplace_ids("u2") == frozenset()
+    assert (
+        await worker_b.get_accessible_workplace_ids("u2") == frozenset()
+    )  # Older generation in the shared cache
+    assert source.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_revoke_during_lookup_is_not_cached():
+    class GatedWorkplaceAdapter(CountingWorkplaceAdapter):
+        def __init__(self, access):
+            super().__init__(access)
+            self.entered = asyncio.Event()
+            self.release = asyncio.Event()
+
+        async def get_accessible_workplaces(
+            self, user_id: Optional[str]
+        ) -> List[Workplace]:
+            workplaces = await super().get_accessible_workplaces(user_id)
+            self.entered.set()
+            await self.release.wait()
+            return workplaces
+
+    source = GatedWorkplaceAdapter({"u1": ["wp1", "wp2"]})
+    shared = InMemoryCacheService()
+    adapter = CachingWorkplaceAdapter(source, cache=shared)
+    lookup = asyncio.create_task(adapter.get_accessible_workplace_ids("u1"))
+    await asyncio.wait_for(source.entered.wait(), timeout=1)
+
+    source.access["u1"] = ["wp1"]  # Revoked while the lookup still holds the old rights
+    await adapter.invalidate("u1")
+    source.release.set()
+    assert await asyncio.wait_for(lookup, timeout=1) == frozenset({"wp1", "wp2"})
+
+    assert await adapter.get_accessible_workplace_ids("u1") == frozenset({"wp1"})
+    other_worker = CachingWorkplaceAdapter(source, cache=shared)
+    assert await other_worker.get_accessible_workplace_ids("u1") == frozenset({"wp1"})
+    assert source.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_filter_uses_the_local_copy_or_the_source_index():
+    class FilteringWorkplaceAdapter(CountingWorkplaceAdapter):
+        filter_calls = 0
+
+        async def filter_accessible_workplace_ids(self, user_id, workplace_ids):
+            self.filter_calls += 1
+            return await super().filter_accessible_workplace_ids(user_id, workplace_ids)
+
+    source = FilteringWorkplaceAdapter({"u1": ["wp1", "wp2"]})
+    adapter = CachingWorkplaceAdapter(source, cache=InMemoryCacheService())
+
+    assert await adapter.filter_accessible_workplace_ids(
+        "u1", ["wp2", "wp4"]
+    ) == frozenset({"wp2"})
+    assert source.filter_calls == 1  # Left to the source's own filter on a miss
+    await adapter.get_accessible_workplace_ids("u1")
+    assert await adapter.filter_accessible_workplace_ids(
+        "u1", ["wp1", "wp4"]
+    ) == frozenset({"wp1"})
+    assert source.filter_calls == 1  # Intersected with the cached IDs
+
+
+@pytest.mark.asyncio
+async def test_cache_outage_falls_back_to_source():
+    class BrokenCache(InMemoryCacheService):
+        async def get(self, key):
+            raise ConnectionError("cache down")
+
+        async def set(self, key, value, expire=None):
+            raise ConnectionError("cache down")
+
+    source = CountingWorkplaceAdapter({"u1": ["wp1"]})
+    adapter = CachingWorkplaceAdapter(source, cache=BrokenCache())
+
+    assert await adapter.get_accessible_workplace_ids("u1") == frozenset({"wp1"})
+    await adapter.invalidate_all()
+    assert await adapter.get_accessible_workplace_ids(None) == frozenset()
@@ -0,0 +1,207 @@
+import pytest
+from datetime import date
+
+import numpy as np
+
+from app.core.models.report import ColumnarBatch, ReportRequestParams
+from app.core.ports.report_port import UnknownReportError
+from app.infrastructure.adapters.mock_report_adapter import (
+    MOCK_REPORTS,
+    MockReportAdapter,
+    bucket_starts,
+    generate_report_columns,
+    generate_reports_columns,
+)
+
+
+def _params(start, end, period, workplace_ids=("wp1", "wp2")):
+    return ReportRequestParams(
+        workplace_ids=list(workplace_ids),
+        start_date=start,
+        end_date=end,
+        period=period,
+        reports=["activity_summary"],
+    )
+
+
+def _days(start, end):
+    return np.arange(
+        np.datetime64(start), np.datetime64(end) + 1, dtype="datetime64[D]"
+    )
+
+
+def test_bucket_starts_are_calendar_aligned():
+    days = _days("2023-12-30", "2024-03-02")
+    weeks = bucket_starts(days, "week")
+    # ISO weeks start on Monday, also across the year boundary
+    assert str(weeks[0]) == "2023-12-25"
+    assert all(day.astype(object).isoweekday() == 1 for day in np.unique(weeks))
+    assert [str(month) for month in np.unique(bucket_starts(days, "month"))] == [
+        "2023-12-01",
+        "2024-01-01",
+        "2024-02-01",
+        "2024-03-01",
+    ]
+    assert [str(year) for year in np.unique(bucket_starts(days, "year"))] == [
+        "2023-01-01",
+        "2024-01-01",
+    ]
+    assert np.array_equal(bucket_starts(days, "day"), days)
+
+
+def test_monthly_buckets_sum_the_days_in_range():
+    # Leap-year February: 29 daily values, not a 30-day approximation
+    columns = generate_report_columns(
+        "activity_summary",
+        _params(date(2024, 1, 15), date(2024, 3, 31), "month", ["wp1"]),
+    )
+
+    assert [str(day) for day in columns["date"]] == [
+        "2024-01-01",
+        "2024-02-01",
+        "2024-03-01",
+    ]
+    february = np.arange(1, 30)
+    assert columns["visits"][1] == int((100 + (february % 10) * 10).sum())
+    january_from_15th = np.arange(15, 32)
+    assert columns["new_memberships"][0] == int((5 + (january_from_15th % 5)).sum())
+
+
+def test_columns_form_a_bucket_by_workplace_grid():
+    columns = generate_report_columns(
+        "financial_overview",
+        _params(date(2024, 1, 1), date(2024, 1, 10), "day", ["a", "b", "c"]),
+    )
+
+    assert list(columns) == MOCK_REPORTS.get("financial_overview").schema.column_names
+    assert len(columns["date"]) == 30
+    assert columns["workplace_id"][:4].tolist() == ["a", "b", "c", "a"]
+    assert columns["late_fees_usd"].dtype == np.float64
+    assert columns["date"].dtype == np.dtype("datetime64[D]")
+
+
+def test_single_scan_matches_per_report_generation():
+    params = _params(date(2023, 11, 20), date(2024, 2, 10), "week")
+    keys = ["financial_overview", "activity_summary", "item_statistics"]
+
+    reports = generate_reports_columns(keys, params)
+
+    assert list(reports) == keys
+    for key in keys:
+        alone = generate_report_columns(key, params)
+        assert list(reports[key]) == list(alone)
+        for name, values in alone.items():
+            assert values.dtype == reports[key][name].dtype
+            assert np.array_equal(values, reports[key][name])
+    # The date/workplace grid is built once and shared
+    assert reports["activity_summary"]["date"] is reports["item_statistics"]["date"]
+    assert all(
+        len(columns["date"]) == 0
+        for columns in generate_reports_columns(
+            keys, _params(date(2024, 1, 2), date(2024, 1, 1), "day")
+        ).values()
+    )
+
+
+@pytest.mark.asyncio
+async def test_generate_report_data_returns_columns():
+    adapter = MockReportAdapter()
+    report = await adapter.generate_report_data(
+        "item_statistics", _params(date(2024, 1, 1), date(2024, 12, 31), "year")
+    )
+
+    assert isinstance(report, ColumnarBatch)
+    assert report.columns == ["date", "workplace_id", "items_loaned", "items_returned"]
+    rows = report.to_rows()
+    assert [(row["date"], row["workplace_id"]) for row in rows] == [
+        (date(2024, 1, 1), "wp1"),
+        (date(2024, 1, 1), "wp2"),
+    ]
+    assert type(rows[0]["items_loaned"]) is int
+
+    empty = await adapter.generate_report_data(
+        "item_statistics", _params(date(2024, 1, 2), date(2024, 1, 1), "day")
+    )
+    assert len(empty) == 0 and empty.columns == report.columns
+
+
+@pytest.mark.asyncio
+async def test_stream_report_data_batches_match_materialized_report():
+    adapter = MockReportAdapter()
+    params = _params(date(2023, 1, 1), date(2023, 12, 31), "day")
+
+    stream = await adapter.stream_report_data(
+        "activity_summary", params, batch_size=100
+    )
+    batches = [batch async for batch in stream]
+
+    assert stream.columns == ["date", "workplace_id", "visits", "new_memberships"]
+    assert all(len(batch) == 100 for batch in batches[:-1])
+    report = await adapter.generate_report_data("activity_summary", params)
+    assert [row for batch in batches for row in batch.to_rows()] == report.to_rows()
+
+
+@pytest.mark.asyncio
+async def test_unknown_reports_are_rejected_up_front():
+    adapter = MockReportAdapter()
+
+    schemas = await adapter.get_report_schemas(["item_statistics", "activity_summary"])
+    assert [schema.key for schema in schemas] == ["item_statistics", "activity_summary"]
+    assert [column.dtype for column in schemas[0].columns] == [
+        "date",
+        "string",
+        "int",
+        "int",
+    ]
+
+    with pytest.raises(UnknownReportError) as error:
+        await adapter.get_report_schemas(["item_statistics", "nope", "nada"])
+    assert error.value.report_keys == ["nope", "nada"]
+    with pytest.raises(UnknownReportError):
+        await adapter.stream_report_data(
+            "nope", _params(date(2024, 1, 1), date(2024, 1, 2), "day")
+        )
+
+
+@pytest.mark.asyncio
+async def test_stream_reports_returns_one_stream_per_key():
+    adapter = MockReportAdapter()
+    params = _params(date(2024, 1, 1), date(2024, 3, 31), "day")
+
+    streams = await adapter.stream_reports(
+        ["item_statistics", "activity_summary"], params, batch_size=50
+    )
+
+    assert adapter.supports_multi_report_scan
+    assert list(streams) == ["item_statistics", "activity_summary"]
+    rows = [
+        row async for batch in streams["activity_summary"] for row in batch.to_rows()
+    ]
+    assert (
+        rows
+        == (await adapter.generate_report_data("activity_summary", params)).to_rows()
+    )
+    with pytest.raises(UnknownReportError):
+        await adapter.stream_reports(["item_statistics", "nope"], params)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "period, limit", [("day", 7), ("week", 3), ("month", 2), ("year", 1)]
+)
+async def test_report_pages_concatenate_to_the_report(period, limit):
+    adapter = MockReportAdapter()
+    params = _params(date(2022, 1, 15), date(2023, 3, 3), period, ["wp1", "wp2", "wp3"])
+    report = await adapter.generate_report_data("activity_summary", params)
+
+    rows, after = [], None
+    while len(rows) < 60:
+        page = await adapter.fetch_report_page("activity_summary", params, after, limit)
+        assert len(page.rows) <= limit
+        rows.extend(page.rows)
+        after = page.next_key
+        if after is None:
+            break
+
+    assert rows == list(report.iter_rows())[: len(rows)]
+    assert after is None or len(rows) >= 60
@@ -0,0 +1,43 @@
+import pytest
+
+from app.core.ports.report_port import UnknownReportError
+from app.infrastructure.adapters.report_registry import ReportRegistry
+
+
+def test_register_and_resolve_in_request_order():
+    registry = ReportRegistry()
+
+    @registry.report("visits", columns=[("date", "date"), ("visits", "int")])
+    def visits():
+        return "visits generated"
+
+    registry.register(
+        "revenue", [("date", "date"), ("revenue", "float")], lambda: "revenue generated"
+    )
+
+    resolved = registry.resolve(["revenue", "visits"])
+    assert [report.key for report in resolved] == ["revenue", "visits"]
+    assert resolved[1].schema.column_names == ["date", "visits"]
+    assert resolved[1].generator() == "visits generated"
+    assert "visits" in registry and registry.keys() == ["visits", "revenue"]
+
+
+def test_unknown_keys_are_all_reported():
+    registry = ReportRegistry()
+    registry.register("visits", [("visits", "int")], lambda: None)
+
+    with pytest.raises(UnknownReportError) as error:
+        registry.resolve(["visits", "a", "b"])
+    assert error.value.report_keys == ["a", "b"]
+    with pytest.raises(UnknownReportError):
+        registry.get("a")
+
+
+def test_invalid_registrations_are_rejected():
+    registry = ReportRegistry()
+    registry.register("visits", [("visits", "int")], lambda: None)
+
+    with pytest.raises(ValueError):
+        registry.register("visits", [("visits", "int")], lambda: None)
+    with pytest.raises(ValueError):
+        registry.register("other", [("visits", "decimal")], lambda: None)
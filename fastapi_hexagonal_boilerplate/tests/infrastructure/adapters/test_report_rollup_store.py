@@ -0,0 +1,202 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.infrastructure.adapters.report_rollup_store import ReportRollupStore
+
+
+def _days(start, end):
+    return np.arange(
+        np.datetime64(start), np.datetime64(end) + 1, dtype="datetime64[D]"
+    )
+
+
+def test_coarse_buckets_are_sums_of_days_and_partial_edges_use_days():
+    store = ReportRollupStore()
+    days = _days("2024-01-01", "2024-12-31")
+    values = np.column_stack([np.ones(len(days)), np.arange(len(days))])
+    store.upsert(
+        "r",
+        "wp1",
+        ["count", "index"],
+        date(2024, 1, 1),
+        date(2024, 12, 31),
+        days,
+        values,
+    )
+
+    buckets, totals = store.read(
+        "r", "wp1", "month", date(2024, 1, 1), date(2024, 12, 31)
+    )
+    assert len(buckets) == 12 and str(buckets[1]) == "2024-02-01"
+    assert totals[1].tolist() == [29, sum(range(31, 60))]
+
+    # Partial first and last months only count the days in range
+    buckets, totals = store.read(
+        "r", "wp1", "month", date(2024, 2, 20), date(2024, 4, 2)
+    )
+    assert [str(bucket) for bucket in buckets] == [
+        "2024-02-01",
+        "2024-03-01",
+        "2024-04-01",
+    ]
+    assert totals[:, 0].tolist() == [10, 31, 2]
+
+    buckets, totals = store.read(
+        "r", "wp1", "year", date(2024, 1, 1), date(2024, 12, 31)
+    )
+    assert totals.tolist() == [[366, sum(range(366))]]
+
+
+def test_whole_buckets_are_read_from_the_coarse_levels():
+    store = ReportRollupStore()
+    days = _days("2020-01-01", "2024-12-31")
+    store.upsert(
+        "r",
+        "wp1",
+        ["n"],
+        date(2020, 1, 1),
+        date(2024, 12, 31),
+        days,
+        np.ones((len(days), 1)),
+    )
+    rollups = store._rollups[("r", "wp1")]
+    assert [len(rollups.levels[period][0]) for period in ("month", "year")] == [60, 5]
+
+    # Whole months keep their pre-aggregated sum: the days behind them are not read again
+    rollups.values[:] = 0
+    _, totals = store.read("r", "wp1", "month", date(2020, 1, 1), date(2024, 12, 31))
+    assert totals[:2, 0].tolist() == [31, 29] and len(totals) == 60
+    # Edge months cut by the range are summed from the days
+    _, totals = store.read("r", "wp1", "month", date(2020, 1, 15), date(2020, 3, 10))
+    assert totals[:, 0].tolist() == [0, 29, 0]
+
+
+def test_reloading_days_replaces_them():
+    store = ReportRollupStore()
+    store.upsert(
+        "r",
+        "wp1",
+        ["n"],
+        date(2024, 1, 1),
+        date(2024, 1, 31),
+        _days("2024-01-01", "2024-01-31"),
+        np.ones((31, 1)),
+    )
+    # Corrected data for a few days; days of the range the source did not return are zero
+    store.upsert(
+        "r",
+        "wp1",
+        ["n"],
+        date(2024, 1, 8),
+        date(2024, 1, 10),
+        _days("2024-01-08", "2024-01-09"),
+        [[5], [5]],
+    )
+
+    _, totals = store.read("r", "wp1", "month", date(2024, 1, 1), date(2024, 1, 31))
+    assert totals.tolist() == [[31 - 3 + 10]]
+    _, weeks = store.read("r", "wp1", "week", date(2024, 1, 8), date(2024, 1, 14))
+    assert weeks.tolist() == [[10 + 4]]
+
+
+def test_missing_ranges_and_unloaded_reads():
+    store = ReportRollupStore()
+    assert store.missing_ranges("r", "wp1", date(2024, 1, 1), date(2024, 1, 31)) == [
+        (date(2024, 1, 1), date(2024, 1, 31))
+    ]
+    store.upsert(
+        "r",
+        "wp1",
+        ["n"],
+        date(2024, 1, 5),
+        date(2024, 1, 9),
+        _days("2024-01-05", "2024-01-09"),
+        np.ones((5, 1)),
+    )
+    store.upsert(
+        "r",
+        "wp1",
+        ["n"],
+        date(2024, 1, 10),
+        date(2024, 1, 20),
+        _days("2024-01-10", "2024-01-20"),
+        np.ones((11, 1)),
+    )
+
+    assert store.missing_ranges("r", "wp1", date(2024, 1, 1), date(2024, 1, 31)) == [
+        (date(2024, 1, 1), date(2024, 1, 4)),
+        (date(2024, 1, 21), date(2024, 1, 31)),
+    ]
+    assert store.missing_ranges("r", "wp1", date(2024, 1, 6), date(2024, 1, 18)) == []
+    with pytest.raises(KeyError):
+        store.read("r", "wp1", "month", date(2024, 1, 1), date(2024, 1, 31))
+    with pytest.raises(ValueError):
+        store.upsert(
+            "r",
+            "wp1",
+            ["other"],
+            date(2024, 2, 1),
+            date(2024, 2, 1),
+            _days("2024-02-01", "2024-02-01"),
+            [[1]],
+        )
+
+
+def test_entries_expire_and_can_be_invalidated():
+    now = [0.0]
+    store = ReportRollupStore(ttl_seconds=60, clock=lambda: now[0])
+    for report_key, workplace_id in [("r", "wp1"), ("r", "wp2"), ("s", "wp1")]:
+        store.upsert(
+            report_key,
+            workplace_id,
+            ["n"],
+            date(2024, 1, 1),
+            date(2024, 1, 2),
+            _days("2024-01-01", "2024-01-02"),
+            np.ones((2, 1)),
+        )
+
+    store.invalidate(workplace_id="wp1")
+    assert store.missing_ranges("r", "wp1", date(2024, 1, 1), date(2024, 1, 2)) == [
+        (date(2024, 1, 1), date(2024, 1, 2))
+    ]
+    assert store.missing_ranges("s", "wp1", date(2024, 1, 1), date(2024, 1, 2)) != []
+    assert store.read("r", "wp2", "day", date(2024, 1, 1), date(2024, 1, 2))[
+        1
+    ].tolist() == [[1], [1]]
+
+    now[0] = 60
+    with pytest.raises(KeyError):
+        store.read("r", "wp2", "day", date(2024, 1, 1), date(2024, 1, 2))
+
+
+def test_least_recently_used_entries_are_dropped():
+    store = ReportRollupStore(max_entries=2)
+    for workplace_id in ["wp1", "wp2"]:
+        store.upsert(
+            "r",
+            workplace_id,
+            ["n"],
+            date(2024, 1, 1),
+            date(2024, 1, 1),
+            _days("2024-01-01", "2024-01-01"),
+            [[1]],
+        )
+    store.read("r", "wp1", "month", date(2024, 1, 1), date(2024, 1, 1))
+    store.upsert(
+        "r",
+        "wp3",
+        ["n"],
+        date(2024, 1, 1),
+        date(2024, 1, 1),
+        _days("2024-01-01", "2024-01-01"),
+        [[1]],
+    )
+
+    assert [
+        store.missing_ranges("r", workplace_id, date(2024, 1, 1), date(2024, 1, 1))
+        == []
+        for workplace_id in ["wp1", "wp2", "wp3"]
+    ] == [True, False, True]
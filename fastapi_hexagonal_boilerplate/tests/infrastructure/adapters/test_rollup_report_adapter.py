@@ -0,0 +1,143 @@
+from datetime import date
+
+import pytest
+
+from app.core.models.report import ReportRequestParams
+from app.infrastructure.adapters.mock_report_adapter import MockReportAdapter
+from app.infrastructure.adapters.rollup_report_adapter import RollupReportAdapter
+
+REPORT_KEYS = ["activity_summary", "item_statistics", "financial_overview"]
+
+
+class CountingReportAdapter(MockReportAdapter):
+    """Mock source recording the parameters of every multi-report request."""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    async def stream_reports(self, report_keys, params, batch_size=1000):
+        self.requests.append(params)
+        return await super().stream_reports(report_keys, params, batch_size)
+
+
+def _params(start, end, period, workplace_ids=("wp1", "wp2")):
+    return ReportRequestParams(
+        workplace_ids=list(workplace_ids),
+        start_date=start,
+        end_date=end,
+        period=period,
+        reports=REPORT_KEYS,
+    )
+
+
+async def _rows(row_streams):
+    return {
+        key: [row async for batch in stream for row in batch.to_rows()]
+        for key, stream in row_streams.items()
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("period", ["week", "month", "year"])
+async def test_rollups_match_the_source(period):
+    source = MockReportAdapter()
+    adapter = RollupReportAdapter(source)
+    params = _params(date(2019, 3, 17), date(2024, 2, 10), period)
+
+    assert await _rows(
+        await adapter.stream_reports(REPORT_KEYS, params)
+    ) == await _rows(await source.stream_reports(REPORT_KEYS, params))
+
+
+@pytest.mark.asyncio
+async def test_days_are_loaded_once_at_day_granularity():
+    source = CountingReportAdapter()
+    adapter = RollupReportAdapter(source)
+
+    await adapter.stream_reports(
+        REPORT_KEYS, _params(date(2023, 1, 1), date(2023, 12, 31), "month")
+    )
+    await adapter.stream_reports(
+        REPORT_KEYS, _params(date(2023, 3, 1), date(2023, 9, 30), "year", ["wp2"])
+    )
+    assert [
+        (request.period, request.start_date, request.end_date)
+        for request in source.requests
+    ] == [
+        ("day", date(2023, 1, 1), date(2023, 12, 31)),
+    ]
+
+    # Only the days not seen yet are requested
+    await adapter.stream_reports(
+        REPORT_KEYS, _params(date(2023, 11, 1), date(2024, 2, 29), "week")
+    )
+    assert (source.requests[-1].start_date, source.requests[-1].end_date) == (
+        date(2024, 1, 1),
+        date(2024, 2, 29),
+    )
+
+
+@pytest.mark.asyncio
+async def test_day_requests_go_to_the_source():
+    source = CountingReportAdapter()
+    adapter = RollupReportAdapter(source)
+    params = _params(date(2024, 1, 1), date(2024, 1, 10), "day")
+
+    report = await adapter.generate_report_data("activity_summary", params)
+
+    assert (
+        report.to_rows()
+        == (await source.generate_report_data("activity_summary", params)).to_rows()
+    )
+    assert adapter.store.metrics("activity_summary") == []
+
+
+@pytest.mark.asyncio
+async def test_open_days_are_read_from_the_source_and_never_stored():
+    source = CountingReportAdapter()
+    adapter = RollupReportAdapter(source, open_days=2, today=lambda: date(2024, 3, 10))
+    params = _params(date(2024, 2, 1), date(2024, 3, 10), "week")
+
+    for _ in range(2):
+        assert await _rows(
+            await adapter.stream_reports(REPORT_KEYS, params)
+        ) == await _rows(
+            await CountingReportAdapter().stream_reports(REPORT_KEYS, params)
+        )
+    assert [
+        (request.period, request.start_date, request.end_date)
+        for request in source.requests
+    ] == [
+        ("day", date(2024, 3, 9), date(2024, 3, 10)),
+        ("day", date(2024, 2, 1), date(2024, 3, 8)),
+        ("day", date(2024, 3, 9), date(2024, 3, 10)),
+    ]
+    assert (
+        adapter.store.missing_ranges(
+            "activity_summary", "wp1", date(2024, 3, 9), date(2024, 3, 10)
+        )
+        != []
+    )
+
+    # A range that is open altogether is passed through as is
+    await adapter.stream_reports(
+        REPORT_KEYS, _params(date(2024, 3, 9), date(2024, 3, 10), "week")
+    )
+    assert source.requests[-1].period == "week"
+
+
+@pytest.mark.asyncio
+async def test_invalidated_days_are_loaded_again():
+    source = CountingReportAdapter()
+    adapter = RollupReportAdapter(source)
+    params = _params(date(2023, 1, 1), date(2023, 6, 30), "month")
+
+    await adapter.stream_reports(REPORT_KEYS, params)
+    adapter.store.invalidate(workplace_id="wp2")
+    await adapter.stream_reports(REPORT_KEYS, params)
+
+    assert [request.workplace_ids for request in source.requests] == [
+        ["wp1", "wp2"],
+        ["wp2"],
+    ]
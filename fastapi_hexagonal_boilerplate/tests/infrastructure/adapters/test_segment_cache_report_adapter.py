@@ -0,0 +1,200 @@
+import base64
+import json
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.core.models.report import ReportColumn, ReportRequestParams, ReportSchema
+from app.infrastructure.adapters.mock_report_adapter import MockReportAdapter
+from app.infrastructure.adapters.rollup_report_adapter import RollupReportAdapter
+from app.infrastructure.adapters.segment_cache_report_adapter import (
+    SegmentCachingReportAdapter,
+    plan_segments,
+)
+from app.infrastructure.services.in_memory_cache_service import InMemoryCacheService
+
+REPORT_KEYS = ["activity_summary", "financial_overview"]
+TODAY = date(2024, 6, 15)
+
+
+class CountingReportAdapter(MockReportAdapter):
+    """Mock source recording the date range of every multi-report request."""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    async def stream_reports(self, report_keys, params, batch_size=1000):
+        self.requests.append((params.start_date, params.end_date))
+        return await super().stream_reports(report_keys, params, batch_size)
+
+
+class PagingReportAdapter(CountingReportAdapter):
+    """Counting mock source also recording the date range each page reads."""
+
+    def __init__(self):
+        super().__init__()
+        self.pages = []
+
+    async def stream_report_data(self, report_key, params, batch_size=1000):
+        self.pages.append((params.start_date, params.end_date))
+        return await super().stream_report_data(report_key, params, batch_size)
+
+
+def _params(start, end, period, workplace_ids=("wp1", "wp2")):
+    return ReportRequestParams(
+        workplace_ids=list(workplace_ids),
+        start_date=start,
+        end_date=end,
+        period=period,
+        reports=REPORT_KEYS,
+    )
+
+
+async def _rows(row_streams):
+    return {
+        key: [row async for batch in stream for row in batch.to_rows()]
+        for key, stream in row_streams.items()
+    }
+
+
+def test_segments_split_on_calendar_boundaries():
+    segments = plan_segments(date(2024, 1, 20), date(2024, 6, 20), "day", TODAY)
+
+    assert [(s.start_date, s.end_date) for s in segments][:2] == [
+        (date(2024, 1, 20), date(2024, 1, 31)),
+        (date(2024, 2, 1), date(2024, 2, 29)),
+    ]
+    # Partial edges and the current month are never cached
+    assert [s.cacheable for s in segments] == [False, True, True, True, True, False]
+    weeks = plan_segments(date(2023, 1, 1), date(2023, 12, 31), "week", TODAY)
+    assert all(s.start_date.weekday() == 0 for s in weeks[1:])
+    assert [
+        s.start_date.year
+        for s in plan_segments(date(2021, 5, 1), date(2023, 2, 1), "month", TODAY)
+    ] == [2021, 2022, 2023]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("period", ["day", "week", "month", "year"])
+async def test_assembled_reports_match_the_source(period):
+    source = MockReportAdapter()
+    adapter = SegmentCachingReportAdapter(
+        source, InMemoryCacheService(), today=lambda: TODAY
+    )
+    params = _params(date(2021, 3, 17), date(2024, 6, 14), period)
+
+    expected = await _rows(await source.stream_reports(REPORT_KEYS, params))
+    assert await _rows(await adapter.stream_reports(REPORT_KEYS, params)) == expected
+    # Second time from the cached segments
+    assert await _rows(await adapter.stream_reports(REPORT_KEYS, params)) == expected
+
+
+@pytest.mark.asyncio
+async def test_rolling_window_only_computes_edges():
+    source = CountingReportAdapter()
+    adapter = SegmentCachingReportAdapter(
+        source, InMemoryCacheService(), today=lambda: TODAY
+    )
+
+    await adapter.stream_reports(
+        REPORT_KEYS, _params(date(2023, 6, 14), date(2024, 6, 14), "day")
+    )
+    assert source.requests == [(date(2023, 6, 14), date(2024, 6, 14))]
+
+    # The window moved by a day: the partial first month and the current month are computed
+    source.requests.clear()
+    await adapter.stream_reports(
+        REPORT_KEYS, _params(date(2023, 6, 15), date(2024, 6, 15), "day")
+    )
+    assert source.requests == [
+        (date(2023, 6, 15), date(2023, 6, 30)),
+        (date(2024, 6, 1), date(2024, 6, 15)),
+    ]
+
+    # A workplace without cached segments makes its segments miss again
+    source.requests.clear()
+    await adapter.stream_reports(
+        REPORT_KEYS, _params(date(2023, 7, 1), date(2023, 8, 31), "day", ["wp1", "wp3"])
+    )
+    assert source.requests == [(date(2023, 7, 1), date(2023, 8, 31))]
+
+
+@pytest.mark.asyncio
+async def test_cacheable_segments_stream_as_keyed_batches():
+    adapter = SegmentCachingReportAdapter(
+        MockReportAdapter(), InMemoryCacheService(), today=lambda: TODAY
+    )
+
+    streams = await adapter.stream_reports(
+        REPORT_KEYS, _params(date(2024, 1, 20), date(2024, 4, 10), "day")
+    )
+    batches = [batch async for batch in streams["activity_summary"]]
+
+    keyed = [batch for batch in batches if batch.cache_key]
+    assert [str(batch.column("date")[0]) for batch in keyed] == [
+        "2024-02-01",
+        "2024-03-01",
+    ]
+    assert len(keyed[0]) == 29 * 2
+    assert keyed[0].cache_key.endswith(":2024-02-01")
+    assert sum(len(batch) for batch in batches) == (12 + 29 + 31 + 10) * 2
+
+
+def test_parts_are_stored_as_packed_columns():
+    schema = ReportSchema(
+        key="r",
+        columns=[
+            ReportColumn(name="date", dtype="date"),
+            ReportColumn(name="workplace_id"),
+            ReportColumn(name="label"),
+            ReportColumn(name="count", dtype="int"),
+            ReportColumn(name="amount", dtype="float"),
+        ],
+    )
+    part = {
+        "date": np.array(["2024-01-01", "2024-01-02"], dtype="datetime64[D]"),
+        "label": np.array(["a", "b"], dtype=object),
+        "count": np.array([3, -4]),
+        "amount": np.array([1.25, 2.5]),
+    }
+
+    raw = SegmentCachingReportAdapter._dump(part, schema)
+    assert len(base64.b64decode(json.loads(raw)["data"])) == 2 * (4 + 8 + 8)
+    loaded = SegmentCachingReportAdapter._load(raw, schema)
+    assert {name: values.tolist() for name, values in loaded.items()} == {
+        name: values.tolist() for name, values in part.items()
+    }
+    assert loaded["date"].dtype == np.dtype("datetime64[D]")
+
+    # Entries in another layout (e.g. per-column JSON lists) are recomputed
+    assert (
+        SegmentCachingReportAdapter._load(
+            json.dumps({"date": ["2024-01-01"], "count": [1]}), schema
+        )
+        is None
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("period", ["day", "month"])
+async def test_pages_go_through_the_wrapper_stack_to_the_source(period):
+    source = PagingReportAdapter()
+    # The default stack of get_generate_report_use_case
+    adapter = SegmentCachingReportAdapter(
+        RollupReportAdapter(source), InMemoryCacheService(), today=lambda: TODAY
+    )
+    params = _params(date(2019, 1, 1), date(2024, 6, 14), period)
+    report = await MockReportAdapter().generate_report_data("activity_summary", params)
+
+    rows, after = [], None
+    for _ in range(3):
+        page = await adapter.fetch_report_page("activity_summary", params, after, 5)
+        rows.extend(page.rows)
+        after = page.next_key
+
+    assert rows == list(report.iter_rows())[:15]
+    # Each page only read the few buckets it could reach, and nothing was rolled up or cached
+    assert len(source.pages) == 3 and source.requests == []
+    assert all(end < date(2019, 12, 31) for _, end in source.pages)
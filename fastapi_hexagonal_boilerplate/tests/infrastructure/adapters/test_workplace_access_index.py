@@ -0,0 +1,73 @@
+import pytest
+import random
+
+from app.infrastructure.adapters.mock_workplace_adapter import MockWorkplaceAdapter
+from app.infrastructure.adapters.workplace_access_index import WorkplaceAccessIndex
+
+
+def test_grants_filter_and_revoke():
+    index = WorkplaceAccessIndex()
+    index.add_workplaces(f"wp{i}" for i in range(10))
+    index.grant(
+        "user:a", ["wp1", "wp3", "wp9", "wp12"]
+    )  # wp12 is registered on the fly
+
+    assert len(index) == 11
+    assert index.accessible_ids("user:a") == frozenset({"wp1", "wp3", "wp9", "wp12"})
+    assert index.filter("user:a", ["wp0", "wp3", "wp12", "unknown"]) == frozenset(
+        {"wp3", "wp12"}
+    )
+    assert index.accessible_ids("user:nobody") == frozenset()
+
+    index.revoke("user:a", ["wp3", "unknown"])
+    assert index.accessible_ids("user:a") == frozenset({"wp1", "wp9", "wp12"})
+
+
+def test_group_inheritance_with_nesting_and_cycles():
+    index = WorkplaceAccessIndex()
+    index.grant("group:north", ["wp1", "wp2"])
+    index.grant("group:region", ["wp5"])
+    index.grant("user:a", ["wp9"])
+    index.add_to_group("user:a", "group:north")
+    index.add_to_group("group:north", "group:region")
+    index.add_to_group("group:region", "group:north")  # Cycles are harmless
+
+    assert index.accessible_ids("user:a") == frozenset({"wp1", "wp2", "wp5", "wp9"})
+    assert index.accessible_ids("group:region") == frozenset({"wp1", "wp2", "wp5"})
+
+    index.grant("group:region", ["wp6"])
+    assert "wp6" in index.accessible_ids("user:a")  # Memoized bitmaps follow changes
+    index.revoke("user:a", ["wp1"])
+    assert "wp1" in index.accessible_ids("user:a")  # Still inherited
+    index.remove_from_group("user:a", "group:north")
+    assert index.accessible_ids("user:a") == frozenset({"wp9"})
+
+
+def test_large_tenant_matches_set_semantics():
+    rng = random.Random(7)
+    workplaces = [f"wp{i:05d}" for i in range(50_000)]
+    index = WorkplaceAccessIndex()
+    index.add_workplaces(workplaces)
+    granted = set(rng.sample(workplaces, 20_000))
+    index.grant("group:big", granted)
+    index.add_to_group("user:a", "group:big")
+    requested = [*rng.sample(workplaces, 10_000), "missing"]
+
+    assert index.filter("user:a", requested) == frozenset(requested) & granted
+    assert index.accessible_ids("user:a") == frozenset(granted)
+
+
+@pytest.mark.asyncio
+async def test_mock_adapter_filters_through_the_index():
+    adapter = MockWorkplaceAdapter()
+
+    assert await adapter.filter_accessible_workplace_ids(
+        "user456", ["wp1", "wp2", "wp4", "nope"]
+    ) == frozenset({"wp2"})
+    assert await adapter.filter_accessible_workplace_ids(
+        None, ["wp1", "wp4"]
+    ) == frozenset({"wp1"})
+    assert (
+        await adapter.filter_accessible_workplace_ids("stranger", ["wp1"])
+        == frozenset()
+    )
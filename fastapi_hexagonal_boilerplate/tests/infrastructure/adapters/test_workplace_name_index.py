@@ -0,0 +1,131 @@
+import pytest
+import random
+
+from app.core.models.workplace import Workplace
+from app.infrastructure.adapters.mock_workplace_adapter import MockWorkplaceAdapter
+from app.infrastructure.adapters.workplace_name_index import (
+    WorkplaceNameIndex,
+    normalize_name,
+)
+
+
+def _index(*names):
+    index = WorkplaceNameIndex()
+    for position, name in enumerate(names):
+        index.upsert(Workplace(id=f"wp{position}", name=name))
+    return index
+
+
+def _names(workplaces):
+    return [workplace.name for workplace in workplaces]
+
+
+def test_normalize_name_ignores_case_accents_and_spacing():
+    assert normalize_name("  Bibliothèque   CENTRALE ") == "bibliotheque centrale"
+
+
+def test_search_ranks_exact_prefix_word_prefix_then_substring():
+    index = _index(
+        "Westside Annex",
+        "West",
+        "Main Library",
+        "Library West Wing",
+        "Northwest Branch",
+        "Eastern Library",
+    )
+
+    assert _names(index.search("west")) == [
+        "West",
+        "Westside Annex",
+        "Library West Wing",
+        "Northwest Branch",
+    ]
+    assert _names(index.search("LIB")) == [
+        "Library West Wing",
+        "Eastern Library",
+        "Main Library",
+    ]
+    assert _names(index.search("li wes")) == [
+        "Library West Wing"
+    ]  # Every term must match
+    assert _names(index.search("w", limit=2)) == ["West", "Westside Annex"]
+    assert index.search("") == [] and index.search("zzz") == []
+
+
+def test_search_is_restricted_to_accessible_ids():
+    index = _index("Main Library", "Downtown Library", "Library Annex")
+    assert _names(index.search("library", accessible_ids={"wp1", "wp2", "other"})) == [
+        "Library Annex",
+        "Downtown Library",
+    ]
+    assert index.search("library", accessible_ids=set()) == []
+
+
+def test_upsert_and_remove_update_the_index_incrementally():
+    index = _index("Main Library", "Downtown Branch")
+    index.upsert(Workplace(id="wp1", name="Harbor Branch"))  # Renamed
+    index.upsert(Workplace(id="wp9", name="Downtown Annex"))
+    index.remove("wp0")
+    index.remove("missing")
+
+    assert len(index) == 2
+    assert index.search("main") == [] and index.search("downtown")[0].id == "wp9"
+    assert _names(index.search("branch")) == ["Harbor Branch"]
+
+
+def test_large_index_matches_brute_force():
+    rng = random.Random(3)
+    words = [
+        "north",
+        "south",
+        "central",
+        "library",
+        "annex",
+        "branch",
+        "archive",
+        "studio",
+        "lab",
+        "hub",
+    ]
+    workplaces = [
+        Workplace(id=f"wp{i}", name=" ".join(rng.sample(words, 3)) + f" {i}")
+        for i in range(20_000)
+    ]
+    index = WorkplaceNameIndex()
+    for workplace in workplaces:
+        index.upsert(workplace)
+    accessible = {workplace.id for workplace in rng.sample(workplaces, 6_000)}
+
+    for query in ("archiv stud", "hub 123", "la", "99999"):
+        terms = normalize_name(query).split()
+        expected = {
+            wp.id
+            for wp in workplaces
+            if wp.id in accessible
+            and all(
+                any(term in word for word in normalize_name(wp.name).split())
+                for term in terms
+                if len(term) >= 3
+            )
+            and all(
+                any(word.startswith(term) for word in normalize_name(wp.name).split())
+                for term in terms
+                if len(term) < 3
+            )
+        }
+        found = index.search(query, limit=len(expected) + 1, accessible_ids=accessible)
+        assert {wp.id for wp in found} == expected
+
+
+@pytest.mark.asyncio
+async def test_mock_adapter_search_uses_access_and_the_index():
+    adapter = MockWorkplaceAdapter()
+    assert _names(await adapter.search_workplaces("user456", "branch")) == [
+        "Downtown Branch"
+    ]
+    assert (
+        await adapter.search_workplaces("user456", "main") == []
+    )  # wp1 is not accessible to user456
+    assert _names(await adapter.search_workplaces("admin789", "coll")) == [
+        "Special Collections (Restricted)"
+    ]
@@ -0,0 +1,199 @@
+import pytest
+import asyncio
+import hashlib
+import hmac
+from typing import List, Optional
+
+from app.infrastructure.adapters.in_memory_api_key_store import InMemoryApiKeyStore
+from app.infrastructure.services.api_key_authenticator import (
+    ApiKeyAuthenticator,
+    hash_api_key,
+)
+
+
+class RecordingApiKeyStore(InMemoryApiKeyStore):
+    """In-memory keys, recording each lookup."""
+
+    def __init__(self, principals=None, fail=False):
+        super().__init__(principals)
+        self.lookups: List[str] = []
+        self.fail = fail
+
+    async def get_principal(self, key_hash: str) -> Optional[str]:
+        self.lookups.append(key_hash)
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise ConnectionError("key store down")
+        return await super().get_principal(key_hash)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_hash_api_key_is_sha256_or_hmac_with_a_pepper():
+    assert hash_api_key("key-1") == hashlib.sha256(b"key-1").hexdigest()
+    assert (
+        hash_api_key("key-1", b"pepper")
+        == hmac.new(b"pepper", b"key-1", hashlib.sha256).hexdigest()
+    )
+    assert hash_api_key("key-1", b"pepper") != hash_api_key("key-1")
+
+
+@pytest.mark.asyncio
+async def test_verified_keys_are_served_from_the_cache_until_their_ttl():
+    clock = FakeClock()
+    store = RecordingApiKeyStore(
+        {hash_api_key("key-1"): "user-1", hash_api_key("key-2"): "user-2"}
+    )
+    authenticator = ApiKeyAuthenticator(store, ttl_seconds=60, clock=clock)
+
+    assert await authenticator.authenticate("key-1") == "user-1"
+    assert await authenticator.authenticate("key-1") == "user-1"
+    assert await authenticator.authenticate("key-2") == "user-2"
+    assert len(store.lookups) == 2
+
+    await store.revoke_key(hash_api_key("key-1"))
+    assert await authenticator.authenticate("key-1") == "user-1"  # Still cached
+    clock.now += 61
+    assert await authenticator.authenticate("key-1") is None
+    assert len(store.lookups) == 3
+
+
+@pytest.mark.asyncio
+async def test_unknown_keys_are_negatively_cached_for_a_shorter_time():
+    clock = FakeClock()
+    store = RecordingApiKeyStore()
+    authenticator = ApiKeyAuthenticator(
+        store, ttl_seconds=60, negative_ttl_seconds=5, clock=clock
+    )
+
+    assert await authenticator.authenticate("bad-key") is None
+    assert await authenticator.authenticate("bad-key") is None
+    assert len(store.lookups) == 1
+
+    await store.add_key(
+        hash_api_key("bad-key"), "user-3"
+    )  # Issued after the failed attempt
+    clock.now += 6
+    assert await authenticator.authenticate("bad-key") == "user-3"
+    assert len(store.lookups) == 2
+
+    assert await authenticator.authenticate("") is None
+    assert await authenticator.authenticate(None) is None
+    assert len(store.lookups) == 2  # Missing keys never reach the store
+
+
+@pytest.mark.asyncio
+async def test_unknown_keys_cannot_evict_verified_ones():
+    store = RecordingApiKeyStore({hash_api_key("key-1"): "user-1"})
+    authenticator = ApiKeyAuthenticator(store, max_entries=2, max_negative_entries=2)
+
+    await authenticator.authenticate("key-1")
+    for attempt in range(10):
+        assert await authenticator.authenticate(f"guess-{attempt}") is None
+    assert await authenticator.authenticate("key-1") == "user-1"
+    assert store.lookups.count(hash_api_key("key-1")) == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_is_lru_bounded():
+    store = RecordingApiKeyStore(
+        {hash_api_key(f"key-{i}"): f"user-{i}" for i in range(3)}
+    )
+    authenticator = ApiKeyAuthenticator(store, max_entries=2)
+
+    await authenticator.authenticate("key-0")
+    await authenticator.authenticate("key-1")
+    await authenticator.authenticate("key-0")  # key-1 is now the least recently used
+    await authenticator.authenticate("key-2")
+    store.lookups.clear()
+
+    await authenticator.authenticate("key-0")
+    assert store.lookups == []
+    await authenticator.authenticate("key-1")
+    assert store.lookups == [hash_api_key("key-1")]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_store_lookup():
+    store = RecordingApiKeyStore({hash_api_key("key-1"): "user-1"})
+    authenticator = ApiKeyAuthenticator(store)
+
+    results = await asyncio.gather(
+        *[authenticator.authenticate("key-1") for _ in range(20)]
+    )
+    assert results == ["user-1"] * 20
+    assert len(store.lookups) == 1
+
+
+@pytest.mark.asyncio
+async def test_store_errors_propagate_and_are_not_cached():
+    store = RecordingApiKeyStore({hash_api_key("key-1"): "user-1"}, fail=True)
+    authenticator = ApiKeyAuthenticator(store)
+
+    with pytest.raises(ConnectionError):
+        await authenticator.authenticate("key-1")
+    store.fail = False
+    assert await authenticator.authenticate("key-1") == "user-1"
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forgets_one_key_or_all():
+    store = RecordingApiKeyStore({hash_api_key("key-1", b"p"): "user-1"})
+    authenticator = ApiKeyAuthenticator(store, pepper=b"p")
+
+    assert await authenticator.authenticate("key-1") == "user-1"
+    await store.revoke_key(hash_api_key("key-1", b"p"))
+    authenticator.invalidate("key-1")
+    assert await authenticator.authenticate("key-1") is None
+
+    await store.add_key(hash_api_key("key-1", b"p"), "user-1")
+    authenticator.invalidate()
+    assert await authenticator.authenticate("key-1") == "user-1"
+
+
+class StaleApiKeyStore(RecordingApiKeyStore):
+    """Reads the key at once but answers only when released, like a slow replica."""
+
+    def __init__(self, principals=None):
+        super().__init__(principals)
+        self.release = asyncio.Event()
+
+    async def get_principal(self, key_hash: str) -> Optional[str]:
+        self.lookups.append(key_hash)
+        principal = await InMemoryApiKeyStore.get_principal(self, key_hash)
+        await self.release.wait()
+        return principal
+
+
+async def _until(condition):
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0)
+
+    await asyncio.wait_for(poll(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_lookups_in_flight_during_invalidate_are_not_cached():
+    store = StaleApiKeyStore({hash_api_key("key-1"): "user-1"})
+    authenticator = ApiKeyAuthenticator(store)
+
+    in_flight = asyncio.ensure_future(authenticator.authenticate("key-1"))
+    await _until(lambda: store.lookups)
+    await store.revoke_key(hash_api_key("key-1"))
+    authenticator.invalidate("key-1")
+    # A request after the revocation does not join the stale lookup
+    after = asyncio.ensure_future(authenticator.authenticate("key-1"))
+    await _until(lambda: len(store.lookups) == 2)
+    store.release.set()
+
+    assert await in_flight == "user-1"
+    assert await after is None
+    assert await authenticator.authenticate("key-1") is None
+    assert len(store.lookups) == 2
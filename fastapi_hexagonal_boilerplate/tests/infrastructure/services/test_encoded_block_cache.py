@@ -0,0 +1,34 @@
+import pytest
+
+from app.infrastructure.services.encoded_block_cache import (
+    EncodedBlock,
+    EncodedBlockCache,
+)
+from app.infrastructure.services.in_memory_cache_service import InMemoryCacheService
+
+
+@pytest.mark.asyncio
+async def test_encoded_block_roundtrip_and_size_limit():
+    cache = EncodedBlockCache(InMemoryCacheService(), max_block_bytes=16)
+
+    assert await cache.put("a", EncodedBlock(b"\x00\xffblock", 1234, 99))
+    block = await cache.get("a")
+    assert block.as_tuple() == (b"\x00\xffblock", 1234, 99)
+
+    assert not await cache.put("b", EncodedBlock(b"x" * 17, 0, 17))
+    assert await cache.get("b") is None
+
+
+@pytest.mark.asyncio
+async def test_encoded_block_cache_outage_is_a_miss():
+    class BrokenCache(InMemoryCacheService):
+        async def get(self, key):
+            raise ConnectionError("cache down")
+
+        async def set(self, key, value, expire=None):
+            raise ConnectionError("cache down")
+
+    cache = EncodedBlockCache(BrokenCache())
+
+    assert not await cache.put("a", EncodedBlock(b"block", 1, 5))
+    assert await cache.get("a") is None
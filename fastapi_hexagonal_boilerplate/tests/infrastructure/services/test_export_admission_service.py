@@ -0,0 +1,38 @@
+from app.core.models.report import ReportCostEstimate
+from app.infrastructure.services.export_admission_service import (
+    ADMIT_JOB,
+    ADMIT_REJECT,
+    ADMIT_SYNC,
+    ExportAdmissionService,
+)
+
+
+def _estimate(rows, size):
+    return ReportCostEstimate(buckets=1, rows=rows, bytes=size)
+
+
+def test_admission_tiers():
+    admission = ExportAdmissionService(
+        max_rows=1000, max_bytes=10_000, sync_max_rows=100, sync_max_bytes=1_000
+    )
+
+    assert admission.admit(_estimate(100, 1_000)) == ADMIT_SYNC
+    assert admission.admit(_estimate(101, 500)) == ADMIT_JOB
+    assert admission.admit(_estimate(50, 1_001)) == ADMIT_JOB
+    assert admission.admit(_estimate(1001, 500)) == ADMIT_REJECT
+    assert admission.admit(_estimate(50, 10_001)) == ADMIT_REJECT
+    # Background exports only have to fit the hard limits
+    assert admission.admit(_estimate(101, 500), background=True) == ADMIT_JOB
+    assert admission.admit(_estimate(1001, 500), background=True) == ADMIT_REJECT
+
+
+def test_oversize_exports_rejected_without_job_routing_and_zero_disables_limits():
+    strict = ExportAdmissionService(sync_max_rows=100, route_to_jobs=False)
+    assert strict.admit(_estimate(101, 0)) == ADMIT_REJECT
+    assert strict.admit(_estimate(101, 0), background=True) == ADMIT_JOB
+
+    assert ExportAdmissionService().admit(_estimate(10**12, 10**15)) == ADMIT_SYNC
+    assert ExportAdmissionService.headers(_estimate(12, 345)) == {
+        "X-Export-Estimated-Rows": "12",
+        "X-Export-Estimated-Bytes": "345",
+    }
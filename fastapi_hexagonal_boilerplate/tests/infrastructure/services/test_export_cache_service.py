@@ -0,0 +1,101 @@
+import pytest
+
+from app.infrastructure.services.export_cache_service import ExportCacheService
+from app.infrastructure.services.in_memory_cache_service import InMemoryCacheService
+
+
+@pytest.fixture
+def export_cache():
+    return ExportCacheService(
+        InMemoryCacheService(), ttl_seconds=60, max_entry_bytes=1024
+    )
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+@pytest.mark.asyncio
+async def test_put_and_get(export_cache):
+    etag = await export_cache.put("f" * 64, b"PK\x03\x04data")
+    assert etag == ExportCacheService.content_etag(b"PK\x03\x04data")
+
+    assert await export_cache.get_etag("f" * 64) == etag
+    cached = await export_cache.get("f" * 64)
+    assert cached.etag == etag
+    assert cached.content == b"PK\x03\x04data"
+
+
+@pytest.mark.asyncio
+async def test_etags_are_strong_and_derived_from_the_content(export_cache):
+    etag = await export_cache.put("abc", b"archive")
+    assert etag.startswith('"') and etag.endswith('"')
+
+    # Evicted and regenerated with the same bytes: conditional requests still match
+    await export_cache.invalidate("abc")
+    assert await export_cache.put("abc", b"archive") == etag
+    assert await export_cache.put("abc", b"archive v2") != etag
+    assert await export_cache.put("huge", b"x" * 2048) is None
+
+
+@pytest.mark.asyncio
+async def test_tee_stores_complete_stream(export_cache):
+    passed = [chunk async for chunk in export_cache.tee("key", _chunks(b"ab", b"cd"))]
+    assert passed == [b"ab", b"cd"]
+    assert (await export_cache.get("key")).content == b"abcd"
+
+
+@pytest.mark.asyncio
+async def test_tee_skips_oversized_and_uncacheable_streams(export_cache):
+    big = [
+        chunk
+        async for chunk in export_cache.tee("big", _chunks(b"x" * 1000, b"y" * 1000))
+    ]
+    assert b"".join(big) == b"x" * 1000 + b"y" * 1000
+    assert await export_cache.get("big") is None
+
+    [
+        chunk
+        async for chunk in export_cache.tee(
+            "failed", _chunks(b"ab"), is_cacheable=lambda: False
+        )
+    ]
+    assert await export_cache.get("failed") is None
+
+
+@pytest.mark.asyncio
+async def test_invalidate(export_cache):
+    await export_cache.put("gone", b"data")
+    await export_cache.invalidate("gone")
+    assert await export_cache.get_etag("gone") is None
+    assert await export_cache.get("gone") is None
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, False),
+        ('"a-1"', True),
+        ('W/"a-1"', True),
+        ('"b-2", "a-1"', True),
+        ("*", True),
+        ('"a-2"', False),
+    ],
+)
+def test_etag_matches(header, expected):
+    assert ExportCacheService.etag_matches(header, '"a-1"') is expected
+
+
+@pytest.mark.asyncio
+async def test_in_memory_cache_expiry_and_lru():
+    cache = InMemoryCacheService(max_entries=2)
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    await cache.get("a")  # "a" becomes most recently used
+    await cache.set("c", 3)
+    assert await cache.exists("a") and await cache.exists("c")
+    assert not await cache.exists("b")
+
+    await cache.set("short", "v", expire=-1)
+    assert await cache.get("short") is None
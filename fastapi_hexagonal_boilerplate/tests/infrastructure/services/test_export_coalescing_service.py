@@ -0,0 +1,221 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.infrastructure.services.export_cache_service import ExportCacheService
+from app.infrastructure.services.export_coalescing_service import (
+    ExportCoalescingService,
+)
+from app.infrastructure.services.in_memory_cache_service import InMemoryCacheService
+from app.infrastructure.services.in_memory_distributed_lock_service import (
+    InMemoryDistributedLockService,
+)
+
+
+class _CountingExport:
+    """Starter for a flight that yields `parts` once `release` is set, counting runs."""
+
+    def __init__(self, parts, etag='"e1"'):
+        self.parts = parts
+        self.etag = etag
+        self.runs = 0
+        self.release = asyncio.Event()
+        self.closed = False
+
+    async def _chunks(self):
+        try:
+            await self.release.wait()
+            for part in self.parts:
+                yield part
+                await asyncio.sleep(0)
+        finally:
+            self.closed = True
+
+    async def __call__(self):
+        self.runs += 1
+        return {"ETag": self.etag}, self._chunks()
+
+
+async def _collect(coalescer, key, start):
+    headers, stream, leader = await coalescer.join(key, start)
+    return headers, b"".join([chunk async for chunk in stream]), leader
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_exports_run_once():
+    coalescer = ExportCoalescingService()
+    export = _CountingExport([b"PK", b"ab", b"cd"])
+
+    tasks = [asyncio.create_task(_collect(coalescer, "fp", export)) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    export.release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert export.runs == 1
+    assert [result[1] for result in results] == [b"PKabcd"] * 5
+    assert all(result[0] == {"ETag": '"e1"'} for result in results)
+    assert sum(result[2] for result in results) == 1  # Exactly one leader
+    assert coalescer.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_late_joiner_replays_from_the_start():
+    coalescer = ExportCoalescingService()
+    export = _CountingExport([b"one", b"two", b"three"])
+    export.release.set()
+
+    _, stream, leader = await coalescer.join("fp", export)
+    first = await stream.__anext__()
+    late = asyncio.create_task(_collect(coalescer, "fp", export))
+    rest = b"".join([chunk async for chunk in stream])
+
+    assert leader is True
+    assert first + rest == b"onetwothree"
+    assert (await late)[1:] == (b"onetwothree", False)
+    assert export.runs == 1
+
+
+@pytest.mark.asyncio
+async def test_oversized_flight_refuses_newcomers():
+    coalescer = ExportCoalescingService(max_buffer_bytes=4)
+    export = _CountingExport([b"abc", b"def", b"ghi"])
+    export.release.set()
+
+    _, stream, _ = await coalescer.join("fp", export)
+    assert await stream.__anext__() == b"abc"
+    assert await stream.__anext__() == b"def"  # Buffer crossed the limit
+    assert coalescer.in_flight == 0
+
+    _, second, leader = await _collect(coalescer, "fp", export)
+    assert leader is True and second == b"abcdefghi"
+    assert b"".join([chunk async for chunk in stream]) == b"ghi"
+    assert export.runs == 2
+
+
+@pytest.mark.asyncio
+async def test_flights_are_joinable_only_within_a_small_window():
+    coalescer = ExportCoalescingService(max_buffer_bytes=1000, join_window_bytes=4)
+    export = _CountingExport([b"abc", b"def", b"ghi", b"jkl"])
+    export.release.set()
+
+    _, stream, _ = await coalescer.join("fp", export)
+    flight = coalescer._flights["fp"]
+    assert await stream.__anext__() == b"abc"
+    assert await stream.__anext__() == b"def"
+    assert coalescer.in_flight == 0  # Past the window: no longer joinable
+
+    await asyncio.sleep(0.01)
+    # Only the chunks not sent yet are kept, however large the buffer limit
+    assert flight.done and flight.buffered_bytes == 6
+    assert b"".join([chunk async for chunk in stream]) == b"ghijkl"
+
+
+@pytest.mark.asyncio
+async def test_start_errors_reach_every_waiter():
+    coalescer = ExportCoalescingService()
+    runs = 0
+
+    async def failing_start():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.01)
+        raise HTTPException(status_code=404, detail="No data")
+
+    results = await asyncio.gather(
+        *[coalescer.join("fp", failing_start) for _ in range(3)], return_exceptions=True
+    )
+    assert runs == 1
+    assert all(
+        isinstance(result, HTTPException) and result.status_code == 404
+        for result in results
+    )
+    assert coalescer.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_production_stops_when_every_subscriber_leaves():
+    coalescer = ExportCoalescingService()
+    export = _CountingExport([b"a"] * 100)
+    export.release.set()
+
+    _, stream, _ = await coalescer.join("fp", export)
+    await stream.__anext__()
+    await stream.aclose()
+    await asyncio.sleep(0.01)
+
+    assert export.closed is True
+    assert coalescer.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cross_worker_waits_for_the_lock_holder_cache_entry():
+    export_cache = ExportCacheService(InMemoryCacheService(), ttl_seconds=60)
+    locks = InMemoryDistributedLockService()
+    # Two coalescers sharing a lock service and a cache stand in for two worker processes
+    worker_a = ExportCoalescingService(
+        lock_service=locks, export_cache=export_cache, poll_interval=0.01
+    )
+    worker_b = ExportCoalescingService(
+        lock_service=locks, export_cache=export_cache, poll_interval=0.01
+    )
+
+    export_a = _CountingExport([b"PK", b"zip"], etag='"shared"')
+
+    async def start_a():
+        headers, chunks = await export_a()
+        return headers, export_cache.tee("fp", chunks)
+
+    export_b = _CountingExport([b"never"])
+    first = asyncio.create_task(_collect(worker_a, "fp", start_a))
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(_collect(worker_b, "fp", export_b))
+    await asyncio.sleep(0.05)
+    export_a.release.set()
+
+    assert (await first)[1] == b"PKzip"
+    headers, content, _ = await second
+    assert content == b"PKzip"
+    assert headers == {
+        "ETag": ExportCacheService.content_etag(b"PKzip"),
+        "X-Export-Cache": "hit",
+    }
+    assert export_b.runs == 0
+
+
+@pytest.mark.asyncio
+async def test_flight_buffer_is_bounded_by_the_slowest_subscriber():
+    coalescer = ExportCoalescingService(max_buffer_bytes=100)
+    produced = 0
+    release = asyncio.Event()
+
+    async def chunks():
+        nonlocal produced
+        await release.wait()
+        for _ in range(1000):
+            produced += 1
+            yield b"x" * 10
+
+    async def start():
+        return {}, chunks()
+
+    _, fast, _ = await coalescer.join("fp", start)
+    _, slow, _ = await coalescer.join("fp", start)
+    flight = coalescer._flights["fp"]
+    release.set()
+    for _ in range(5):
+        await fast.__anext__()
+    await asyncio.sleep(0.01)
+
+    # The slow subscriber has read nothing: production waits for it instead of buffering
+    assert produced <= 12
+    assert flight.buffered_bytes <= 110
+
+    async def read_all(stream):
+        return b"".join([chunk async for chunk in stream])
+
+    slow_rest, fast_rest = await asyncio.wait_for(
+        asyncio.gather(read_all(slow), read_all(fast)), timeout=5
+    )
+    assert slow_rest == b"x" * 10_000
+    assert fast_rest == b"x" * (10_000 - 50)
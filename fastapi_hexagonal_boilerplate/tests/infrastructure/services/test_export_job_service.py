@@ -0,0 +1,176 @@
+import pytest
+import asyncio
+import os
+import zipfile
+from datetime import date
+
+from app.core.models.report import ReportRequestParams
+from app.core.use_cases.generate_dashboard_report_use_case import (
+    GenerateDashboardReportUseCase,
+)
+from app.infrastructure.adapters.mock_report_adapter import MockReportAdapter
+from app.infrastructure.adapters.mock_workplace_adapter import MockWorkplaceAdapter
+from app.infrastructure.services.export_job_service import ExportJobService
+from app.infrastructure.services.in_memory_cache_service import InMemoryCacheService
+from app.infrastructure.services.in_memory_distributed_lock_service import (
+    InMemoryDistributedLockService,
+)
+from app.infrastructure.services.report_archive_service import ReportArchiveService
+
+
+class FailingUseCase(GenerateDashboardReportUseCase):
+    async def generate(self, params):
+        raise RuntimeError("report backend unavailable")
+
+
+class GatedUseCase(GenerateDashboardReportUseCase):
+    """Generates once `release` is set, so that a job can be observed while running."""
+
+    release = None
+
+    async def generate(self, params):
+        await self.release.wait()
+        return await super().generate(params)
+
+
+@pytest.fixture
+async def job_service(tmp_path):
+    service = ExportJobService(
+        use_case_factory=lambda: GenerateDashboardReportUseCase(
+            MockWorkplaceAdapter(), MockReportAdapter()
+        ),
+        archive_service_factory=ReportArchiveService,
+        job_store=InMemoryCacheService(),
+        lock_service=InMemoryDistributedLockService(),
+        spool_dir=str(tmp_path),
+        max_workers=2,
+    )
+    yield service
+    await service.shutdown()
+
+
+def _params(reports=("activity_summary",)):
+    return ReportRequestParams(
+        workplace_ids=["wp1"],
+        start_date=date(2024, 1, 1),
+        end_date=date(2024, 3, 31),
+        period="day",
+        reports=list(reports),
+    )
+
+
+async def _wait_finished(service, job_id):
+    for _ in range(200):
+        job = await service.get_job(job_id)
+        if job.is_finished:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+@pytest.mark.asyncio
+async def test_job_runs_to_completion(job_service):
+    job = await job_service.submit(
+        _params(("activity_summary", "item_statistics")), user_id="user123"
+    )
+    assert job.status == "queued"
+
+    finished = await _wait_finished(job_service, job.job_id)
+    assert finished.status == "succeeded"
+    assert finished.progress == 1.0
+    with zipfile.ZipFile(job_service.spool_path(job.job_id)) as zip_ref:
+        assert len(zip_ref.namelist()) == 2
+    assert finished.size_bytes == os.path.getsize(job_service.spool_path(job.job_id))
+
+
+@pytest.mark.asyncio
+async def test_identical_submissions_share_one_job(job_service):
+    first, second = await asyncio.gather(
+        job_service.submit(_params(), user_id="user123"),
+        job_service.submit(_params(), user_id="user456"),
+    )
+    assert first.job_id == second.job_id
+    job = await _wait_finished(job_service, first.job_id)
+    assert sorted(job.owner_ids) == ["user123", "user456"]
+
+    # A finished job keeps being reused while it is fresh and its archive exists
+    again = await job_service.submit(_params(), user_id="user123")
+    assert again.job_id == first.job_id
+
+    # Past the reuse window a new request gets a new export, the old one stays downloadable
+    job_service.reuse_max_age_seconds = 0
+    await asyncio.sleep(0.01)
+    fresh = await job_service.submit(_params(), user_id="user123")
+    assert fresh.job_id != first.job_id
+    assert (await job_service.get_job(first.job_id)).status == "succeeded"
+    await _wait_finished(job_service, fresh.job_id)
+
+
+@pytest.mark.asyncio
+async def test_expired_spool_files_are_purged_in_the_background(job_service):
+    expired = os.path.join(job_service.spool_dir, "expired.zip")
+    with open(expired, "wb") as spool_file:
+        spool_file.write(b"PK")
+    os.utime(expired, (0, 0))
+
+    job = await job_service.submit(_params(), user_id="user123")
+    assert os.path.exists(expired)  # Not on the request path
+    await _wait_finished(job_service, job.job_id)
+    assert not os.path.exists(expired)
+    assert os.path.exists(job_service.spool_path(job.job_id))
+
+
+@pytest.mark.asyncio
+async def test_failed_job_releases_lock(job_service):
+    job_service.use_case_factory = lambda: FailingUseCase(
+        MockWorkplaceAdapter(), MockReportAdapter()
+    )
+    job = await job_service.submit(_params(), user_id="user123")
+    failed = await _wait_finished(job_service, job.job_id)
+    assert failed.status == "failed"
+    assert "report backend unavailable" in failed.error
+    assert not await job_service.lock_service.is_locked(f"export-job:{job.fingerprint}")
+
+    # A new submission after a failure starts a fresh job
+    retry = await job_service.submit(_params(), user_id="user123")
+    assert retry.job_id != job.job_id
+
+
+@pytest.mark.asyncio
+async def test_in_memory_lock_semantics():
+    locks = InMemoryDistributedLockService()
+    assert await locks.acquire("a", timeout=0, expire=30) is True
+    assert await locks.acquire("a", timeout=0.02, expire=30) is False
+    assert await locks.is_locked("a") is True
+    assert await locks.release("a") is True
+    assert await locks.release("a") is False
+    assert await locks.acquire("b", timeout=0, expire=-1) is True
+    assert await locks.is_locked("b") is False  # Already expired
+
+
+@pytest.mark.asyncio
+async def test_owner_joining_a_running_job_can_download_it(job_service):
+    GatedUseCase.release = asyncio.Event()
+    job_service.use_case_factory = lambda: GatedUseCase(
+        MockWorkplaceAdapter(), MockReportAdapter()
+    )
+    job = await job_service.submit(
+        _params(("activity_summary", "item_statistics")), user_id="alice"
+    )
+    for _ in range(200):
+        if (await job_service.get_job(job.job_id)).status == "running":
+            break
+        await asyncio.sleep(0.01)
+
+    joined = await job_service.submit(
+        _params(("activity_summary", "item_statistics")), user_id="bob"
+    )
+    assert joined.job_id == job.job_id
+    GatedUseCase.release.set()
+
+    # Progress and completion saves of the worker keep bob as an owner
+    finished = await _wait_finished(job_service, job.job_id)
+    assert finished.status == "succeeded"
+    assert finished.owner_ids == ["alice", "bob"]
+    with zipfile.ZipFile(job_service.spool_path(job.job_id)) as zip_ref:
+        assert len(zip_ref.namelist()) == 2
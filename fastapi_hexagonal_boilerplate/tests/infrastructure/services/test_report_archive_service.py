@@ -0,0 +1,424 @@
+import pytest
+import asyncio
+import csv
+import hashlib
+import io
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.core.models.report import (
+    ColumnarBatch,
+    GeneratedReport,
+    ReportFile,
+    ReportRowStream,
+)
+from app.infrastructure.services.encoded_block_cache import EncodedBlockCache
+from app.infrastructure.services.in_memory_cache_service import InMemoryCacheService
+from app.infrastructure.services.report_archive_service import (
+    ArchiveStats,
+    ReportArchiveService,
+    ZipStreamWriter,
+    crc32_combine,
+    encode_report_block,
+)
+
+
+def _rows(count):
+    return [
+        {
+            "date": f"2024-01-{(i % 28) + 1:02d}",
+            "workplace_id": f"wp{i % 3}",
+            "visits": i,
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def archive_service():
+    # Small chunks and batches so that every test crosses several queue items
+    return ReportArchiveService(queue_maxsize=2, chunk_size=1024, csv_batch_rows=50)
+
+
+async def _collect(stream):
+    return b"".join([chunk async for chunk in stream])
+
+
+def test_zip_stream_writer_roundtrip():
+    writer = ZipStreamWriter()
+    payload = b"date,visits\n" + b"2024-01-01,100\n" * 10_000
+    parts = [writer.start_entry("report.csv")]
+    for start in range(0, len(payload), 4096):
+        parts.append(writer.write(payload[start : start + 4096]))
+    parts.append(writer.end_entry())
+    parts.append(writer.add_entry("notes.txt", "ñandú".encode("utf-8")))
+    parts.append(writer.close())
+    archive = b"".join(parts)
+
+    assert writer.bytes_written == len(archive)
+    with zipfile.ZipFile(io.BytesIO(archive)) as zip_ref:
+        assert zip_ref.testzip() is None
+        assert zip_ref.namelist() == ["report.csv", "notes.txt"]
+        assert zip_ref.read("report.csv") == payload
+        assert zip_ref.read("notes.txt").decode("utf-8") == "ñandú"
+        assert zip_ref.getinfo("report.csv").compress_size < len(payload)
+
+
+def test_zip_stream_writer_stored_and_forced_zip64():
+    writer = ZipStreamWriter(compression=zipfile.ZIP_STORED)
+    archive = (
+        writer.start_entry("big.csv", force_zip64=True)
+        + writer.write(b"a,b\n1,2\n")
+        + writer.end_entry()
+    )
+    archive += writer.close()
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zip_ref:
+        info = zip_ref.getinfo("big.csv")
+        assert info.compress_type == zipfile.ZIP_STORED
+        assert zip_ref.read("big.csv") == b"a,b\n1,2\n"
+
+
+def test_zip_stream_writer_zip64_entry_larger_than_4gib():
+    big = 5 * 1024**3
+    writer = ZipStreamWriter()
+    # Fake a 5 GiB entry: only the accounted size matters to the headers
+    archive = (
+        writer.start_entry("huge.csv", force_zip64=True)
+        + writer.write_block(b"", 0, big)
+        + writer.end_entry()
+    )
+    archive += writer.close()
+    with zipfile.ZipFile(io.BytesIO(archive)) as zip_ref:
+        assert zip_ref.getinfo("huge.csv").file_size == big
+
+    unforced = ZipStreamWriter()
+    unforced.start_entry("huge.csv")
+    unforced.write_block(b"", 0, big)
+    with pytest.raises(zipfile.LargeZipFile):
+        unforced.end_entry()
+
+
+def test_zip_stream_writer_zip64_entry_count():
+    writer = ZipStreamWriter(compression=zipfile.ZIP_STORED)
+    parts = [writer.add_entry(f"f{i}.txt", b"x") for i in range(70_000)]
+    parts.append(writer.close())
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(parts))) as zip_ref:
+        names = zip_ref.namelist()
+        assert len(names) == 70_000
+        assert zip_ref.read("f69999.txt") == b"x"
+
+
+def test_zip_stream_writer_entry_state_errors():
+    writer = ZipStreamWriter()
+    with pytest.raises(ValueError):
+        writer.write(b"data")
+    writer.start_entry("a.txt")
+    with pytest.raises(ValueError):
+        writer.start_entry("b.txt")
+    with pytest.raises(ValueError):
+        writer.close()
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        (b"", b"abc"),
+        (b"abc", b""),
+        (b"hello ", b"world"),
+        (b"x" * 70_000, b"y" * 123_457),
+    ],
+)
+def test_crc32_combine_matches_zlib(first, second):
+    assert crc32_combine(
+        zlib.crc32(first), zlib.crc32(second), len(second)
+    ) == zlib.crc32(first + second)
+
+
+def test_zip_stream_writer_splices_independent_blocks():
+    rows = _rows(300)
+    writer = ZipStreamWriter()
+    parts = [writer.start_entry("activity.csv")]
+    for start in range(0, 300, 100):
+        block, crc, size, _ = encode_report_block(
+            rows[start : start + 100],
+            ["date", "workplace_id", "visits"],
+            start == 0,
+            zipfile.ZIP_DEFLATED,
+            6,
+        )
+        parts.append(writer.write_block(block, crc, size))
+    parts.append(writer.end_entry())
+    parts.append(writer.start_entry("empty.csv") + writer.end_entry())
+    parts.append(writer.start_entry("mixed.txt") + writer.write(b"raw"))
+    with pytest.raises(ValueError):
+        writer.write_block(b"", 0, 0)
+    parts.append(writer.end_entry())
+    parts.append(writer.close())
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(parts))) as zip_ref:
+        assert zip_ref.testzip() is None
+        lines = zip_ref.read("activity.csv").decode("utf-8").splitlines()
+        assert lines[0] == "date,workplace_id,visits" and len(lines) == 301
+        assert zip_ref.read("empty.csv") == b""
+        assert zip_ref.read("mixed.txt") == b"raw"
+
+
+@pytest.mark.asyncio
+async def test_archive_service_streams_csv_and_text(archive_service):
+    rows = _rows(500)
+    report = GeneratedReport(
+        files=[
+            ReportFile(filename="activity.csv", content=rows, content_type="text/csv"),
+            ReportFile(
+                filename="item_error.txt", content="boom", content_type="text/plain"
+            ),
+            ReportFile(
+                filename="skipped.bin",
+                content=12345,
+                content_type="application/octet-stream",
+            ),
+        ]
+    )
+
+    chunks = [chunk async for chunk in archive_service.stream(report)]
+    assert len(chunks) > 1  # Delivered incrementally, not as one buffer
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zip_ref:
+        assert zip_ref.namelist() == ["activity.csv", "item_error.txt"]
+        # Entries are streamed with ZIP64 sizes, so none can outgrow its headers
+        assert {info.extract_version for info in zip_ref.infolist()} == {45}
+        parsed = list(
+            csv.DictReader(io.StringIO(zip_ref.read("activity.csv").decode("utf-8")))
+        )
+        assert len(parsed) == 500
+        assert parsed[0] == {"date": "2024-01-01", "workplace_id": "wp0", "visits": "0"}
+        assert zip_ref.read("item_error.txt") == b"boom"
+
+
+def _row_stream(batches, fail_after=None):
+    async def produce():
+        for index, batch in enumerate(batches):
+            if fail_after is not None and index == fail_after:
+                raise RuntimeError("backend went away")
+            yield batch
+
+    return ReportRowStream(
+        columns=["date", "workplace_id", "visits"], batches=produce()
+    )
+
+
+@pytest.mark.asyncio
+async def test_archive_service_encodes_columnar_batches(archive_service):
+    days = np.arange(
+        np.datetime64("2024-01-01"), np.datetime64("2024-04-10"), dtype="datetime64[D]"
+    )
+    columns = ColumnarBatch(
+        ["date", "visits", "revenue"],
+        [days, np.arange(len(days)), np.full(len(days), 12.5)],
+    )
+
+    # Declared column order differs from the batch order: the stream's columns win
+    async def batches():
+        yield columns.slice(0, 60)
+        yield columns.slice(60, len(days))
+
+    report = GeneratedReport(
+        files=[
+            ReportFile(filename="materialized.csv", content=columns),
+            ReportFile(
+                filename="streamed.csv",
+                content=ReportRowStream(
+                    columns=["visits", "date", "revenue"], batches=batches()
+                ),
+            ),
+        ]
+    )
+
+    archive = await _collect(archive_service.stream(report))
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zip_ref:
+        materialized = zip_ref.read("materialized.csv").decode("utf-8").splitlines()
+        assert materialized[:2] == ["date,visits,revenue", "2024-01-01,0,12.5"]
+        assert len(materialized) == len(days) + 1
+        streamed = zip_ref.read("streamed.csv").decode("utf-8").splitlines()
+        assert streamed[:2] == ["visits,date,revenue", "0,2024-01-01,12.5"]
+        assert streamed[-1] == f"{len(days) - 1},2024-04-09,12.5"
+
+
+@pytest.mark.asyncio
+async def test_archive_service_store_only_mode():
+    service = ReportArchiveService(chunk_size=1024, csv_batch_rows=50, compresslevel=0)
+    report = GeneratedReport(
+        files=[ReportFile(filename="activity.csv", content=_rows(200))]
+    )
+
+    archive = await _collect(service.stream(report))
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zip_ref:
+        info = zip_ref.getinfo("activity.csv")
+        assert info.compress_type == zipfile.ZIP_STORED
+        assert len(zip_ref.read("activity.csv").decode("utf-8").splitlines()) == 201
+
+
+@pytest.mark.asyncio
+async def test_archive_service_process_pool_and_stats():
+    rows = _rows(500)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        service = ReportArchiveService(
+            csv_batch_rows=100, executor=executor, max_pending_blocks=3
+        )
+        stats = ArchiveStats()
+        archive = await _collect(
+            service.stream(
+                GeneratedReport(
+                    files=[ReportFile(filename="activity.csv", content=rows)]
+                ),
+                stats=stats,
+            )
+        )
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zip_ref:
+        content = zip_ref.read("activity.csv")
+        assert len(content.decode("utf-8").splitlines()) == 501
+    assert stats.raw_bytes == len(content)
+    assert stats.bytes_written == len(archive)
+    assert stats.offloaded_seconds > 0
+    assert stats.elapsed_seconds >= 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("compresslevel", [6, 0])
+async def test_archive_service_splices_cached_blocks(compresslevel):
+    days = np.arange(
+        np.datetime64("2024-01-01"), np.datetime64("2024-03-01"), dtype="datetime64[D]"
+    )
+    visits = np.arange(len(days))
+    january = ColumnarBatch(
+        ["date", "visits"], [days[:31], visits[:31]], cache_key="activity:jan"
+    )
+    february = ColumnarBatch(
+        ["date", "visits"], [days[31:], visits[31:]], cache_key="activity:feb"
+    )
+    edge = ColumnarBatch(["date", "visits"], [days[:3], visits[:3]])
+
+    def report(batches):
+        async def produce():
+            for batch in batches:
+                yield batch
+
+        return GeneratedReport(
+            files=[
+                ReportFile(
+                    filename="activity.csv",
+                    content=ReportRowStream(["date", "visits"], produce()),
+                )
+            ]
+        )
+
+    service = ReportArchiveService(
+        compresslevel=compresslevel,
+        block_cache=EncodedBlockCache(InMemoryCacheService()),
+    )
+    first_stats, second_stats = ArchiveStats(), ArchiveStats()
+    first = await _collect(
+        service.stream(report([edge, january, february]), stats=first_stats)
+    )
+    second = await _collect(
+        service.stream(report([edge, january, february]), stats=second_stats)
+    )
+    # The header is part of the first block: a keyed batch opening the file is another entry
+    third = await _collect(service.stream(report([january, february])))
+
+    assert (first_stats.cached_blocks, second_stats.cached_blocks) == (0, 2)
+    for archive, expected_rows in ((first, 3 + 60), (second, 3 + 60), (third, 60)):
+        with zipfile.ZipFile(io.BytesIO(archive)) as zip_ref:
+            assert zip_ref.testzip() is None
+            lines = zip_ref.read("activity.csv").decode("utf-8").splitlines()
+            assert lines[0] == "date,visits" and len(lines) == 1 + expected_rows
+            assert lines[-1] == "2024-02-29,59"
+    assert second == first
+
+
+@pytest.mark.asyncio
+async def test_archive_service_encodes_row_streams(archive_service):
+    rows = _rows(300)
+    batches = [rows[start : start + 100] for start in range(0, 300, 100)]
+    report = GeneratedReport(
+        files=[ReportFile(filename="activity.csv", content=_row_stream(batches))]
+    )
+
+    archive = await _collect(archive_service.stream(report))
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zip_ref:
+        lines = zip_ref.read("activity.csv").decode("utf-8").splitlines()
+        assert lines[0] == "date,workplace_id,visits"
+        assert len(lines) == 301
+
+
+@pytest.mark.asyncio
+async def test_archive_service_records_mid_stream_failure(archive_service):
+    rows = _rows(300)
+    batches = [rows[start : start + 100] for start in range(0, 300, 100)]
+    report = GeneratedReport(
+        files=[
+            ReportFile(
+                filename="activity.csv", content=_row_stream(batches, fail_after=1)
+            ),
+            ReportFile(
+                filename="notes.txt", content="still here", content_type="text/plain"
+            ),
+        ]
+    )
+
+    archive = await _collect(archive_service.stream(report))
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zip_ref:
+        assert zip_ref.namelist() == ["activity.csv", "activity_error.txt", "notes.txt"]
+        assert len(zip_ref.read("activity.csv").decode("utf-8").splitlines()) == 101
+        assert b"backend went away" in zip_ref.read("activity_error.txt")
+
+
+class _TrackedRows(list):
+    """List that records how far the encoder has read."""
+
+    max_index = 0
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            self.max_index = max(self.max_index, item.stop or 0)
+        return super().__getitem__(item)
+
+
+@pytest.mark.asyncio
+async def test_archive_service_queue_is_bounded(archive_service):
+    # Hash values keep the CSV poorly compressible, so output chunks fill up quickly
+    rows = _TrackedRows(
+        {
+            "id": i,
+            "digest": hashlib.sha1(str(i).encode(), usedforsecurity=False).hexdigest(),
+        }
+        for i in range(20_000)
+    )
+    report = GeneratedReport(files=[ReportFile(filename="a.csv", content=rows)])
+    stream = archive_service.stream(report)
+
+    await stream.__anext__()
+    await asyncio.sleep(0.05)  # Give the producer every chance to run ahead
+    # The producer is parked on the full queue instead of encoding the whole report
+    assert rows.max_index < len(rows)
+
+    await _collect(stream)
+    assert rows.max_index >= len(rows)
+
+
+@pytest.mark.asyncio
+async def test_archive_service_stops_producer_on_early_close(archive_service):
+    report = GeneratedReport(files=[ReportFile(filename="a.csv", content=_rows(5000))])
+    stream = archive_service.stream(report)
+    await stream.__anext__()
+    await stream.aclose()  # e.g. client disconnected; must not hang
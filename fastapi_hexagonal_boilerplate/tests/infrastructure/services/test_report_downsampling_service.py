@@ -0,0 +1,148 @@
+import pytest
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.core.models.report import ColumnarBatch, ReportRowStream
+from app.infrastructure.services.report_downsampling_service import (
+    ReportDownsamplingService,
+    ReportNotChartableError,
+    lttb_indices,
+)
+
+
+def _reference_lttb(x, y, threshold):
+    # Straightforward one-series LTTB (Steinarsson, 2013)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+
+    # The last bucket ends right before the last point, whatever the float rounding
+    def edge(bucket):
+        return n - 1 if bucket == threshold - 2 else int(bucket * every) + 1
+
+    selected, a = [0], 0
+    for bucket in range(threshold - 2):
+        start, stop = edge(bucket), edge(bucket + 1)
+        next_start, next_stop = (
+            (stop, edge(bucket + 2)) if bucket < threshold - 3 else (n - 1, n)
+        )
+        c_x, c_y = np.mean(x[next_start:next_stop]), np.mean(y[next_start:next_stop])
+        areas = [
+            abs((x[a] - c_x) * (y[i] - y[a]) - (x[a] - x[i]) * (c_y - y[a]))
+            for i in range(start, stop)
+        ]
+        a = start + int(np.argmax(areas))
+        selected.append(a)
+    return [*selected, n - 1]
+
+
+def _row_stream(batches, columns=("date", "workplace_id", "visits", "new_memberships")):
+    async def batches_iter():
+        for batch in batches:
+            yield batch
+
+    return ReportRowStream(list(columns), batches_iter())
+
+
+@pytest.mark.parametrize(
+    "n, threshold", [(1000, 100), (1000, 3), (37, 10), (500, 499), (20, 50)]
+)
+def test_lttb_matches_reference_for_every_series(n, threshold):
+    rng = np.random.default_rng(n + threshold)
+    x = np.arange(n) * 7
+    y = rng.normal(size=(4, n)).cumsum(axis=1)
+
+    selected = lttb_indices(x, y, threshold)
+
+    assert selected.shape == (4, min(n, threshold))
+    for series in range(4):
+        assert selected[series].tolist() == _reference_lttb(
+            x.astype(float), y[series], threshold
+        )
+
+
+def test_lttb_keeps_spikes():
+    y = np.zeros((1, 10_000))
+    y[0, 4321] = 100.0
+    y[0, 8765] = -50.0
+    selected = lttb_indices(np.arange(10_000), y, 50)[0]
+    assert {0, 4321, 8765, 9999} <= set(selected.tolist())
+
+
+@pytest.mark.asyncio
+async def test_downsample_builds_one_series_per_workplace_and_metric():
+    days = 400
+    dates = np.arange(np.datetime64("2023-01-01"), np.datetime64("2023-01-01") + days)
+    batch = ColumnarBatch(
+        ["date", "workplace_id", "visits", "new_memberships"],
+        [
+            np.repeat(dates, 2),
+            np.tile(np.array(["wp1", "wp2"], dtype=object), days),
+            np.arange(days * 2),
+            np.arange(days * 2) % 7,
+        ],
+    )
+    stream = _row_stream([batch.slice(0, 300), batch.slice(300, days * 2).to_rows()])
+
+    series = await ReportDownsamplingService().downsample(
+        stream, ["wp1", "wp2", "wp3"], points=40
+    )
+
+    assert [(s["workplace_id"], s["metric"]) for s in series] == [
+        ("wp1", "visits"),
+        ("wp1", "new_memberships"),
+        ("wp2", "visits"),
+        ("wp2", "new_memberships"),
+    ]
+    for s in series:
+        assert len(s["dates"]) == len(s["values"]) == 40
+        assert s["dates"][0] == "2023-01-01"
+        assert (
+            s["dates"][-1] == (date(2023, 1, 1) + timedelta(days=days - 1)).isoformat()
+        )
+        assert s["dates"] == sorted(s["dates"])
+    assert series[0]["values"][:2] == [0, 2]  # wp1 visits are the even rows
+    assert all(isinstance(value, int) for value in series[1]["values"])
+
+
+@pytest.mark.asyncio
+async def test_downsample_sorts_shuffled_rows_and_ignores_other_workplaces():
+    days = 30
+    dates = np.repeat(
+        np.arange(np.datetime64("2023-01-01"), np.datetime64("2023-01-01") + days), 3
+    )
+    workplaces = np.tile(np.array(["wp2", "other", "wp1"], dtype=object), days)
+    shuffled = np.random.default_rng(7).permutation(days * 3)
+    batch = ColumnarBatch(
+        ["date", "workplace_id", "visits", "new_memberships"],
+        [
+            dates[shuffled],
+            workplaces[shuffled],
+            np.arange(days * 3)[shuffled],
+            np.zeros(days * 3, dtype=np.int64),
+        ],
+    )
+
+    series = await ReportDownsamplingService().downsample(
+        _row_stream([batch]), ["wp1", "wp2"], points=days
+    )
+
+    assert [(s["workplace_id"], s["metric"]) for s in series][::2] == [
+        ("wp1", "visits"),
+        ("wp2", "visits"),
+    ]
+    assert series[0]["values"] == list(range(2, days * 3, 3))
+    assert series[2]["values"] == list(range(0, days * 3, 3))
+    assert (
+        series[0]["dates"] == sorted(series[0]["dates"])
+        and len(set(series[0]["dates"])) == days
+    )
+
+
+@pytest.mark.asyncio
+async def test_downsample_rejects_reports_without_chart_layout():
+    stream = _row_stream([[{"name": "a", "count": 1}]], columns=("name", "count"))
+    with pytest.raises(ReportNotChartableError):
+        await ReportDownsamplingService().downsample(stream, ["wp1"], points=10)
@@ -0,0 +1,192 @@
+import pytest
+import json
+import zlib
+from datetime import date
+
+import numpy as np
+
+from app.core.models.report import (
+    ColumnarBatch,
+    GeneratedReport,
+    ReportFile,
+    ReportRowStream,
+)
+from app.infrastructure.services import report_ndjson_service
+from app.infrastructure.services.report_ndjson_service import (
+    ReportNdjsonService,
+    negotiate_encoding,
+)
+
+
+def _row_stream(*batches, fail_after=False):
+    async def batches_iter():
+        for batch in batches:
+            yield batch
+        if fail_after:
+            raise RuntimeError("source went away")
+
+    return ReportRowStream(["date", "workplace_id", "visits"], batches_iter())
+
+
+def _report():
+    columnar = ColumnarBatch(
+        ["date", "workplace_id", "visits"],
+        [
+            np.array(["2024-01-01", "2024-01-02"], dtype="datetime64[D]"),
+            np.array(["wp1", "wp1"], dtype=object),
+            np.array([3, 4]),
+        ],
+    )
+    return GeneratedReport(
+        files=[
+            ReportFile(
+                filename="activity_summary.csv",
+                content=_row_stream(
+                    columnar,
+                    [{"date": date(2024, 1, 3), "workplace_id": "wp2", "visits": 5}],
+                ),
+            ),
+            ReportFile(
+                filename="item_statistics_error.txt",
+                content="Error generating report 'item_statistics': boom",
+                content_type="text/plain",
+            ),
+            ReportFile(
+                filename="member_statistics_no_data.txt",
+                content="No data available.",
+                content_type="text/plain",
+            ),
+        ],
+        failed_reports=["item_statistics"],
+    )
+
+
+async def _collect(stream):
+    return b"".join([chunk async for chunk in stream])
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, "identity"),
+        ("", "identity"),
+        ("gzip, deflate, br", "gzip"),
+        ("gzip;q=0", "identity"),
+        ("*", "gzip"),
+        ("identity, gzip;q=0.5", "gzip"),
+        ("br", "identity"),
+    ],
+)
+def test_negotiate_encoding(monkeypatch, accept_encoding, expected):
+    monkeypatch.setattr(report_ndjson_service, "zstandard", None)
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_negotiate_encoding_prefers_zstd_when_available(monkeypatch):
+    monkeypatch.setattr(report_ndjson_service, "zstandard", object())
+    assert negotiate_encoding("gzip, zstd") == "zstd"
+    assert negotiate_encoding("gzip, zstd;q=0.5") == "gzip"
+
+
+@pytest.mark.asyncio
+async def test_stream_emits_one_json_line_per_row_and_per_message():
+    body = await _collect(
+        ReportNdjsonService().stream(
+            ["activity_summary", "item_statistics", "member_statistics"], _report()
+        )
+    )
+    lines = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+
+    assert lines == [
+        {
+            "report": "activity_summary",
+            "date": "2024-01-01",
+            "workplace_id": "wp1",
+            "visits": 3,
+        },
+        {
+            "report": "activity_summary",
+            "date": "2024-01-02",
+            "workplace_id": "wp1",
+            "visits": 4,
+        },
+        {
+            "report": "activity_summary",
+            "date": "2024-01-03",
+            "workplace_id": "wp2",
+            "visits": 5,
+        },
+        {
+            "report": "item_statistics",
+            "error": "Error generating report 'item_statistics': boom",
+        },
+        {"report": "member_statistics", "notice": "No data available."},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_gzip_stream_decodes_chunk_by_chunk():
+    chunks = [
+        chunk
+        async for chunk in ReportNdjsonService().stream(
+            ["activity_summary", "item_statistics", "member_statistics"],
+            _report(),
+            encoding="gzip",
+        )
+    ]
+    identity = await _collect(
+        ReportNdjsonService().stream(
+            ["activity_summary", "item_statistics", "member_statistics"], _report()
+        )
+    )
+
+    # Every chunk is flushed, so a client can decode the rows received so far
+    decoder = zlib.decompressobj(wbits=31)
+    first = decoder.decompress(chunks[0])
+    assert (
+        first.endswith(b"\n")
+        and json.loads(first.splitlines()[0])["report"] == "activity_summary"
+    )
+    assert (
+        first + b"".join(decoder.decompress(chunk) for chunk in chunks[1:]) == identity
+    )
+    assert zlib.decompress(b"".join(chunks), wbits=31) == identity
+
+
+@pytest.mark.asyncio
+async def test_stream_reads_batches_only_on_demand_and_reports_mid_stream_failures():
+    pulled = []
+
+    async def batches_iter():
+        for visits in range(3):
+            pulled.append(visits)
+            yield [{"date": date(2024, 1, 1), "workplace_id": "wp1", "visits": visits}]
+        raise RuntimeError("source went away")
+
+    report = GeneratedReport(
+        files=[
+            ReportFile(
+                filename="activity_summary.csv",
+                content=ReportRowStream(
+                    ["date", "workplace_id", "visits"], batches_iter()
+                ),
+            )
+        ]
+    )
+    stream = ReportNdjsonService().stream(["activity_summary"], report)
+
+    first = await stream.__anext__()
+    assert json.loads(first)["visits"] == 0
+    assert pulled == [0]  # Backpressure: nothing read ahead of the consumer
+
+    rest = [json.loads(line) for line in (await _collect(stream)).splitlines()]
+    assert [line.get("visits") for line in rest[:2]] == [1, 2]
+    assert (
+        rest[2]["report"] == "activity_summary"
+        and "source went away" in rest[2]["error"]
+    )
+
+
+def test_unsupported_encoding_is_rejected():
+    with pytest.raises(ValueError):
+        report_ndjson_service._StreamCompressor("br")
@@ -0,0 +1,99 @@
+import pytest
+import asyncio
+from typing import Dict, List, Optional
+
+from app.core.models.workplace import Workplace
+from app.core.ports.workplace_port import WorkplacePort
+from app.infrastructure.adapters.mock_workplace_adapter import MockWorkplaceAdapter
+from app.infrastructure.services.workplace_loader import WorkplaceLoader
+
+
+class RecordingWorkplaceAdapter(MockWorkplaceAdapter):
+    """Mock workplaces, recording each bulk lookup."""
+
+    def __init__(self, fail=False):
+        self.batches: List[List[str]] = []
+        self.fail = fail
+
+    async def get_workplaces_by_ids(
+        self, workplace_ids: List[str]
+    ) -> Dict[str, Workplace]:
+        self.batches.append(list(workplace_ids))
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise ConnectionError("workplace backend down")
+        return await super().get_workplaces_by_ids(workplace_ids)
+
+
+@pytest.mark.asyncio
+async def test_lookups_of_one_tick_share_one_backend_call_and_are_memoized():
+    adapter = RecordingWorkplaceAdapter()
+    loader = WorkplaceLoader(adapter)
+
+    async def label(workplace_id):
+        workplace = await loader.load(workplace_id)
+        return workplace.name if workplace else None
+
+    names = await asyncio.gather(
+        label("wp1"), label("wp3"), label("nope"), label("wp1")
+    )
+    assert names == ["Main Library", "Westside Annex", None, "Main Library"]
+    assert adapter.batches == [["wp1", "wp3", "nope"]]
+
+    assert [wp.id for wp in await loader.load_many(["wp3", "wp2"])] == ["wp3", "wp2"]
+    assert adapter.batches == [
+        ["wp1", "wp3", "nope"],
+        ["wp2"],
+    ]  # wp3 came from the memo
+
+
+@pytest.mark.asyncio
+async def test_batches_are_capped_and_failures_are_not_memoized():
+    adapter = RecordingWorkplaceAdapter()
+    loader = WorkplaceLoader(adapter, max_batch_size=2)
+    await loader.load_many(["wp1", "wp2", "wp3", "wp4", "wp5"])
+    assert adapter.batches == [["wp1", "wp2"], ["wp3", "wp4"], ["wp5"]]
+
+    failing = RecordingWorkplaceAdapter(fail=True)
+    loader = WorkplaceLoader(failing)
+    with pytest.raises(ConnectionError):
+        await loader.load_many(["wp1", "wp2"])
+    failing.fail = False
+    assert (await loader.load("wp1")).id == "wp1"
+    assert failing.batches == [["wp1", "wp2"], ["wp1"]]
+
+
+@pytest.mark.asyncio
+async def test_default_bulk_lookup_uses_single_lookups():
+    class SingleLookupAdapter(WorkplacePort):
+        async def get_accessible_workplaces(self, user_id):
+            return []
+
+        async def get_workplace_by_id(self, workplace_id: str) -> Optional[Workplace]:
+            return (
+                Workplace(id=workplace_id, name=workplace_id.upper())
+                if workplace_id != "nope"
+                else None
+            )
+
+    workplaces = await SingleLookupAdapter().get_workplaces_by_ids(["a", "nope", "b"])
+    assert {wp_id: wp.name for wp_id, wp in workplaces.items()} == {"a": "A", "b": "B"}
+
+
+@pytest.mark.asyncio
+async def test_default_search_scans_accessible_workplaces():
+    class ListWorkplaceAdapter(WorkplacePort):
+        async def get_accessible_workplaces(self, user_id):
+            return [
+                Workplace(id="a", name="North Annex"),
+                Workplace(id="b", name="Annex Hall"),
+                Workplace(id="c", name="Lab"),
+            ]
+
+        async def get_workplace_by_id(self, workplace_id):
+            return None
+
+    assert [
+        wp.id for wp in await ListWorkplaceAdapter().search_workplaces(None, "annex")
+    ] == ["b", "a"]
+    assert await ListWorkplaceAdapter().search_workplaces(None, "  ") == []